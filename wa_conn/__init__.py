@@ -1,6 +1,14 @@
 from . import models
 from . import controllers
 from . import wizard
+from . import cli
+
+
+def post_load():
+    # Dispatcher LISTEN/NOTIFY em thread, quando wa_conn é server-wide (ver cli/wa_dispatch.py)
+    from odoo.tools import config
+    if str(config.get('wa_dispatcher', '')).lower() in ('1', 'true', 'yes'):
+        cli.wa_dispatch.start_thread()
 
 
 def uninstall_hook(env):
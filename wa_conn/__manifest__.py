@@ -28,23 +28,33 @@
         'views/wa_team_views.xml',
         'views/wa_compose_views.xml',
         'views/wa_mass_send_views.xml',
-        # 'views/wa_send_queue_views.xml',
+        'views/wa_send_queue_views.xml',
         'views/wa_channel_views.xml',
         'views/wa_channel_tag_views.xml',
         'views/wa_channel_stage_views.xml',
         'views/wa_ir_actions_server_views.xml',
+        'views/wa_metrics_views.xml',
+        'views/wa_debug_capture_views.xml',
+        'views/wa_webhook_event_views.xml',
+        'views/wa_optout_views.xml',
         'wizard/wa_mail_compose_message_wizard.xml',
         'wizard/wa_account_move_send_wizard.xml',
         'data/wa_channel_stage_data.xml',
+        'data/wa_webhook_event_data.xml',
+        'data/wa_send_queue_data.xml',
     ],
     'assets': {
         'web.assets_backend': [
             'wa_conn/static/src/js/discuss_client_action.js',
             'wa_conn/static/src/xml/discuss_client_action.xml',
+            'wa_conn/static/src/js/mass_send_progress.js',
+            'wa_conn/static/src/xml/mass_send_progress.xml',
         ],
         'web.assets_qweb': [
             'wa_conn/static/src/xml/discuss_client_action.xml',
+            'wa_conn/static/src/xml/mass_send_progress.xml',
         ],
     },
     "uninstall_hook": "uninstall_hook",
+    "post_load": "post_load",
 }
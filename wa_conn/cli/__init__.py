@@ -0,0 +1 @@
+from . import wa_dispatch
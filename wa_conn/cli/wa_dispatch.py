@@ -0,0 +1,164 @@
+"""
+Dispatcher das filas WhatsApp: LISTEN wa_work e processa o trabalho
+milissegundos após o commit de quem o enfileirou (wa.send.queue,
+wa.webhook.event...), sem esperar o intervalo do ir.cron.
+
+    odoo-bin wa_dispatch -c odoo.conf -d mydb [--poll-interval 60] [--kinds send_queue,webhook_event]
+
+Também pode rodar como thread de um servidor threaded: inclua wa_conn em
+server_wide_modules (--load=base,web,wa_conn) e defina wa_dispatcher = True
+no arquivo de configuração. Os crons continuam existindo como rede de
+segurança; SKIP LOCKED impede que os dois processem o mesmo item.
+"""
+import argparse
+import logging
+import select
+import sys
+import threading
+import time
+from pathlib import Path
+
+import odoo
+from odoo import SUPERUSER_ID, api
+from odoo.cli import Command
+from odoo.tools import config
+
+from ..models.wa_dispatcher import WORK_CHANNEL
+
+_logger = logging.getLogger(__name__)
+
+# Tipos atendidos por padrão (ver wa.dispatcher._dispatch_handlers)
+DEFAULT_KINDS = ('send_queue', 'webhook_event')
+# Lotes seguidos de um mesmo tipo antes de voltar a olhar as notificações
+MAX_ROUNDS = 50
+# True dentro de 'odoo-bin wa_dispatch': o post_load não inicia outra thread
+_command_running = False
+
+
+def _config_dbname():
+    db_name = config['db_name'] or ''
+    if isinstance(db_name, (list, tuple)):
+        return db_name[0] if db_name else ''
+    return db_name.split(',')[0]
+
+
+class Dispatcher:
+    """Loop LISTEN/NOTIFY com polling de segurança a cada poll_interval segundos."""
+
+    def __init__(self, dbname, kinds=DEFAULT_KINDS, poll_interval=60.0):
+        self.dbname = dbname
+        self.kinds = tuple(kinds)
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        _logger.info(f"[wa_dispatch] Listening on '{WORK_CHANNEL}' for {', '.join(self.kinds)} ({self.dbname})")
+        while not self._stop.is_set():
+            try:
+                self._loop()
+            except Exception:
+                # Conexão perdida, banco reiniciado...: tenta de novo sem derrubar o processo
+                _logger.exception("[wa_dispatch] Dispatcher loop failed, restarting in 5s")
+                self._stop.wait(5)
+
+    def _loop(self):
+        with odoo.sql_db.db_connect(self.dbname).cursor() as cr:
+            conn = cr._cnx
+            cr.execute(f"LISTEN {WORK_CHANNEL}")
+            cr.commit()
+            # Ao iniciar processa tudo: pode haver trabalho de antes do LISTEN
+            pending = set(self.kinds)
+            while not self._stop.is_set():
+                if pending:
+                    self._process(pending)
+                    pending = set()
+                timeout = self._timeout()
+                if select.select([conn], [], [], timeout) == ([], [], []):
+                    # Timeout: polling de segurança ou item agendado vencendo
+                    pending = set(self.kinds)
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    kind = conn.notifies.pop().payload
+                    if kind in self.kinds:
+                        pending.add(kind)
+
+    def _registry(self):
+        return odoo.modules.registry.Registry(self.dbname).check_signaling()
+
+    def _process(self, kinds):
+        for kind in kinds:
+            for _round in range(MAX_ROUNDS):
+                start = time.perf_counter()
+                try:
+                    registry = self._registry()
+                    with registry.cursor() as cr:
+                        env = api.Environment(cr, SUPERUSER_ID, {})
+                        more = env['wa.dispatcher']._dispatch(kind)
+                except Exception:
+                    _logger.exception(f"[wa_dispatch] '{kind}' failed")
+                    break
+                _logger.debug(f"[wa_dispatch] '{kind}' batch in {(time.perf_counter() - start) * 1000:.1f}ms")
+                if not more or self._stop.is_set():
+                    break
+
+    def _timeout(self):
+        try:
+            with self._registry().cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                return env['wa.dispatcher']._seconds_until_next_due(self.poll_interval)
+        except Exception:
+            _logger.exception("[wa_dispatch] Could not compute next due time")
+            return self.poll_interval
+
+
+def start_thread(dbname=None):
+    """Inicia o dispatcher numa thread daemon (servidor threaded)."""
+    if _command_running:
+        return None
+    dbname = dbname or _config_dbname()
+    if not dbname:
+        _logger.warning("[wa_dispatch] wa_dispatcher is enabled but no db_name is configured")
+        return None
+    if config['workers']:
+        _logger.warning("[wa_dispatch] wa_dispatcher thread is not supported with workers > 0; "
+                        "run 'odoo-bin wa_dispatch' as a separate process instead")
+        return None
+    dispatcher = Dispatcher(dbname, poll_interval=float(config.get('wa_dispatcher_poll_interval') or 60))
+    thread = threading.Thread(target=dispatcher.run, name=f'wa.dispatcher.{dbname}', daemon=True)
+    thread.start()
+    return dispatcher
+
+
+class WaDispatch(Command):
+    """Processa as filas WhatsApp via LISTEN/NOTIFY"""
+    name = 'wa_dispatch'
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f'{Path(sys.argv[0]).name} {self.name}',
+            description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter,
+        )
+        parser.add_argument('--poll-interval', type=float, default=60.0,
+                            help='seconds between safety-net polls when no notification arrives')
+        parser.add_argument('--kinds', default=','.join(DEFAULT_KINDS),
+                            help='comma separated work kinds to process')
+        args, odoo_args = parser.parse_known_args(cmdargs)
+        global _command_running
+        _command_running = True
+        config.parse_config(odoo_args)
+        odoo.netsvc.init_logger()
+        dbname = _config_dbname()
+        if not dbname:
+            sys.exit("wa_dispatch: a database is required (-d/--database)")
+
+        kinds = [k.strip() for k in args.kinds.split(',') if k.strip()]
+        dispatcher = Dispatcher(dbname, kinds, args.poll_interval)
+        try:
+            dispatcher.run()
+        except KeyboardInterrupt:
+            dispatcher.stop()
@@ -1,5 +1,9 @@
+import hmac
+
 from odoo import http
-from odoo.http import request
+from odoo.http import request, Response
+
+from ..tools.debug_capture import redact_headers
 
 
 class WaWebhookController(http.Controller):
@@ -43,6 +47,9 @@ class WaWebhookController(http.Controller):
         if not incoming_key or not expected_key or incoming_key != expected_key:
             return {'error': 'forbidden', 'reason': 'invalid_webhook_key'}
 
+        if account.debug_capture:
+            account.sudo()._debug_capture('webhook', {'headers': redact_headers(hdrs), 'body': raw},
+                                          label=request.httprequest.path)
         return account.sudo().inbound_handle(raw, request=request)
 
     @http.route('/wa/webhook', type='json', auth='public', methods=['POST'], csrf=False)
@@ -54,7 +61,22 @@ class WaWebhookController(http.Controller):
     @http.route('/wa/webhook/<string:webhook_uuid>', type='json', auth='public', methods=['POST'], csrf=False)
     def receive_webhook_uuid(self, webhook_uuid, **kwargs):
         raw = request.get_json_data() or {}
-        headers = dict(request.httprequest.headers)
-        print("[WAController] Webhook recebido:", {"headers": headers, "body": raw})
         account = self._resolve_account(raw, webhook_uuid=webhook_uuid)
         return self._process_webhook(account, raw)
+
+    @http.route('/wa/metrics', type='http', auth='public', methods=['GET'], csrf=False, save_session=False)
+    def metrics(self, **kwargs):
+        """
+        Métricas no formato texto do Prometheus. Aceita o token do parâmetro
+        de sistema wa_conn.metrics_token (Authorization: Bearer <token>) ou
+        uma sessão de administrador.
+        """
+        token = request.env['ir.config_parameter'].sudo().get_param('wa_conn.metrics_token')
+        auth = request.httprequest.headers.get('Authorization') or ''
+        bearer = auth[7:].strip() if auth.lower().startswith('bearer ') else ''
+        authorized = (token and bearer and hmac.compare_digest(token.encode(), bearer.encode())) \
+            or request.env.user.has_group('base.group_system')
+        if not authorized:
+            return Response('Forbidden\n', status=403, content_type='text/plain')
+        body = request.env['wa.metrics'].sudo().render_prometheus()
+        return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
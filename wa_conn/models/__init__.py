@@ -5,14 +5,24 @@ from . import ir_attachment
 from . import res_company
 from . import res_partner
 from . import wa_mixin
+from . import provider
 from . import wa_account
 from . import wa_team
 from . import wa_compose
 from . import wa_template
 from . import wa_mass_send
-# from . import wa_send_queue
+from . import wa_send_queue
 from . import wa_channel
+from . import discuss_channel_member
 from . import wa_channel_tag
 from . import wa_channel_stage
 from . import dto
-from . import wa_message_reaction
\ No newline at end of file
+from . import wa_message_reaction
+from . import wa_metrics
+from . import wa_debug_capture
+from . import wa_webhook_event
+from . import wa_dispatcher
+from . import wa_receipt
+from . import wa_number_check
+from . import wa_optout
+from . import ir_websocket
@@ -0,0 +1,51 @@
+from odoo import api, fields, models
+
+
+class ChannelMember(models.Model):
+    _inherit = 'discuss.channel.member'
+
+    # Mensagens WhatsApp recebidas e não lidas: incrementado por SQL em
+    # discuss.channel._wa_bump_unread e recontado quando o membro lê o canal
+    # (_set_new_message_separator)
+    wa_unread_counter = fields.Integer(string='WA Unread Counter', default=0, readonly=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        members = super().create(vals_list)
+        # Um usuário entrou num canal WA: o contador "sem membros" deixa de valer
+        channels = members.filtered(lambda m: m.channel_id.is_wa and m.partner_id.user_ids).channel_id
+        if channels:
+            channels.sudo().write({'wa_unread_count': 0})
+        return members
+
+    def _set_new_message_separator(self, message_id, *args, **kwargs):
+        res = super()._set_new_message_separator(message_id, *args, **kwargs)
+        self._wa_recount_unread()
+        return res
+
+    def _wa_recount_unread(self):
+        """
+        Recalcula wa_unread_counter a partir do separador de novas mensagens.
+        Mesma definição de _wa_bump_unread: só mensagens recebidas pelo
+        WhatsApp (message_derection = 'input'); posts do bot e de outros
+        agentes não contam.
+        """
+        members = self.filtered(lambda m: m.channel_id.is_wa)
+        if not members:
+            return
+        members.flush_recordset(['new_message_separator'])
+        self.env['mail.message'].flush_model(['message_derection'])
+        self.env.cr.execute("""
+            UPDATE discuss_channel_member m
+               SET wa_unread_counter = (
+                       SELECT count(*)
+                         FROM mail_message msg
+                        WHERE msg.model = 'discuss.channel'
+                          AND msg.res_id = m.channel_id
+                          AND msg.id >= COALESCE(m.new_message_separator, 0)
+                          AND msg.message_derection = 'input'
+                          AND msg.author_id IS DISTINCT FROM m.partner_id
+                   )
+             WHERE m.id IN %s
+        """, [tuple(members.ids)])
+        members.invalidate_recordset(['wa_unread_counter'])
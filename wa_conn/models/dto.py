@@ -39,3 +39,15 @@ class NormalizedPayload:
             'attachment_name': self.attachment_name,
             'raw': self.raw,
         }
+
+
+class DeliveryReceipt:
+    """Confirmação de entrega/leitura de uma mensagem enviada (ver wa.receipt)."""
+
+    def __init__(self, message_id, status, timestamp=None):
+        self.message_id = message_id
+        self.status = status
+        self.timestamp = timestamp
+
+    def to_dict(self):
+        return {'message_id': self.message_id, 'status': self.status, 'timestamp': self.timestamp}
@@ -39,6 +39,7 @@ class WAServerAction(models.Model):
 
     def _run_action_send_wa_message(self, eval_context=None):
         account = self.wa_account_id
+        messages = []
         for record in self.env[self.model_id.model].browse(self.env.context.get('active_ids', [])):
             if self.wa_template_id:
                 message = self.wa_template_id.render_template('message', record)
@@ -48,37 +49,17 @@ class WAServerAction(models.Model):
                 message = self.wa_message
                 media = self.wa_media
                 media_filename = self.wa_media_filename
+            options = {'b64': media, 'filename': media_filename} if media else {}
 
             # Send to selected partners
-            for partner in self.partner_ids:
-                if media:
-                    account.send_media(
-                        mobile=partner.mobile,
-                        caption=message,
-                        b64=media,
-                        mime=None,
-                        filename=media_filename
-                    )
-                else:
-                    account.send_text(
-                        mobile=partner.mobile,
-                        message=message
-                    )
+            partners = self.partner_ids
             # Optionally send to the partner of the model
             if self.model_partner and hasattr(record, 'partner_id') and record.partner_id:
-                if media:
-                    account.send_media(
-                        mobile=record.partner_id.mobile,
-                        caption=message,
-                        b64=media,
-                        mime=None,
-                        filename=media_filename
-                    )
-                else:
-                    account.send_text(
-                        mobile=record.partner_id.mobile,
-                        message=message
-                    )
+                partners |= record.partner_id
+            for partner in partners:
+                messages.append((partner.mobile, message, options))
+        if messages:
+            account.send_batch(messages)
 
     def run_action(self, eval_context=None):
         """
@@ -0,0 +1,23 @@
+from odoo import models
+
+from .wa_send_queue import PROGRESS_CHANNEL
+
+
+class IrWebsocket(models.AbstractModel):
+    _inherit = 'ir.websocket'
+
+    def _build_bus_channel_list(self, channels):
+        """Canal de progresso de um envio em massa só para quem pode ler o envio."""
+        requested = {}
+        for channel in channels:
+            if isinstance(channel, str) and channel.startswith(PROGRESS_CHANNEL):
+                suffix = channel[len(PROGRESS_CHANNEL):]
+                requested[channel] = int(suffix) if suffix.isdigit() else None
+        if requested:
+            allowed = set()
+            mass_send_ids = {rid for rid in requested.values() if rid}
+            if self.env.uid and mass_send_ids:
+                allowed = set(self.env['wa.mass.send'].browse(mass_send_ids).exists()._filtered_access('read').ids)
+            channels = [channel for channel in channels
+                        if channel not in requested or requested[channel] in allowed]
+        return super()._build_bus_channel_list(channels)
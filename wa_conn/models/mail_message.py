@@ -1,5 +1,6 @@
 
 from odoo import _, api, fields, models
+import logging
 try:
     from odoo.tools import html2plaintext as _html2plaintext
 except Exception:  # safe fallback
@@ -8,6 +9,11 @@ except Exception:  # safe fallback
         text = re.sub(r'<[^>]+>', '', html or '')
         return text.replace('&nbsp;', ' ').replace('&amp;', '&')
 
+from .wa_channel import PREVIEW_SIZE
+from .wa_receipt import DELIVERY_STATUS
+
+_logger = logging.getLogger(__name__)
+
 class MailMessage(models.Model):
     _inherit = 'mail.message'
 
@@ -21,7 +27,7 @@ class MailMessage(models.Model):
         ('output','output')],
         # compute ='_comput_message_direction'
     )
-    wa_message_id = fields.Char()
+    wa_message_id = fields.Char(index='btree_not_null')
     is_wa = fields.Boolean(default=False, store=True, help="Indica se a mensagem é WhatsApp.")
 
   
@@ -35,8 +41,11 @@ class MailMessage(models.Model):
         ('output','output')],
         # compute ='_comput_message_direction'
     )
-    wa_message_id = fields.Char()
+    wa_message_id = fields.Char(index='btree_not_null')
     is_wa = fields.Boolean(default=False, store=True, help="Indica se a mensagem é WhatsApp.")
+    # Atualizados em lote pelos recibos de entrega (wa.receipt)
+    wa_delivery_status = fields.Selection(DELIVERY_STATUS, string="WhatsApp Status", readonly=True)
+    wa_status_date = fields.Datetime(string="WhatsApp Status Date", readonly=True)
 
     @api.depends('message_type')
     def _comput_message_direction(self):
@@ -46,34 +55,62 @@ class MailMessage(models.Model):
     @api.model_create_multi
     def create(self, values_list):
         messages = super(MailMessage, self).create(values_list)
-        # Skip WA sending if explicitly requested (e.g., inbound webhook posts)
-        if self.env.context.get('wa_skip_send'):
+
+        # Fast path: create roda para toda mensagem do banco (chatter de vendas,
+        # contabilidade...); um teste de pertinência no conjunto cacheado de
+        # canais WA descarta as demais sem ler discuss.channel.
+        channel_messages = [message for message in messages
+                            if message.model == 'discuss.channel' and message.res_id]
+        if not channel_messages:
             return messages
+        wa_channel_ids = self.env['discuss.channel']._wa_filter_channel_ids(
+            {message.res_id for message in channel_messages})
+        candidate_ids = [message.id for message in channel_messages if message.res_id in wa_channel_ids]
+        if not candidate_ids:
+            return messages
+        candidates = self.browse(candidate_ids)
+        self.env['discuss.channel'].sudo()._wa_update_last_message(candidates)
+        # Skip WA sending if explicitly requested (e.g., inbound webhook posts)
+        if not self.env.context.get('wa_skip_send'):
+            candidates._wa_send_outbound()
+        return messages
 
+    def _wa_preview(self):
+        """Texto curto da mensagem para a lista de conversas."""
+        self.ensure_one()
+        text = ' '.join((_html2plaintext(self.body or '') or '').split())
+        if not text and self.attachment_ids:
+            text = ', '.join(self.attachment_ids.mapped('name'))
+        return text[:PREVIEW_SIZE]
+
+    def _wa_send_outbound(self):
+        """
+        Envia as mensagens (todas de canais WA) pelo provider, em um
+        send_batch por conta.
+        """
         subtype_comment = self.env.ref('mail.mt_comment', raise_if_not_found=False)
-        for message in messages:
-            # Only handle messages posted on discuss.channel
-            if message.model != 'discuss.channel' or not message.res_id:
-                continue
+        ctx_acc = self.env.context.get('wa_account_id')
+        # Use sudo to avoid ACL errors when checking the channel, and ensure it exists
+        channels = self.env['discuss.channel'].sudo().browse(set(self.mapped('res_id'))).exists()
+        channels_by_id = {channel.id: channel for channel in channels}
+
+        # {account: [(message, item)]}, na ordem de criação
+        batches = {}
+        for message in self:
             # Only send for allowed message types (comment or whatsapp)
             if message.message_type not in ('comment', 'whatsapp'):
                 continue
             # Only send plain comments, ignore join/leave and other system subtypes
             if subtype_comment and message.subtype_id and message.subtype_id.id != subtype_comment.id:
                 continue
-            # Use sudo to avoid ACL errors when checking the channel, and ensure it exists
-            channel = self.env['discuss.channel'].sudo().browse(message.res_id)
-            if not channel.exists():
-                continue
-            # Only send WA for WA-enabled channels
-            if not channel.is_wa:
+            channel = channels_by_id.get(message.res_id)
+            if not channel or not channel.is_wa:
                 continue
             # Require an account to send
-            account = channel.wa_account_id if 'wa_account_id' in channel._fields else None
+            account = channel.wa_account_id
             if not account:
                 continue
             # Ensure the account-owner consistency if present in context (optional safety)
-            ctx_acc = self.env.context.get('wa_account_id')
             if ctx_acc and int(ctx_acc) != account.id:
                 continue
             # Determine direction: if the author is the WA partner, it's inbound; do not re-send
@@ -81,91 +118,55 @@ class MailMessage(models.Model):
                 message.message_derection = 'input'
                 continue
 
-            # Outbound from Odoo to WA: send through account/provider
+            mobile = channel.wa_partner_id.mobile
+            # Convert HTML body to plaintext
+            plain = (_html2plaintext(message.body or '') or '').strip()
+            entries = batches.setdefault(account, [])
+            if message.parent_id and message.parent_id.wa_message_id:
+                # Se for reply, o provider pode tratar reply threading
+                entries.append((message, {'mobile': mobile, 'message': plain,
+                                          'reply_to': message.parent_id.wa_message_id}))
+            elif message.attachment_ids:
+                for attachment in message.attachment_ids:
+                    entries.append((message, {
+                        'mobile': mobile,
+                        'message': plain,
+                        'b64': attachment.datas,
+                        'mime': attachment.mimetype or 'application/octet-stream',
+                        'filename': attachment.name,
+                    }))
+            elif plain:
+                entries.append((message, {'mobile': mobile, 'message': plain}))
+
+        for account, entries in batches.items():
             try:
-                # Convert HTML body to plaintext
-                plain = (_html2plaintext(message.body or '') or '').strip()
-                reply_to_wa_id = None
-                if message.parent_id and message.parent_id.wa_message_id:
-                    reply_to_wa_id = message.parent_id.wa_message_id
-                if reply_to_wa_id:
-                    # Se for reply, use send_reply (provider pode tratar reply threading)
-                    response = account.send_reply(
-                        mobile=channel.wa_partner_id.mobile,
-                        message=plain,
-                        reply_to=reply_to_wa_id,
-                    )
-                    print('WA SEND_REPLY RESPONSE:', response)
-                    message.message_derection = 'output'
-                    try:
-                        wa_id = (
-                            response.get('id')
-                            or response.get('message_id')
-                            or (response.get('raw') or {}).get('id')
-                            or (response.get('raw') or {}).get('message_id')
-                        )
-                        if not wa_id:
-                            raw = response.get('raw') or {}
-                            key = raw.get('key') if isinstance(raw, dict) else None
-                            if key and isinstance(key, dict):
-                                wa_id = key.get('id')
-                        message.wa_message_id = wa_id
-                    except Exception:
-                        pass
-                elif message.attachment_ids:
-                    for attachment in message.attachment_ids:
-                        response = account.send_media(
-                            mobile=channel.wa_partner_id.mobile,
-                            caption=plain,
-                            b64=attachment.datas,
-                            mime=attachment.mimetype or 'application/octet-stream',
-                            filename=attachment.name,
-                        )
-                        print('WA SEND_MEDIA RESPONSE:', response)
-                        message.message_derection = 'output'
-                        try:
-                            wa_id = (
-                                response.get('id')
-                                or response.get('message_id')
-                                or (response.get('raw') or {}).get('id')
-                                or (response.get('raw') or {}).get('message_id')
-                            )
-                            if not wa_id:
-                                raw = response.get('raw') or {}
-                                key = raw.get('key') if isinstance(raw, dict) else None
-                                if key and isinstance(key, dict):
-                                    wa_id = key.get('id')
-                            message.wa_message_id = wa_id
-                        except Exception:
-                            pass
-                else:
-                    if not plain:
-                        continue
-                    response = account.send_text(
-                        mobile=channel.wa_partner_id.mobile,
-                        message=plain,
-                    )
-                    print('WA SEND_TEXT RESPONSE:', response)
-                    message.message_derection = 'output'
-                    try:
-                        wa_id = (
-                            response.get('id')
-                            or response.get('message_id')
-                            or (response.get('raw') or {}).get('id')
-                            or (response.get('raw') or {}).get('message_id')
-                        )
-                        if not wa_id:
-                            raw = response.get('raw') or {}
-                            key = raw.get('key') if isinstance(raw, dict) else None
-                            if key and isinstance(key, dict):
-                                wa_id = key.get('id')
-                        message.wa_message_id = wa_id
-                    except Exception:
-                        pass
-            except Exception:
+                # Faixa interactive, sem rate limit: mensagens do chat passam na frente de envios em massa
+                results = account.send_batch([item for _message, item in entries], rate_limit=0, lane='interactive')
+            except Exception as e:
                 # swallow WA send errors to not break core message creation
+                _logger.error(f"[WA] Failed to send messages for account {account.id}: {e}")
                 continue
-        return messages
+            for (message, item), response in zip(entries, results):
+                if account.debug_capture:
+                    kind = 'send_media' if item.get('b64') else 'send_reply' if item.get('reply_to') else 'send_text'
+                    account._debug_capture('response', response, label=kind)
+                message.message_derection = 'output'
+                wa_id = self._wa_response_id(response)
+                if wa_id:
+                    message.write({'wa_message_id': wa_id, 'wa_delivery_status': 'sent'})
+                elif not response.get('ok'):
+                    message.wa_delivery_status = 'failed'
+
+    @api.model
+    def _wa_response_id(self, response):
+        """Id da mensagem no WhatsApp a partir da resposta do provider."""
+        if not isinstance(response, dict):
+            return None
+        raw = response.get('raw') if isinstance(response.get('raw'), dict) else {}
+        wa_id = response.get('id') or response.get('message_id') or raw.get('id') or raw.get('message_id')
+        if not wa_id and isinstance(raw.get('key'), dict):
+            wa_id = raw['key'].get('id')
+        return wa_id
 
 
     def _message_reaction(self, content, action, partner, guest, store=None):
@@ -181,7 +182,7 @@ class MailMessage(models.Model):
                         'id': self.wa_message_id,
                         'fromMe': False,
                     }
-                    print('DEBUG: _message_reaction WhatsApp', key, content, action)
+                    _logger.debug(f"[WA] _message_reaction key={key} content={content} action={action}")
                     if action == 'add':
                         account.send_reaction(key, content)
                     elif action == 'remove':
@@ -0,0 +1,377 @@
+"""
+Registry de adapters de provider.
+
+Cada plugin registra uma classe stateless para a sua chave de provider:
+
+    from odoo.addons.wa_conn.models.provider import ProviderAdapter, register_provider
+
+    @register_provider('evolution')
+    class EvolutionAdapter(ProviderAdapter):
+        def build_text_request(self, account, mobile, message):
+            return SendRequest('POST', url, {'json': {...}, 'headers': ...}, ('id',))
+
+wa.account resolve o adapter pela chave do campo ``provider`` (um lookup de
+dict) e delega todos os métodos de integração para ele, recebendo o registro
+da conta como primeiro argumento. Assim adicionar um provider é escrever um
+adapter, sem sobrescrever os métodos de wa.account em cadeia.
+"""
+import logging
+import time
+from collections import namedtuple
+
+from odoo import _
+
+from ..tools import metrics
+from ..tools.transport import get_sync_transport
+
+_logger = logging.getLogger(__name__)
+
+# Requisição HTTP pronta para execução fora do ORM
+SendRequest = namedtuple('SendRequest', ['method', 'url', 'kwargs', 'id_keys'])
+
+# {provider_key: adapter instance}
+_ADAPTERS = {}
+
+IMAGE_EXTS = ('jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp')
+VIDEO_EXTS = ('mp4', 'avi', 'mov', 'wmv', 'flv', 'mkv', 'webm')
+AUDIO_EXTS = ('mp3', 'ogg', 'wav', 'aac', 'flac', 'm4a', 'opus')
+MIME_MAP = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+    'pdf': 'application/pdf',
+    'doc': 'application/msword',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'xls': 'application/vnd.ms-excel',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'mp3': 'audio/mpeg',
+    'mp4': 'video/mp4',
+    'txt': 'text/plain',
+    'zip': 'application/zip',
+}
+
+
+def register_provider(key, label=None):
+    """Decorator que registra um adapter para a chave de provider."""
+    def decorator(cls):
+        cls.key = key
+        cls.label = label or cls.label or key
+        if key in _ADAPTERS and type(_ADAPTERS[key]) is not cls:
+            _logger.info(f"Provider adapter '{key}' replaced by {cls.__name__}")
+        _ADAPTERS[key] = cls()
+        return cls
+    return decorator
+
+
+def get_adapter(key):
+    """Retorna o adapter registrado para a chave ou None."""
+    return _ADAPTERS.get(key)
+
+
+def registered_providers():
+    """Lista [(key, label)] dos adapters registrados."""
+    return [(key, adapter.label) for key, adapter in _ADAPTERS.items()]
+
+
+class ProviderAdapter:
+    """
+    Integração de um provider WhatsApp.
+
+    Os adapters não guardam estado: toda configuração vem do registro
+    wa.account recebido em cada chamada. Os métodos de envio retornam
+    ``{'ok', 'id', 'raw', 'status_code'}`` ou ``{'ok': False, 'error', 'status_code': 0}``.
+    """
+    key = None
+    label = None
+
+    # ==================== HELPERS ====================
+    def headers(self, account, **kwargs):
+        return {'Content-Type': 'application/json'}
+
+    def fmt_number(self, account, mobile):
+        m = str(mobile or '').strip().lstrip('+')
+        return m or None
+
+    def get_media_type(self, account, filename):
+        if not filename:
+            return 'document'
+        ext = filename.lower().rsplit('.', 1)[-1] if '.' in filename else ''
+        if ext in IMAGE_EXTS:
+            return 'image'
+        if ext in VIDEO_EXTS:
+            return 'video'
+        if ext in AUDIO_EXTS:
+            return 'audio'
+        return 'document'
+
+    def get_mime_type(self, account, filename):
+        if not filename:
+            return 'application/octet-stream'
+        ext = filename.lower().rsplit('.', 1)[-1] if '.' in filename else ''
+        return MIME_MAP.get(ext, 'application/octet-stream')
+
+    def request(self, method, url, *, timeout=20, **kwargs):
+        """Executa a requisição HTTP (ponto único de transporte síncrono dos adapters)."""
+        with metrics.timed('provider.http', self.key):
+            return get_sync_transport().request(method, url, timeout=timeout, **kwargs)
+
+    def parse_response(self, resp, id_keys=('id', 'message_id')):
+        """Converte a resposta HTTP no dicionário de resultado padrão."""
+        try:
+            data = resp.json()
+        except Exception:
+            data = {'text': resp.text}
+        if not isinstance(data, dict):
+            data = {'data': data}
+        return {
+            'ok': 200 <= resp.status_code < 300,
+            'id': next((data[k] for k in id_keys if data.get(k)), None),
+            'raw': data,
+            'status_code': resp.status_code,
+        }
+
+    def send_request(self, method, url, *, id_keys=('id', 'message_id'), **kwargs):
+        """Requisição de envio: nunca levanta exceção, retorna o resultado padrão."""
+        try:
+            resp = self.request(method, url, **kwargs)
+        except Exception as e:
+            _logger.error(f"[{self.key}] {method} {url} failed: {e}")
+            return {'ok': False, 'error': str(e), 'status_code': 0}
+        return self.parse_response(resp, id_keys=id_keys)
+
+    # ==================== INBOUND ====================
+    def normalize_inbound(self, account, raw, request=None):
+        """Normaliza o payload bruto do webhook em uma lista de NormalizedPayload."""
+        raise NotImplementedError(f"Provider '{self.key}' must implement normalize_inbound()")
+
+    def check_numbers(self, account, numbers):
+        """
+        {number: bool} indicando quais números têm WhatsApp (ver
+        wa.number.check). Sem endpoint no provider: NotImplementedError, e os
+        destinatários não são filtrados.
+        """
+        raise NotImplementedError(f"Provider '{self.key}' does not implement check_numbers()")
+
+    def normalize_receipts(self, account, raw):
+        """
+        Recibos de entrega/leitura do payload (lista de dto.DeliveryReceipt).
+        Payloads que não são recibos retornam [] e seguem o pipeline normal.
+        """
+        return []
+
+    def accepts_event(self, account, event):
+        """Indica se o evento normalizado gera mensagem no Odoo."""
+        return True
+
+    def get_reply_to(self, account, payload):
+        """Retorna o wa_message_id citado quando a mensagem é um reply."""
+        return None
+
+    def inbound_handle(self, account, raw, request=None):
+        """Pipeline padrão: normaliza e cria parceiro, canal e mensagem para cada item."""
+        receipts = account.normalize_receipts(raw)
+        if receipts:
+            with metrics.timed('inbound.receipts', self.key, account.id):
+                updated = account.env['wa.receipt'].sudo()._apply(account, receipts)
+            return {'status': 'receipts', 'count': len(receipts), 'updated': updated}
+        with metrics.timed('inbound.normalize', self.key, account.id):
+            items = account.normalize_inbound(raw, request=request) or []
+        if not isinstance(items, list):
+            items = [items]
+        if not items:
+            return {'status': 'ignored', 'reason': 'empty'}
+        return {'results': [self.inbound_handle_one(account, item) for item in items]}
+
+    def inbound_handle_one(self, account, payload):
+        event = (getattr(payload, 'event', '') or '').lower()
+        if not self.accepts_event(account, event):
+            return {'status': 'ignored', 'event': event or None}
+        mobile = (getattr(payload, 'mobile', '') or '').strip()
+        if not mobile:
+            return {'status': 'ignored', 'reason': 'no_mobile'}
+
+        env = account.env
+        labels = (self.key, account.id)
+        push_name = getattr(payload, 'push_name', None)
+        from_me = getattr(payload, 'from_me', False)
+        # Só passa push_name se não for from_me
+        with metrics.timed('inbound.partner', *labels):
+            partner = env['res.partner'].sudo().wa_get_or_create_by_mobile(
+                mobile, name=push_name if not from_me else None)
+
+        if not from_me:
+            # STOP/START e afins: registra o opt-out; a mensagem segue para o canal normalmente
+            env['wa.optout'].sudo()._handle_keyword(mobile, getattr(payload, 'message', ''), partner)
+
+        with metrics.timed('inbound.reaction', *labels):
+            is_reaction = account.inbound_handle_reaction(payload, partner)
+        if is_reaction:
+            return {'status': 'reaction', 'mobile': mobile}
+        if self.get_reply_to(account, payload):
+            with metrics.timed('inbound.reply', *labels):
+                reply = account.inbound_handle_reply(payload, partner)
+            return {'status': 'reply', 'mobile': mobile,
+                    'msg_id': reply.get('msg_id'), 'parent_id': reply.get('parent_id')}
+
+        if not from_me and (partner.name or '').strip() == (partner.mobile or '').strip():
+            partner.sudo().wa_update_names_from_push(mobile, push_name)
+        if from_me and partner and (partner.name == _('WhatsApp Contact') or not partner.name):
+            partner.sudo().write({'name': mobile})
+
+        with metrics.timed('inbound.channel', *labels):
+            channel = self.get_channel(account, partner)
+        with metrics.timed('inbound.avatar', *labels):
+            self.update_avatar(account, payload, partner, channel)
+
+        mid = getattr(payload, 'message_id', None)
+        if mid:
+            with metrics.timed('inbound.dedupe', *labels):
+                existing = env['mail.message'].sudo().search([
+                    ('model', '=', 'discuss.channel'),
+                    ('res_id', '=', channel.id),
+                    ('wa_message_id', '=', mid),
+                ], limit=1)
+            if existing:
+                return {'status': 'duplicate', 'channel_id': channel.id, 'msg_id': existing.id}
+        with metrics.timed('inbound.post', *labels):
+            msg = channel.wa_post_incoming(payload, partner)
+        return {'status': 'ok', 'channel_id': channel.id, 'msg_id': msg.id if msg else False}
+
+    def get_channel(self, account, partner):
+        Channel = account.env['discuss.channel'].sudo()
+        try:
+            return partner.wa_get_or_create_channel(account=account)
+        except Exception:
+            domain = [('is_wa', '=', True), ('wa_partner_id', '=', partner.id), ('wa_account_id', '=', account.id)]
+            channel = Channel.search(domain, limit=1)
+            if not channel:
+                channel = Channel.create({
+                    'name': partner.name,
+                    'channel_type': 'channel',
+                    'is_wa': True,
+                    'wa_partner_id': partner.id,
+                    'wa_account_id': account.id,
+                })
+            return channel
+
+    def update_avatar(self, account, payload, partner, channel):
+        """Atualiza imagem do parceiro/canal com a foto de perfil, se o provider suportar."""
+        try:
+            rjid = getattr(payload, 'remote_jid', None) or getattr(payload, 'mobile', None)
+            img_b64 = account.get_profile_image(rjid)
+            if not img_b64:
+                return
+            if isinstance(img_b64, (bytes, bytearray)):
+                img_b64 = img_b64.decode()
+            if not partner.image_1920:
+                partner.sudo().write({'image_1920': img_b64})
+            vals_img = {}
+            if 'avatar_128' in channel._fields:
+                vals_img['avatar_128'] = img_b64
+            if 'image_128' in channel._fields:
+                vals_img['image_128'] = img_b64
+            if vals_img:
+                channel.sudo().write(vals_img)
+        except Exception:
+            pass
+
+    def inbound_handle_reaction(self, account, payload, partner):
+        """Processa reação; retorna True se o payload era uma reação."""
+        return False
+
+    def inbound_handle_reply(self, account, payload, partner):
+        raise NotImplementedError(f"Provider '{self.key}' must implement inbound_handle_reply()")
+
+    # ==================== OUTBOUND ====================
+    # Os envios são feitos em duas etapas: build_*_request lê a conta (ORM) e
+    # monta um SendRequest; execute() só faz o HTTP e pode rodar em threads
+    # (usado por wa.account.send_batch).
+
+    def build_text_request(self, account, mobile, message):
+        raise NotImplementedError(f"Provider '{self.key}' must implement build_text_request()")
+
+    def build_media_request(self, account, mobile, *, caption='', b64=None, mime=None, filename=None):
+        raise NotImplementedError(f"Provider '{self.key}' must implement build_media_request()")
+
+    def build_reply_request(self, account, mobile, message, reply_to=None, quoted_message=None):
+        # Sem suporte a reply: envia como texto simples
+        return self.build_text_request(account, mobile, message)
+
+    def build_request(self, account, item):
+        """Monta o request de um item normalizado de send_batch."""
+        if item.get('b64'):
+            return self.build_media_request(
+                account, item['mobile'], caption=item.get('message') or '', b64=item['b64'],
+                mime=item.get('mime'), filename=item.get('filename'))
+        if item.get('reply_to'):
+            return self.build_reply_request(
+                account, item['mobile'], item.get('message'),
+                reply_to=item['reply_to'], quoted_message=item.get('quoted_message'))
+        return self.build_text_request(account, item['mobile'], item.get('message'))
+
+    def execute(self, req, account_id=0):
+        """Executa um SendRequest; um dict (erro de validação) é retornado como está."""
+        if isinstance(req, dict):
+            return req
+        start = time.perf_counter()
+        result = self.send_request(req.method, req.url, id_keys=req.id_keys, **req.kwargs)
+        metrics.observe('provider.send', (time.perf_counter() - start) * 1000,
+                        self.key, account_id, error=not result.get('ok'))
+        return result
+
+    async def execute_async(self, req, transport, account_id=0):
+        """Como execute(), pelo AsyncTransport (roda no event loop do transporte)."""
+        if isinstance(req, dict):
+            return req
+        start = time.perf_counter()
+        try:
+            resp = await transport.arequest(req.method, req.url, **req.kwargs)
+        except Exception as e:
+            _logger.error(f"[{self.key}] {req.method} {req.url} failed: {e!r}")
+            result = {'ok': False, 'error': str(e) or repr(e), 'status_code': 0}
+        else:
+            result = self.parse_response(resp, id_keys=req.id_keys)
+        metrics.observe('provider.send', (time.perf_counter() - start) * 1000,
+                        self.key, account_id, error=not result.get('ok'))
+        return result
+
+    def send_text(self, account, mobile, message):
+        return self.execute(self.build_text_request(account, mobile, message), account.id)
+
+    def send_media(self, account, mobile, *, caption='', b64=None, mime=None, filename=None):
+        return self.execute(self.build_media_request(
+            account, mobile, caption=caption, b64=b64, mime=mime, filename=filename), account.id)
+
+    def send_reply(self, account, mobile, message, reply_to=None, quoted_message=None):
+        return self.execute(self.build_reply_request(
+            account, mobile, message, reply_to=reply_to, quoted_message=quoted_message), account.id)
+
+    def send_reaction(self, account, key, reaction):
+        raise NotImplementedError(f"Provider '{self.key}' must implement send_reaction()")
+
+    # ==================== INSTÂNCIA ====================
+    def create_instance(self, account):
+        raise NotImplementedError(f"Provider '{self.key}' must implement create_instance()")
+
+    def delete_instance(self, account):
+        raise NotImplementedError(f"Provider '{self.key}' must implement delete_instance()")
+
+    def check_status(self, account):
+        raise NotImplementedError(f"Provider '{self.key}' must implement check_status()")
+
+    def connect(self, account):
+        raise NotImplementedError(f"Provider '{self.key}' must implement connect()")
+
+    def restart(self, account):
+        raise NotImplementedError(f"Provider '{self.key}' must implement restart()")
+
+    def disconnect(self, account):
+        raise NotImplementedError(f"Provider '{self.key}' must implement disconnect()")
+
+    def refresh_qrcode(self, account):
+        return self.connect(account)
+
+    def get_profile_image(self, account, remote_jid=None):
+        return False
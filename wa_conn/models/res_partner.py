@@ -1,4 +1,7 @@
 from odoo import api, fields, models, _
+import logging
+
+_logger = logging.getLogger(__name__)
 
 
 class ResPartner(models.Model):
@@ -71,13 +74,13 @@ class ResPartner(models.Model):
         Channel = self.env['discuss.channel'].sudo()
         # Atualiza partner(s) com name == mobile
         partners = Partner.search([('mobile', '=', mobile), ('name', '=', mobile)])
-        print(f"[WA DEBUG] Partners encontrados para mobile={mobile}: {[p.id for p in partners]}")
+        _logger.debug(f"[WA] Partners encontrados para mobile={mobile}: {[p.id for p in partners]}")
         for partner in partners:
             try:
                 partner.write({'name': name.strip()})
-                print(f"[WA DEBUG] Partner {partner.id} atualizado para name={name.strip()}")
+                _logger.debug(f"[WA] Partner {partner.id} atualizado para name={name.strip()}")
             except Exception as e:
-                print(f"[WA DEBUG] Falha ao atualizar partner {partner.id}: {e}")
+                _logger.warning(f"[WA] Falha ao atualizar partner {partner.id}: {e}")
         # Atualiza canais com name == mobile e wa_partner_id correto
         for partner in partners:
             channels = Channel.search([
@@ -85,11 +88,11 @@ class ResPartner(models.Model):
                 ('is_wa', '=', True),
                 ('name', '=', mobile)
             ])
-            print(f"[WA DEBUG] Canais encontrados para partner {partner.id} e name={mobile}: {[c.id for c in channels]}")
+            _logger.debug(f"[WA] Canais encontrados para partner {partner.id} e name={mobile}: {[c.id for c in channels]}")
             for channel in channels:
                 try:
                     channel.write({'name': name.strip()})
-                    print(f"[WA DEBUG] Canal {channel.id} atualizado para name={name.strip()}")
+                    _logger.debug(f"[WA] Canal {channel.id} atualizado para name={name.strip()}")
                 except Exception as e:
-                    print(f"[WA DEBUG] Falha ao atualizar canal {channel.id}: {e}")
+                    _logger.warning(f"[WA] Falha ao atualizar canal {channel.id}: {e}")
         return True
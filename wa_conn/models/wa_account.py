@@ -1,10 +1,22 @@
 from odoo import _, api, fields, models
+from functools import partial
+import asyncio
+import random
 import uuid
 import secrets
 import logging
 
+from . import provider as provider_registry
+from ..tools import metrics, optout
+from ..tools.resilience import BREAKER, circuit_open_result
+from ..tools.send_batch import RateLimiter, get_budget, get_limiter, run_batch, run_batch_async
+from ..tools.transport import get_async_transport
+
 _logger = logging.getLogger(__name__)
 
+# Campos lidos pelo gateway de webhooks (tools/webhook_gateway.py)
+WEBHOOK_FIELDS = {'name', 'webhook_key', 'webhook_uuid'}
+
 
 class WAAccount(models.Model):
     """
@@ -82,148 +94,449 @@ class WAAccount(models.Model):
         help="UUID único do webhook."
     )
 
+    # Envio em lote (send_batch)
+    send_concurrency = fields.Integer(
+        string="Send Concurrency",
+        default=4,
+        help="Maximum number of parallel HTTP requests used by batch sends. "
+             "Messages to the same recipient are always sent in order."
+    )
+    send_rate_limit = fields.Float(
+        string="Rate Limit (msg/s)",
+        default=0.0,
+        help="Maximum messages per second for batch sends (0 = unlimited)."
+    )
+    bulk_concurrency = fields.Integer(
+        string="Campaign Concurrency",
+        default=2,
+        help="Maximum parallel requests used by campaigns (mass sends and the send queue). "
+             "At least one of the Send Concurrency slots is always kept free for replies "
+             "and transactional messages, which also go ahead of waiting campaign messages."
+    )
+    bulk_rate_limit = fields.Float(
+        string="Campaign Rate Limit (msg/s)",
+        default=0.0,
+        help="Maximum messages per second for campaigns (0 = same as Rate Limit)."
+    )
+
+    # Captura de debug (wa.debug.capture), desligada por padrão
+    debug_capture = fields.Boolean(
+        string="Debug Capture",
+        default=False,
+        help="Store a sample of recent webhook payloads, inbound messages and send "
+             "responses for this account (Settings > Debug Captures)."
+    )
+    debug_sample_rate = fields.Float(
+        string="Sample Rate",
+        default=1.0,
+        help="Fraction of payloads captured (1.0 = all, 0.1 = one in ten)."
+    )
+    debug_capture_limit = fields.Integer(
+        string="Keep Last",
+        default=200,
+        help="Number of captures kept for this account; older ones are deleted."
+    )
+    debug_max_string = fields.Integer(
+        string="Max String Length",
+        default=256,
+        help="Longer strings (e.g. base64 media) are truncated before being stored."
+    )
+    debug_max_bytes = fields.Integer(
+        string="Max Payload Size",
+        default=16384,
+        help="Maximum size of each stored payload, in characters."
+    )
+
     # ==================== INTERFACE DE INTEGRAÇÃO ====================
-    # Cada tipo/provider deve sobrescrever estes métodos via herança
-    
+    # Cada plugin registra um ProviderAdapter (ver models/provider.py) para a
+    # sua chave de provider; estes métodos apenas delegam para o adapter.
+
+    def _provider_adapter(self):
+        """
+        Retorna o adapter registrado para o provider desta account.
+        Resolução O(1) pela chave do provider, sem percorrer o MRO.
+        """
+        self.ensure_one()
+        adapter = provider_registry.get_adapter(self.provider)
+        if adapter is None:
+            raise NotImplementedError(
+                f"No adapter registered for provider '{self.provider}'. "
+                f"Account: {self.name} (ID: {self.id})"
+            )
+        return adapter
+
+    @api.model
+    def _get_available_providers(self):
+        """Providers com adapter registrado: [(key, label)]"""
+        return provider_registry.registered_providers()
+
+    def _headers(self, **kwargs):
+        return self._provider_adapter().headers(self, **kwargs)
+
+    def _fmt_number(self, mobile):
+        return self._provider_adapter().fmt_number(self, mobile)
+
+    def _get_media_type(self, filename):
+        return self._provider_adapter().get_media_type(self, filename)
+
+    def _get_mime_type(self, filename):
+        return self._provider_adapter().get_mime_type(self, filename)
+
     def normalize_inbound(self, raw, request=None):
         """
         Normaliza o payload bruto do webhook para um formato padronizado (DTO).
-        Deve ser sobrescrito por cada tipo/provider.
         """
-        raise NotImplementedError(
-            f"Provider '{self.provider}' must implement normalize_inbound() method. "
-            f"Account: {self.name} (ID: {self.id})"
-        )
+        return self._provider_adapter().normalize_inbound(self, raw, request=request)
+
+    def check_numbers(self, numbers):
+        """{number: bool} consultando o provider; prefira wa.number.check._lookup (com cache)."""
+        return self._provider_adapter().check_numbers(self, numbers)
+
+    def normalize_receipts(self, raw):
+        """Recibos de entrega/leitura contidos no payload bruto (ou [])."""
+        return self._provider_adapter().normalize_receipts(self, raw)
 
     def inbound_handle(self, raw, request=None):
         """
         Processa o webhook completo: normaliza + cria registros no Odoo.
-        Deve ser sobrescrito por cada tipo/provider.
         """
-        raise NotImplementedError(
-            f"Provider '{self.provider}' must implement inbound_handle() method. "
-            f"Account: {self.name} (ID: {self.id})"
-        )
-    
+        adapter = self._provider_adapter()
+        with metrics.timed('inbound.total', adapter.key, self.id):
+            result = adapter.inbound_handle(self, raw, request=request)
+        self.env['wa.metrics']._flush_if_due()
+        return result
+
     def inbound_handle_reaction(self, dto, partner):
         """
-        Processa uma reação recebida (reactionMessage) de um provedor WhatsApp.
-        Deve ser sobrescrito por cada provider.
+        Processa uma reação recebida. Retorna True se o payload era uma reação.
         """
-        raise NotImplementedError("Account type must implement inbound_handle_reaction() for reactions.")
-    
+        return self._provider_adapter().inbound_handle_reaction(self, dto, partner)
+
     def inbound_handle_reply(self, dto, partner):
         """
         Processa uma resposta (reply) recebida de um provedor WhatsApp.
-        Deve ser sobrescrito por cada provider.
         Args:
             dto: DTO normalizado da mensagem recebida.
             partner: res.partner correspondente ao remetente.
         """
-        raise NotImplementedError("Account type must implement inbound_handle_reply() for replies.")
+        return self._provider_adapter().inbound_handle_reply(self, dto, partner)
 
     def send_text(self, mobile, message):
         """
         Envia uma mensagem de texto.
-        Deve ser sobrescrito por cada tipo/provider.
         """
-        _logger.info(f"[wa_account.send_text] Account: {self.name}, Provider: {self.provider}")
-        _logger.info(f"[wa_account.send_text] Class: {self.__class__.__name__}")
-        _logger.info(f"[wa_account.send_text] MRO: {[c.__name__ for c in self.__class__.__mro__]}")
-        
-        raise NotImplementedError(
-            f"Provider '{self.provider}' must implement send_text() method. "
-            f"Account: {self.name} (ID: {self.id})"
-        )
+        return self._optout_check(mobile) or \
+            self._provider_call(lambda adapter: adapter.send_text(self, mobile, message))
 
     def send_media(self, mobile, *, caption='', b64=None, mime=None, filename=None):
         """
         Envia uma mensagem com mídia (imagem, vídeo, documento, áudio).
-        Deve ser sobrescrito por cada tipo/provider.
         """
-        _logger.info(f"[wa_account.send_media] Account: {self.name}, Provider: {self.provider}")
-        _logger.info(f"[wa_account.send_media] Class: {self.__class__.__name__}")
-        
-        raise NotImplementedError(
-            f"Provider '{self.provider}' must implement send_media() method. "
-            f"Account: {self.name} (ID: {self.id})"
-        )
-    
+        return self._optout_check(mobile) or self._provider_call(lambda adapter: adapter.send_media(
+            self, mobile, caption=caption, b64=b64, mime=mime, filename=filename))
+
     def send_reaction(self, key, reaction):
         """
-        Envia uma reação para uma mensagem (abstrato).
-        Deve ser sobrescrito por cada tipo/provider.
+        Envia uma reação para uma mensagem.
         Args:
             key (dict): Deve conter 'remoteJid', 'id' e 'fromMe'.
             reaction (str): Emoji da reação (ex: '🚀').
         """
-        raise NotImplementedError(
-            f"Provider '{self.provider}' must implement send_reaction() method. "
-            f"Account: {self.name} (ID: {self.id})"
-        )
-    
-    def send_reply(self, mobile, message, reply_to=None):
+        return self._provider_call(lambda adapter: adapter.send_reaction(self, key, reaction))
+
+    def send_reply(self, mobile, message, reply_to=None, quoted_message=None):
         """
         Envia uma mensagem de texto em resposta a outra mensagem (reply threading).
-        Deve ser sobrescrito por cada tipo/provider.
         Args:
             mobile (str): Número do destinatário.
             message (str): Texto da mensagem.
             reply_to (str|None): ID da mensagem a ser referenciada como reply (ex: wa_message_id).
+            quoted_message (str|None): Conteúdo da mensagem original (preview).
         """
-        raise NotImplementedError(
-            f"Provider '{self.provider}' must implement send_reply() method. "
-            f"Account: {self.name} (ID: {self.id})"
-        )
+        return self._optout_check(mobile) or self._provider_call(lambda adapter: adapter.send_reply(
+            self, mobile, message, reply_to=reply_to, quoted_message=quoted_message))
 
-    def create_instance(self):
+    def send_batch(self, messages, concurrency=None, rate_limit=None, delay=None, lane='transactional'):
         """
-        Cria uma instância no provider.
-        Deve ser sobrescrito por cada tipo/provider.
+        Envia várias mensagens com concorrência limitada.
+
+        Os requests são montados na thread atual (acesso ao ORM) e apenas o
+        HTTP roda em paralelo: no transporte asyncio quando aiohttp/httpx
+        estão instalados, senão num pool de threads. Mensagens para o mesmo
+        número são enviadas em sequência, na ordem da lista.
+
+        Args:
+            messages (list): itens (mobile, message, options) ou dicts com as
+                chaves mobile, message, b64, mime, filename, reply_to, quoted_message.
+                ``message`` é o caption quando há mídia (b64).
+            concurrency (int|None): envios simultâneos; padrão send_concurrency da conta.
+            rate_limit (float|None): mensagens/segundo; padrão send_rate_limit.
+            delay (tuple|None): (min, max) segundos entre o início dos envios,
+                sorteado a cada mensagem; substitui rate_limit.
+            lane (str): prioridade do lote: 'interactive' (respostas de agente
+                e bot), 'transactional' (faturas, documentos) ou 'bulk' (campanhas).
+
+        Returns:
+            list: um dict por mensagem, na ordem de entrada, com ok, id, error,
+            status_code, index e mobile.
         """
-        raise NotImplementedError("Account type must implement create_instance()")
+        self.ensure_one()
+        return self._send_batches([(self, messages)], concurrency=concurrency,
+                                  rate_limit=rate_limit, delay=delay, lane=lane)[0]
+
+    @api.model
+    def _send_batches(self, batches, concurrency=None, rate_limit=None, delay=None, lane='transactional'):
+        """
+        send_batch para várias contas de uma vez: [(account, messages)] ou
+        [(account, messages, lane)] -> [results]. Com o transporte asyncio
+        todas as contas compartilham o mesmo event loop, sem uma thread por
+        requisição em andamento.
+        """
+        plans = [account._prepare_batch(messages, concurrency, rate_limit, delay, rest[0] if rest else lane)
+                 for account, messages, *rest in batches]
+        transport = self._get_async_transport()
+        if transport:
+            async def run_all():
+                return await asyncio.gather(*(
+                    run_batch_async(plan['jobs'], BREAKER.guard_async(plan['circuit_key'], plan['budget'].guard_async(
+                                        plan['lane'], partial(plan['adapter'].execute_async, transport=transport,
+                                                              account_id=plan['account_id']),
+                                        on_wait=plan['on_wait'])),
+                                    concurrency=plan['concurrency'], limiter=plan['limiter'])
+                    for plan in plans
+                ))
+            for plan, results in zip(plans, transport.run(run_all())):
+                plan['results'].update(results)
+        else:
+            for plan in plans:
+                plan['results'].update(run_batch(
+                    plan['jobs'], BREAKER.guard(plan['circuit_key'], plan['budget'].guard(
+                        plan['lane'], partial(plan['adapter'].execute, account_id=plan['account_id']),
+                        on_wait=plan['on_wait'])),
+                    concurrency=plan['concurrency'], limiter=plan['limiter'],
+                ))
 
-    def delete_instance(self):
+        output = []
+        for (account, *_rest), plan in zip(batches, plans):
+            account_output = [
+                dict(plan['results'][index], index=index, mobile=item['mobile'])
+                for index, item in enumerate(plan['items'])
+            ]
+            failed = sum(1 for r in account_output if not r.get('ok'))
+            _logger.info(f"[send_batch] Account {account.id}: {len(account_output) - failed} sent, {failed} failed")
+            output.append(account_output)
+        self.env['wa.metrics']._flush_if_due()
+        return output
+
+    def _prepare_batch(self, messages, concurrency=None, rate_limit=None, delay=None, lane='transactional'):
+        """Normaliza os itens e monta os requests (ORM) de um lote desta conta."""
+        self.ensure_one()
+        adapter = self._provider_adapter()
+        results = {}
+        jobs = []
+        items = [self._normalize_batch_item(msg) for msg in messages]
+        circuit_closed = self._circuit_allows()
+        blocked = self.env['wa.optout'].sudo()._blocked_numbers()
+        phone_code = self.env['wa.optout']._phone_code()
+        for index, item in enumerate(items):
+            if not circuit_closed:
+                # Provider fora do ar: falha na hora, sem montar nem enviar
+                results[index] = circuit_open_result()
+                continue
+            if blocked and optout.is_blocked(blocked, item['mobile'], lane, phone_code):
+                results[index] = optout.optout_result()
+                continue
+            try:
+                req = adapter.build_request(self, item)
+            except NotImplementedError:
+                # Adapter sem build_*_request: envio serial pelos métodos send_*
+                results[index] = self.with_context(wa_lane=lane)._send_batch_item(item)
+                continue
+            except Exception as e:
+                _logger.error(f"[send_batch] Failed to build request for {item.get('mobile')}: {e}")
+                results[index] = {'ok': False, 'error': str(e), 'status_code': 0}
+                continue
+            jobs.append((index, self._fmt_number(item['mobile']) or item['mobile'], req))
+
+        if delay:
+            limiter = RateLimiter(interval_range=delay)
+        else:
+            rate = rate_limit
+            if rate is None:
+                rate = (lane == 'bulk' and self.bulk_rate_limit) or self.send_rate_limit
+            # Um limiter por faixa: reservas de uma campanha não atrasam as outras
+            limiter = get_limiter((self.env.cr.dbname, self.id, lane), rate)
+        return {
+            'adapter': adapter,
+            'account_id': self.id,
+            'circuit_key': self._circuit_key(),
+            'lane': lane,
+            'budget': self._lane_budget(),
+            'on_wait': partial(self._observe_lane_wait, lane, adapter.key, self.id),
+            'items': items,
+            'jobs': jobs,
+            'results': results,
+            'limiter': limiter,
+            'concurrency': concurrency or self.send_concurrency or 1,
+        }
+
+    # ==================== CIRCUIT BREAKER ====================
+    def _circuit_key(self):
+        return (self.env.cr.dbname, self.id)
+
+    def _circuit_allows(self):
+        """
+        False enquanto o circuito do provider desta conta estiver aberto.
+        Passado o cooldown, um check_status decide se o circuito fecha.
         """
-        Deleta uma instância no provider.
-        Deve ser sobrescrito por cada tipo/provider.
+        self.ensure_one()
+        key = self._circuit_key()
+        state = BREAKER.state(key)
+        if state == BREAKER.CLOSED:
+            return True
+        if state == BREAKER.OPEN:
+            return False
+        try:
+            with self.env.cr.savepoint():
+                self.check_status()
+            ok = True
+        except Exception as e:
+            _logger.info(f"[circuit] Account {self.id}: provider still unavailable ({e})")
+            ok = False
+        BREAKER.probe_result(key, ok)
+        if ok:
+            _logger.info(f"[circuit] Account {self.id}: provider is back, circuit closed")
+        return ok
+
+    def _pool_available(self):
+        """Contas que podem receber trabalho de um pool: conectadas e com o circuito fechado."""
+        return self.filtered(lambda a: a.state != 'disconnected' and not BREAKER.is_open(a._circuit_key()))
+
+    def _optout_check(self, mobile):
+        """Resultado de falha se o número está bloqueado para a faixa do contexto, senão None."""
+        lane = self.env.context.get('wa_lane') or 'interactive'
+        Optout = self.env['wa.optout'].sudo()
+        if optout.is_blocked(Optout._blocked_numbers(), mobile, lane, Optout._phone_code()):
+            return optout.optout_result()
+        return None
+
+    def _provider_call(self, call):
+        """
+        Chamada avulsa ao adapter, protegida pelo circuit breaker e ocupando
+        uma vaga da faixa do contexto (wa_lane, padrão interactive).
         """
-        raise NotImplementedError("Account type must implement delete_instance()")
+        self.ensure_one()
+        if not self._circuit_allows():
+            return circuit_open_result()
+        adapter = self._provider_adapter()
+        lane = self.env.context.get('wa_lane') or 'interactive'
+        budget = self._lane_budget()
+        self._observe_lane_wait(lane, adapter.key, self.id, budget.acquire(lane))
+        try:
+            result = call(adapter)
+        finally:
+            budget.release(lane)
+        if isinstance(result, dict):
+            BREAKER.record(self._circuit_key(), result)
+        return result
+
+    # ==================== FAIXAS DE PRIORIDADE ====================
+    def _lane_budget(self):
+        """Vagas de envio simultâneo desta conta neste worker (tools/send_batch.LaneBudget)."""
+        self.ensure_one()
+        capacity = max(self.send_concurrency or 1, 1)
+        bulk_limit = min(self.bulk_concurrency or capacity, capacity)
+        if capacity > 1:
+            # Campanhas nunca ocupam todas as vagas
+            bulk_limit = min(bulk_limit, capacity - 1)
+        return get_budget((self.env.cr.dbname, self.id), capacity, max(bulk_limit, 1))
+
+    @staticmethod
+    def _observe_lane_wait(lane, provider, account_id, seconds):
+        # Roda nas threads do lote: só métricas em memória, sem ORM
+        metrics.observe(f'lane.{lane}.wait', seconds * 1000, provider, account_id)
+
+    @api.model
+    def _get_async_transport(self):
+        """AsyncTransport se disponível e não desativado por wa_conn.async_transport = 0."""
+        enabled = self.env['ir.config_parameter'].sudo().get_param('wa_conn.async_transport', '1')
+        if enabled in ('0', 'False', 'false'):
+            return None
+        return get_async_transport()
+
+    @api.model
+    def _normalize_batch_item(self, msg):
+        """Converte (mobile, message, options) ou dict no item padrão de send_batch."""
+        if isinstance(msg, dict):
+            item = dict(msg)
+        else:
+            mobile, message, *rest = msg
+            item = dict(rest[0] if rest and rest[0] else {}, mobile=mobile, message=message)
+        item['mobile'] = str(item.get('mobile') or '').strip()
+        return item
+
+    def _send_batch_item(self, item):
+        if item.get('b64'):
+            return self.send_media(
+                item['mobile'], caption=item.get('message') or '', b64=item['b64'],
+                mime=item.get('mime'), filename=item.get('filename'))
+        if item.get('reply_to'):
+            return self.send_reply(
+                item['mobile'], item.get('message'),
+                reply_to=item['reply_to'], quoted_message=item.get('quoted_message'))
+        return self.send_text(item['mobile'], item.get('message'))
+
+    def create_instance(self):
+        """Cria uma instância no provider."""
+        return self._provider_adapter().create_instance(self)
+
+    def delete_instance(self):
+        """Deleta uma instância no provider."""
+        return self._provider_adapter().delete_instance(self)
 
     def check_status(self):
-        """
-        Verifica o status da conexão.
-        Deve ser sobrescrito por cada tipo/provider.
-        """
-        raise NotImplementedError("Account type must implement check_status()")
+        """Verifica o status da conexão."""
+        return self._provider_adapter().check_status(self)
 
     def connect(self):
-        """
-        Conecta a instância (pode gerar QR code para pareamento).
-        Deve ser sobrescrito por cada tipo/provider.
-        """
-        raise NotImplementedError("Account type must implement connect()")
+        """Conecta a instância (pode gerar QR code para pareamento)."""
+        return self._provider_adapter().connect(self)
 
     def restart(self):
-        """
-        Reinicia a instância.
-        Deve ser sobrescrito por cada tipo/provider.
-        """
-        raise NotImplementedError("Account type must implement restart()")
+        """Reinicia a instância."""
+        return self._provider_adapter().restart(self)
 
     def disconnect(self):
-        """
-        Desconecta/faz logout da instância.
-        Deve ser sobrescrito por cada tipo/provider.
-        """
-        raise NotImplementedError("Account type must implement disconnect()")
+        """Desconecta/faz logout da instância."""
+        return self._provider_adapter().disconnect(self)
+
+    def refresh_qrcode(self):
+        """Atualiza o QR Code."""
+        return self._provider_adapter().refresh_qrcode(self)
 
     def get_profile_image(self, remote_jid=None):
+        """Busca a imagem de perfil de um contato."""
+        return self._provider_adapter().get_profile_image(self, remote_jid)
+
+    # ==================== DEBUG ====================
+    def _debug_capture(self, kind, payload, label=None):
         """
-        Busca a imagem de perfil de um contato.
-        Deve ser sobrescrito por cada tipo/provider.
+        Registra ``payload`` em wa.debug.capture se a captura estiver ligada.
+        Com ela desligada o custo é só a leitura do booleano.
         """
-        raise NotImplementedError("Account type must implement get_profile_image()")
+        if not self or not self.debug_capture:
+            return
+        rate = self.debug_sample_rate
+        if rate < 1.0 and random.random() >= rate:
+            return
+        self.env['wa.debug.capture'].sudo()._capture(self, kind, payload, label=label)
+
+    def action_view_debug_captures(self):
+        self.ensure_one()
+        action = self.env['ir.actions.act_window']._for_xml_id('wa_conn.action_wa_debug_capture')
+        action['domain'] = [('account_id', '=', self.id)]
+        action['context'] = {'default_account_id': self.id}
+        return action
 
     # ==================== WEBHOOK ====================
     def _get_provider(self):
@@ -305,8 +618,16 @@ class WAAccount(models.Model):
             account._create_provider_instance()
             account.message_post(body=_("WhatsApp account '%s' has been created." % account.name))
 
+        self.env['wa.webhook.event']._notify_accounts_changed()
         return accounts
 
+    def write(self, vals):
+        res = super(WAAccount, self).write(vals)
+        # O gateway de webhooks mantém estes campos em cache
+        if WEBHOOK_FIELDS.intersection(vals):
+            self.env['wa.webhook.event']._notify_accounts_changed()
+        return res
+
     def _create_provider_instance(self):
         """
         Cria automaticamente o registro do provider associado.
@@ -317,8 +638,8 @@ class WAAccount(models.Model):
         if not self.provider:
             raise ValueError(_("Provider not specified"))
 
-        # Se o provider for evolution ou quepasa, não há modelo extra, tudo está em wa.account
-        if self.provider in ('evolution', 'quepasa'):
+        # Providers com adapter registrado guardam a configuração na própria wa.account
+        if provider_registry.get_adapter(self.provider):
             return self
 
         provider_model_name = f'wa.provider.{self.provider}'
@@ -357,5 +678,6 @@ class WAAccount(models.Model):
             except Exception:
                 pass
         
+        self.env['wa.webhook.event']._notify_accounts_changed()
         return super(WAAccount, self).unlink()
 
@@ -1,6 +1,15 @@
-from odoo import _, api, fields, models
+from odoo import _, api, fields, models, tools
 import base64
 
+from ..tools import channel_cache, metrics
+
+# Tamanho máximo de wa_last_message_preview
+PREVIEW_SIZE = 120
+# Sequência cujo valor é a geração do cache de canais WA (tools/channel_cache.py)
+GENERATION_SEQUENCE = 'wa_channel_generation'
+# Chave em cr.precommit.data: canais com is_wa alterado na transação corrente
+CHANGED_KEY = 'wa.channel.is_wa_changed'
+
 
 class Channel(models.Model):
     _inherit = 'discuss.channel'
@@ -17,7 +26,7 @@ class Channel(models.Model):
         group_expand='_read_group_stage_ids',
         default=lambda self: self.env.ref('wa_conn.wa_channel_stage_new').id,
     )
-    member_names = fields.Char(string='Members names', compute='_compute_member_names')
+    member_names = fields.Char(string='Members names', compute='_compute_member_names', store=True)
     sequence = fields.Integer(string='Sequence', default=10, index=True, help='Manual ordering within kanban column')
     tag_ids = fields.Many2many(
         'wa.channel.tag',
@@ -30,58 +39,74 @@ class Channel(models.Model):
     note = fields.Html(string="Nota", help="Observações ou anotações do canal.")
     wa_user_ids = fields.Many2many(
         'res.users',
+        'wa_channel_user_rel',
+        'channel_id',
+        'user_id',
         compute='_compute_wa_user_ids',
         string='Usuários do Canal',
-        store=False,
+        store=True,
         help='Usuários (res.users) associados ao canal via membros.'
     )
+    # Última atividade, mantida por _wa_update_last_message a cada mensagem
+    wa_last_message_date = fields.Datetime(string='Last Message', readonly=True, index=True)
+    wa_last_message_preview = fields.Char(string='Last Message Preview', readonly=True)
+    wa_last_direction = fields.Selection(
+        [('input', 'Received'), ('output', 'Sent')],
+        string='Last Direction',
+        readonly=True,
+    )
+    # Mantido por SQL em _wa_bump_unread (incremento atômico) e zerado quando
+    # um usuário entra no canal (discuss.channel.member.create)
     wa_unread_count = fields.Integer(
         string='WA Unread Count',
-        compute='_compute_wa_unread_count',
-        store=True,
+        default=0,
+        readonly=True,
         help='Total de mensagens do canal quando não há user joined.'
     )
     wa_unread_member_count = fields.Integer(string='WA Unread Member Count', compute='_compute_wa_unread_member_count')
 
-    @api.depends('channel_member_ids.partner_id.user_ids')
-    def _compute_wa_unread_count(self):
-        for rec in self:
-            # Se houver qualquer membro joined, zera o contador
-            if rec.channel_member_ids.filtered(lambda m: m.partner_id.user_ids):
-                rec.wa_unread_count = 0
-            # Caso contrário, mantém o valor atual (incrementado via wa_post_incoming)
-            # Odoo só chama o compute se houver mudança nos membros
+    def init(self):
+        self._cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {GENERATION_SEQUENCE}")
+        # Caixa de entrada: canais WA ordenados por recência
+        tools.create_index(
+            self._cr, 'discuss_channel_wa_last_message_idx', self._table,
+            ['wa_last_message_date DESC NULLS LAST', 'id DESC'], where='is_wa')
+        # Preenche canais existentes (só os que ainda não têm a data)
+        self._cr.execute("""
+            UPDATE discuss_channel c
+               SET wa_last_message_date = last.date,
+                   wa_last_message_preview = left(trim(regexp_replace(COALESCE(last.body, ''), '<[^>]+>', '', 'g')), %s),
+                   wa_last_direction = CASE WHEN last.author_id = c.wa_partner_id THEN 'input' ELSE 'output' END
+              FROM (
+                    SELECT DISTINCT ON (m.res_id) m.res_id, m.date, m.body::text AS body, m.author_id
+                      FROM mail_message m
+                      JOIN discuss_channel ch ON ch.id = m.res_id AND ch.is_wa
+                     WHERE m.model = 'discuss.channel'
+                       AND m.message_type IN ('comment', 'whatsapp')
+                  ORDER BY m.res_id, m.id DESC
+                   ) last
+             WHERE c.id = last.res_id AND c.is_wa AND c.wa_last_message_date IS NULL
+        """, [PREVIEW_SIZE])
 
+    @api.depends('channel_member_ids.partner_id.user_ids')
     def _compute_wa_user_ids(self):
         for rec in self:
             rec.wa_user_ids = rec.channel_member_ids.mapped('partner_id.user_ids')
 
     def _compute_wa_unread_member_count(self):
-        Notification = self.env['mail.notification']
-        current_partner = self.env.user.partner_id
+        """Contador do membro do usuário atual: uma leitura para todos os cards."""
+        channel_ids = [cid for cid in self._ids if isinstance(cid, int)]
+        counters = {}
+        if channel_ids:
+            members = self.env['discuss.channel.member'].sudo().search_fetch([
+                ('channel_id', 'in', channel_ids),
+                ('partner_id', '=', self.env.user.partner_id.id),
+            ], ['channel_id', 'wa_unread_counter'])
+            counters = {member.channel_id.id: member.wa_unread_counter for member in members}
         for rec in self:
-            try:
-                count = 0
-                member = rec.channel_member_ids.filtered(lambda m: m.partner_id == current_partner)[:1]
-                if member:
-                    m = member[0]
-                    if 'message_unread_counter' in m._fields:
-                        count = m.message_unread_counter or 0
-                    elif 'unread_messages_count' in m._fields:
-                        count = m.unread_messages_count or 0
-                    elif 'unread_counter' in m._fields:
-                        count = m.unread_counter or 0
-                rec.wa_unread_member_count = count
-            except Exception as e:
-                rec.wa_unread_member_count = 0
-                try:
-                    self.env['ir.logging'].sudo().create({
-                        'name': 'wa_conn', 'type': 'server', 'dbname': self.env.cr.dbname,
-                        'level': 'ERROR', 'message': f'wa_conn: wa_unread_member_count compute error: {e}', 'path': 'wa_conn.models.wa_channel',
-                    })
-                except Exception:
-                    pass
+            rec.wa_unread_member_count = counters.get(rec.id, 0)
 
+    @api.depends('channel_member_ids.partner_id.name')
     def _compute_member_names(self):
         for rec in self:
             try:
@@ -91,6 +116,95 @@ class Channel(models.Model):
             except Exception:
                 rec.member_names = ''
 
+    # ==================== CACHE DE CANAIS WA ====================
+    @api.model
+    def _wa_filter_channel_ids(self, channel_ids):
+        """
+        Ids de ``channel_ids`` que são canais WhatsApp, pelo cache do worker
+        (tools/channel_cache.py): MailMessage.create descarta mensagens de
+        outros canais sem ler discuss.channel. Canais cujo is_wa mudou nesta
+        transação são lidos direto do banco, sem passar pelo cache.
+        """
+        cr = self.env.cr
+        channel_ids = set(channel_ids)
+        changed = channel_ids & cr.precommit.data.get(CHANGED_KEY, set())
+
+        def generation():
+            cr.execute(f"SELECT last_value FROM {GENERATION_SEQUENCE}")
+            return cr.fetchone()[0]
+
+        def load(ids):
+            self.flush_model(['is_wa'])
+            cr.execute("SELECT id, is_wa FROM discuss_channel WHERE id = ANY(%s)", [list(ids)])
+            return cr.fetchall()
+
+        wa_ids = channel_cache.CACHE.wa_ids(cr.dbname, channel_ids - changed, generation, load)
+        if changed:
+            wa_ids |= {cid for cid, is_wa in load(changed) if is_wa}
+        return wa_ids
+
+    def _wa_invalidate_channel_ids(self):
+        """
+        is_wa mudou. Até o fim da transação esses canais não usam o cache;
+        depois, com commit ou rollback, este worker os esquece, e no commit
+        a geração avança para os demais (antes disso eles releriam o valor
+        antigo e o gravariam no cache com a geração nova).
+        """
+        cr = self.env.cr
+        changed = cr.precommit.data.setdefault(CHANGED_KEY, set())
+        if not changed:
+            dbname = cr.dbname
+            registry = self.env.registry
+
+            def forget():
+                channel_cache.CACHE.forget(dbname, changed)
+
+            def bump():
+                forget()
+                with registry.cursor() as new_cr:
+                    new_cr.execute(f"SELECT nextval('{GENERATION_SEQUENCE}')")
+
+            cr.postcommit.add(bump)
+            cr.postrollback.add(forget)
+        changed.update(self.ids)
+
+    def write(self, vals):
+        if 'is_wa' in vals:
+            changed = self.filtered(lambda channel: channel.is_wa != bool(vals['is_wa']))
+            if changed:
+                changed._wa_invalidate_channel_ids()
+        return super().write(vals)
+
+    # ==================== ÚLTIMA ATIVIDADE ====================
+    @api.model
+    def _wa_update_last_message(self, messages):
+        """
+        Atualiza data, prévia e direção da última mensagem dos canais WA de
+        ``messages`` (um UPDATE por canal, só se a mensagem for mais nova).
+        """
+        latest = {}
+        for message in messages:
+            if message.message_type not in ('comment', 'whatsapp'):
+                continue
+            current = latest.get(message.res_id)
+            if not current or (message.date, message.id) >= (current.date, current.id):
+                latest[message.res_id] = message
+        if not latest:
+            return
+        self.flush_model(['wa_partner_id'])
+        for channel_id, message in latest.items():
+            self.env.cr.execute("""
+                UPDATE discuss_channel
+                   SET wa_last_message_date = %s,
+                       wa_last_message_preview = %s,
+                       wa_last_direction = CASE WHEN wa_partner_id = %s THEN 'input' ELSE 'output' END
+                 WHERE id = %s
+                   AND (wa_last_message_date IS NULL OR wa_last_message_date <= %s)
+            """, [message.date, message._wa_preview(), message.author_id.id or None,
+                  channel_id, message.date])
+        self.browse(list(latest)).invalidate_recordset(
+            ['wa_last_message_date', 'wa_last_message_preview', 'wa_last_direction'])
+
     @api.model
     def _read_group_stage_ids(self, stages, domain, order=None):
         """Expand stage groups in kanban so all stages are shown and allow drag & drop"""
@@ -122,8 +236,8 @@ class Channel(models.Model):
 
     def wa_post_incoming(self, dto, partner):
         """Posta uma mensagem de entrada (com skip de saída)."""
-        print(vars(dto))
         self.ensure_one()
+        self.wa_account_id._debug_capture('inbound', dto, label=getattr(dto, 'message_id', None))
         attachments = []
         if dto.has_attachment():
             b64 = dto.attachment_b64
@@ -185,24 +299,15 @@ class Channel(models.Model):
                 company = self.wa_account_id.company_id if self.wa_account_id and self.wa_account_id.company_id else self.env.company
                 author_id = company.id
 
-        # Incrementa wa_unread_count se não houver user joined
-        if not self.channel_member_ids.filtered(lambda m: m.partner_id.user_ids):
-            self.wa_unread_count += 1
-            # Dispara notificação para todos os usuários do sistema
-            all_users = self.env['res.users'].search([])
-            all_partners = all_users.mapped('partner_id').ids
-            self.wa_broadcast()
-        # Se houver qualquer membro, zera wa_unread_count
-        else:
-            self.wa_unread_count = 0
-
-        msg = self.with_context(wa_skip_send=True).sudo().message_post(
-            body=dto.message or '',
-            message_type='whatsapp',
-            subtype_xmlid="mail.mt_comment",
-            author_id=author_id,
-            attachments=attachments,
-        )
+        account = self.wa_account_id
+        with metrics.timed('post.message_post', account.provider, account.id):
+            msg = self.with_context(wa_skip_send=True).sudo().message_post(
+                body=dto.message or '',
+                message_type='whatsapp',
+                subtype_xmlid="mail.mt_comment",
+                author_id=author_id,
+                attachments=attachments,
+            )
         # Ajustes pós-criação (voz e metadados)
         if msg and msg.attachment_ids:
             for attachment in msg.attachment_ids:
@@ -212,7 +317,44 @@ class Channel(models.Model):
         if msg and getattr(msg, '_fields', {}).get('wa_message_id'):
             msg.sudo().write({'wa_message_id': dto.message_id, 'message_derection': 'input'})
 
+        # Sem user joined, o contador do canal cresce e todos são notificados
+        if msg and self._wa_bump_unread(author_id):
+            self.wa_broadcast()
+
         return msg
+
+    def _wa_bump_unread(self, author_id):
+        """
+        Conta uma mensagem nova com UPDATEs atômicos (sem read-modify-write no
+        ORM, que perde incrementos com webhooks concorrentes):
+        - wa_unread_count do canal: +1, ou 0 se algum usuário é membro;
+        - wa_unread_counter de cada membro, exceto o autor.
+        Retorna o wa_unread_count resultante.
+        """
+        self.ensure_one()
+        self.env['discuss.channel.member'].flush_model(['channel_id', 'partner_id', 'wa_unread_counter'])
+        self.flush_recordset(['wa_unread_count'])
+        cr = self.env.cr
+        cr.execute("""
+            UPDATE discuss_channel c
+               SET wa_unread_count = CASE WHEN EXISTS (
+                       SELECT 1
+                         FROM discuss_channel_member m
+                         JOIN res_users u ON u.partner_id = m.partner_id AND u.active
+                        WHERE m.channel_id = c.id
+                   ) THEN 0 ELSE COALESCE(c.wa_unread_count, 0) + 1 END
+             WHERE c.id = %s
+         RETURNING c.wa_unread_count
+        """, [self.id])
+        row = cr.fetchone()
+        cr.execute("""
+            UPDATE discuss_channel_member
+               SET wa_unread_counter = COALESCE(wa_unread_counter, 0) + 1
+             WHERE channel_id = %s AND partner_id IS DISTINCT FROM %s
+        """, [self.id, author_id])
+        self.invalidate_recordset(['wa_unread_count'])
+        self.env['discuss.channel.member'].invalidate_model(['wa_unread_counter'])
+        return row[0] if row else 0
     
     def wa_broadcast(self):
         """Envia notificação customizada via bus para todos os usuários informados."""
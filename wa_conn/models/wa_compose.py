@@ -110,20 +110,13 @@ class WACompose(models.TransientModel):
             if not partner.mobile:
                 raise ValueError(_("The partner %s does not have a mobile number.") % partner.name)
 
-            # Se tem mídia, usa send_media; senão, send_text
-            if self.wa_media:
-                result = account.send_media(
-                    mobile=partner.mobile,
-                    caption=self.wa_message,
-                    b64=self.wa_media,
-                    filename=self.wa_media_filename,
-                )
-            else:
-                result = account.send_text(
-                    mobile=partner.mobile,
-                    message=self.wa_message,
-                )
-            # Log da mensagem
+        # Se tem mídia, envia como send_media; senão, texto
+        options = {'b64': self.wa_media, 'filename': self.wa_media_filename} if self.wa_media else {}
+        results = account.send_batch([
+            (partner.mobile, self.wa_message, options) for partner in self.partner_ids
+        ])
+        # Log da mensagem
+        for partner, result in zip(self.partner_ids, results):
             self._log_wa_message(partner, success=result.get('ok', True), error=result.get('error'))
     
     def _log_wa_message(self, partner, success=True, error=None):
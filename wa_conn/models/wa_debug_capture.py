@@ -0,0 +1,55 @@
+from odoo import api, fields, models
+import logging
+
+from ..tools.debug_capture import shrink
+
+_logger = logging.getLogger(__name__)
+
+
+class WADebugCapture(models.Model):
+    """
+    Buffer circular de payloads para debug, por conta.
+
+    Só é gravado quando a conta tem "Debug Capture" ligado; cada captura é
+    amostrada (debug_sample_rate), reduzida (strings e tamanho total) e as
+    mais antigas além de debug_capture_limit são apagadas.
+    """
+    _name = 'wa.debug.capture'
+    _description = 'WhatsApp Debug Capture'
+    _order = 'id desc'
+    _rec_name = 'kind'
+
+    account_id = fields.Many2one('wa.account', string="Account", required=True, ondelete='cascade',
+                                 readonly=True, index=True)
+    kind = fields.Selection([
+        ('webhook', 'Webhook'),
+        ('inbound', 'Inbound DTO'),
+        ('response', 'Send Response'),
+    ], string="Kind", required=True, readonly=True)
+    label = fields.Char(string="Label", readonly=True)
+    payload = fields.Text(string="Payload", readonly=True)
+    size = fields.Integer(string="Size", readonly=True, help="Length of the captured (truncated) payload")
+
+    @api.model
+    def _capture(self, account, kind, payload, label=None):
+        """
+        Grava a captura num cursor próprio: ela sobrevive ao rollback do
+        webhook que falhou, que é justamente o caso que se quer investigar.
+        """
+        text = shrink(payload, account.debug_max_string or 256, account.debug_max_bytes or 16384)
+        limit = account.debug_capture_limit or 200
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute("""
+                    INSERT INTO wa_debug_capture (account_id, kind, label, payload, size,
+                                                  create_uid, create_date, write_uid, write_date)
+                    VALUES (%s, %s, %s, %s, %s, %s, now() at time zone 'UTC', %s, now() at time zone 'UTC')
+                """, [account.id, kind, label, text, len(text), self.env.uid, self.env.uid])
+                cr.execute("""
+                    DELETE FROM wa_debug_capture
+                     WHERE account_id = %s
+                       AND id < (SELECT id FROM wa_debug_capture WHERE account_id = %s
+                                 ORDER BY id DESC OFFSET %s LIMIT 1)
+                """, [account.id, account.id, limit - 1])
+        except Exception as e:
+            _logger.warning(f"[wa.debug.capture] Capture failed for account {account.id}: {e}")
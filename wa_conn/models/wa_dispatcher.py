@@ -0,0 +1,63 @@
+from odoo import api, fields, models
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Canal NOTIFY escutado pelo dispatcher (cli/wa_dispatch.py); o payload é o tipo de trabalho
+WORK_CHANNEL = 'wa_work'
+
+
+class WADispatcher(models.AbstractModel):
+    """
+    Ponto de extensão das filas atendidas pelo dispatcher.
+
+    Quem insere trabalho chama _notify(kind); o NOTIFY só é entregue no
+    commit, então o dispatcher nunca acorda antes dos dados estarem visíveis.
+    Módulos adicionam filas herdando _dispatch_handlers/_dispatch_next_due.
+    """
+    _name = 'wa.dispatcher'
+    _description = 'WhatsApp Work Dispatcher'
+
+    @api.model
+    def _notify(self, kind):
+        self.env.cr.execute(f"SELECT pg_notify('{WORK_CHANNEL}', %s)", [kind])
+
+    @api.model
+    def _dispatch_handlers(self):
+        """
+        {kind: callable}; cada callable processa um lote e retorna True se
+        pode haver mais trabalho imediatamente.
+        """
+        return {
+            'send_queue': lambda: self.env['wa.mass.send']._dispatch_send_queue(),
+            'webhook_event': lambda: self.env['wa.webhook.event']._dispatch_webhook_events(),
+        }
+
+    @api.model
+    def _dispatch(self, kind):
+        handler = self._dispatch_handlers().get(kind)
+        if not handler:
+            _logger.warning(f"[wa.dispatcher] Unknown work kind '{kind}'")
+            return False
+        return bool(handler())
+
+    @api.model
+    def _dispatch_next_due(self):
+        """Próximo horário agendado (UTC) de trabalho já enfileirado, ou None."""
+        self.env.cr.execute("""
+            SELECT least(
+                (SELECT min(greatest(scheduled_datetime, next_attempt_at)) FROM wa_send_queue
+                  WHERE status = 'pending'
+                    AND greatest(scheduled_datetime, next_attempt_at) > now() at time zone 'UTC'),
+                (SELECT min(next_attempt_at) FROM wa_webhook_event
+                  WHERE state = 'pending'
+                    AND next_attempt_at > now() at time zone 'UTC'))
+        """)
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _seconds_until_next_due(self, default):
+        due = self._dispatch_next_due()
+        if not due:
+            return default
+        return max(0.0, min(default, (due - fields.Datetime.now()).total_seconds()))
@@ -1,7 +1,14 @@
-import time
-import random
 from odoo import api, fields, models, _
-from odoo.exceptions import UserError
+from odoo.exceptions import UserError, ValidationError
+from ast import literal_eval
+from collections import defaultdict
+
+from ..tools.hash_ring import HashRing
+
+# Parceiros lidos por vez da audiência (paginação por id)
+AUDIENCE_CHUNK = 1000
+# Campos de controle gravados durante o envio/geração; não mexem no cron do registro
+BOOKKEEPING_FIELDS = {'queue_cursor', 'invalid_partner_ids'}
 
 class WAMassSend(models.Model):
     _name = 'wa.mass.send'
@@ -16,10 +23,30 @@ class WAMassSend(models.Model):
         help="WA account to use.",
         tracking=True
     )
+    pool_account_ids = fields.Many2many(
+        'wa.account',
+        'wa_mass_send_pool_account_rel',
+        'mass_send_id',
+        'account_id',
+        string="Account Pool",
+        help="Additional accounts that share this campaign. Recipients are spread over the pool "
+             "by consistent hashing, so a contact keeps the same sender across campaigns; when "
+             "an account is disconnected or its provider is down, its recipients move to the "
+             "next account of the pool."
+    )
+    audience_type = fields.Selection(
+        [('partners', 'Selected Contacts'), ('domain', 'Filter')],
+        string="Audience",
+        default='partners',
+        required=True,
+        help="Selected Contacts: the recipients listed below. Filter: every contact matching "
+             "the filter when the send runs, read in chunks without listing them on the record."
+    )
+    audience_domain = fields.Char(string="Audience Filter", default="[]")
+    audience_count = fields.Integer(string="Audience Size", compute='_compute_audience_count')
     partner_ids = fields.Many2many(
         'res.partner',
         string="Recipients",
-        required=True,
         help="Recipients to send WhatsApp messages to.",
         tracking=True,
         ondelete='cascade'
@@ -40,11 +67,34 @@ class WAMassSend(models.Model):
         ('sending', 'Sending'),
         ('done', 'Done'),
         ('error', 'Error'),
+        ('generating', 'Generating Queue'),
     ], default='draft', string="Status", tracking=True)
+    queue_cursor = fields.Integer(
+        string="Queue Cursor",
+        readonly=True,
+        copy=False,
+        help="Last contact id already turned into queue items while the queue is being generated."
+    )
     last_send_date = fields.Datetime(string="Last Send Date", tracking=True)
     error_message = fields.Text(string="Error Message", tracking=True)
     scheduled_datetime = fields.Datetime(string="Scheduled Date/Time", required=True, help="When to start sending messages (for cron).", tracking=True)
     cron_enabled = fields.Boolean(string="Enable Scheduled Send", default=False, help="If enabled, this record will be processed by the cron job.", tracking=True)
+    check_numbers = fields.Boolean(
+        string="Skip Numbers Without WhatsApp",
+        default=True,
+        help="Before sending, check the recipients' numbers with the provider (cached per number) "
+             "and leave out landlines and numbers that are not on WhatsApp."
+    )
+    invalid_partner_ids = fields.Many2many(
+        'res.partner',
+        'wa_mass_send_invalid_partner_rel',
+        'mass_send_id',
+        'partner_id',
+        string="Skipped Recipients",
+        readonly=True,
+        help="Recipients left out by the last number check or because they opted out."
+    )
+    invalid_count = fields.Integer(string="Skipped", compute='_compute_invalid_count')
 
     cron_interval_number = fields.Integer(
         string="Cron Interval Number",
@@ -143,37 +193,164 @@ class WAMassSend(models.Model):
 
     def write(self, vals):
         res = super().write(vals)
-        self._update_cron()
+        if set(vals) - BOOKKEEPING_FIELDS:
+            self._update_cron()
         return res
 
+    @api.constrains('audience_type', 'partner_ids')
+    def _check_audience(self):
+        for mass_send in self:
+            if mass_send.audience_type == 'partners' and not mass_send.partner_ids:
+                raise ValidationError(_('Select at least one recipient or use a filter audience.'))
+
+    @api.depends('audience_type', 'audience_domain', 'partner_ids')
+    def _compute_audience_count(self):
+        Partner = self.env['res.partner']
+        for mass_send in self:
+            try:
+                mass_send.audience_count = Partner.search_count(mass_send._wa_audience_domain())
+            except Exception:
+                mass_send.audience_count = 0
+
+    # ==================== AUDIÊNCIA ====================
+    def _wa_audience_domain(self):
+        """Domínio de res.partner da audiência (só parceiros com celular)."""
+        self.ensure_one()
+        if self.audience_type == 'domain':
+            domain = literal_eval(self.audience_domain or '[]')
+        else:
+            domain = [('id', 'in', self.partner_ids.ids)]
+        return domain + [('mobile', '!=', False)]
+
+    def _wa_audience_chunks(self, after_id=0, size=AUDIENCE_CHUNK):
+        """
+        Gera a audiência em blocos ordenados por id (keyset: id > último id),
+        sem OFFSET e sem carregar a audiência inteira.
+        """
+        self.ensure_one()
+        Partner = self.env['res.partner']
+        domain = self._wa_audience_domain()
+        last_id = after_id
+        while True:
+            partners = Partner.search(domain + [('id', '>', last_id)], order='id', limit=size)
+            if not partners:
+                return
+            yield partners
+            if len(partners) < size:
+                return
+            last_id = partners[-1].id
+
+    def _wa_dedupe(self, partners, seen):
+        """Parceiros cujo celular normalizado ainda não está em ``seen`` (que é atualizado)."""
+        NumberCheck = self.env['wa.number.check']
+        unique = self.env['res.partner']
+        for partner in partners:
+            key = NumberCheck._normalize(self.wa_account_id, partner.mobile)
+            if key and key not in seen:
+                seen.add(key)
+                unique |= partner
+        return unique
+
+    @api.depends('invalid_partner_ids')
+    def _compute_invalid_count(self):
+        for mass_send in self:
+            mass_send.invalid_count = len(mass_send.invalid_partner_ids)
+
+    def _wa_recipients(self, partners):
+        """
+        Parceiros de um bloco da audiência com celular, sem opt-out (wa.optout)
+        e, com check_numbers, sem os números que o provider diz não ter
+        WhatsApp (wa.number.check, com cache). Os descartados são
+        acrescentados a invalid_partner_ids.
+        """
+        self.ensure_one()
+        partners = partners.filtered('mobile')
+        # Opt-out primeiro: em memória, e poupa a consulta ao provider
+        allowed = self.env['wa.optout'].sudo()._filter_partners(partners, lane='bulk')
+        invalid = partners - allowed
+        if self.check_numbers and allowed:
+            found = self.env['wa.number.check'].sudo()._lookup(self.wa_account_id, allowed.mapped('mobile'))
+            invalid |= allowed.filtered(lambda p: found.get(p.mobile) is False)
+        if invalid:
+            self.invalid_partner_ids = [(4, partner_id, 0) for partner_id in invalid.ids]
+        return partners - invalid
+
+    def _wa_pool(self):
+        self.ensure_one()
+        return self.wa_account_id | self.pool_account_ids
+
+    def _wa_shard(self, partners):
+        """{account: partners}: cada parceiro vai para a conta do anel (HashRing) que estiver disponível."""
+        self.ensure_one()
+        pool = self._wa_pool()
+        available = pool._pool_available()
+        if len(pool) == 1 or not available:
+            return {self.wa_account_id: partners} if partners else {}
+        ring = HashRing(pool.ids)
+        available_ids = set(available.ids)
+        shards = defaultdict(lambda: self.env['res.partner'])
+        for partner in partners:
+            shards[ring.node_for(partner.id, available_ids)] |= partner
+        return {pool.browse(account_id): shard for account_id, shard in shards.items()}
+
+    def _wa_message_for(self, partner):
+        """(mobile, message, options) do parceiro, no formato de send_batch."""
+        template = self.wa_template_id
+        msg = self.wa_message
+        if template:
+            msg = template.render_template('wa_message', partner)
+        options = {}
+        if template and template.wa_media:
+            options = {'b64': template.wa_media, 'filename': template.wa_media_filename}
+        return (partner.mobile, msg, options)
+
+    def action_check_numbers(self):
+        for mass_send in self:
+            mass_send.invalid_partner_ids = [(5, 0, 0)]
+            for partners in mass_send._wa_audience_chunks():
+                mass_send._wa_recipients(partners)
+        return True
+
     def action_send(self):
         self.write({'state': 'sending'})
         self._send_mass_message_backend()
 
     def _send_mass_message_backend(self):
-        account = self.wa_account_id
         try:
-            for partner in self.partner_ids:
-                if not partner.mobile:
+            self.invalid_partner_ids = [(5, 0, 0)]
+            # min/max delay espaça o início de cada envio (anti-bloqueio)
+            delay = (self.min_delay, max(self.min_delay, self.max_delay)) if self.max_delay > 0 else None
+            seen = set()
+            total = failed_count = 0
+            failed = []
+            for chunk in self._wa_audience_chunks():
+                # Um lote por conta do pool; cada conta tem o próprio espaçamento
+                batches = [
+                    (account, [self._wa_message_for(partner) for partner in partners], 'bulk')
+                    for account, partners in self._wa_shard(
+                        self._wa_dedupe(self._wa_recipients(chunk), seen)).items()
+                ]
+                if not batches:
                     continue
-                msg = self.wa_message
-                if self.wa_template_id:
-                    msg = self.wa_template_id.render_template('wa_message', partner)
-                if self.wa_template_id and self.wa_template_id.wa_media:
-                    account.send_media(
-                        mobile=partner.mobile,
-                        caption=msg,
-                        b64=self.wa_template_id.wa_media,
-                        filename=self.wa_template_id.wa_media_filename
-                    )
-                else:
-                    account.send_text(
-                        mobile=partner.mobile,
-                        message=msg
-                    )
-                delay = random.uniform(self.min_delay, self.max_delay)
-                time.sleep(delay)
-            self.write({'state': 'done', 'last_send_date': fields.Datetime.now(), 'error_message': False})
+                for account_results in self.env['wa.account']._send_batches(batches, delay=delay):
+                    for result in account_results:
+                        total += 1
+                        if not result.get('ok'):
+                            failed_count += 1
+                            if len(failed) < 20:
+                                failed.append(result)
+            if not total:
+                self.write({'state': 'done', 'last_send_date': fields.Datetime.now(), 'error_message': False})
+                return
+            if failed_count == total:
+                self.write({'state': 'error', 'error_message': failed[0].get('error') or _('All messages failed')})
+                return
+            error_message = False
+            if failed:
+                error_message = _('%(failed)s of %(total)s messages failed: %(numbers)s',
+                                  failed=failed_count, total=total,
+                                  numbers=', '.join(r['mobile'] for r in failed))
+            self.write({'state': 'done', 'last_send_date': fields.Datetime.now(), 'error_message': error_message})
         except Exception as e:
             self.write({'state': 'error', 'error_message': str(e)})
 
@@ -1,4 +1,7 @@
 from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
 
 
 
@@ -27,7 +30,7 @@ class WaMessageReaction(models.Model):
                 'id': message.wa_message_id,  # Char do WhatsApp
                 'fromMe': False,
             }
-            print('DEBUG: Chamando send_reaction', key, content)
+            _logger.debug(f"[WA] send_reaction key={key} content={content}")
             account.send_reaction(key, content)
         message._message_reaction(content, "add", partner, guest)
         return True
@@ -54,7 +57,7 @@ class WaMessageReaction(models.Model):
                 'id': message.wa_message_id,  # Char do WhatsApp
                 'fromMe': False,
             }
-            print('DEBUG: Chamando send_reaction', key, content)
+            _logger.debug(f"[WA] send_reaction key={key} content={content}")
             account.send_reaction(key, content or '')
         if content:
             message._message_reaction(content, "remove", partner, guest)
@@ -0,0 +1,130 @@
+from odoo import _, api, fields, models, tools
+import json
+import logging
+
+from ..tools import metrics
+
+_logger = logging.getLogger(__name__)
+
+# Intervalo mínimo (s) entre descargas das métricas de um worker
+FLUSH_INTERVAL = 30
+
+
+class WAMetrics(models.Model):
+    """
+    Snapshot agregado das métricas por estágio (ver tools/metrics.py).
+
+    Cada worker acumula em memória e soma seus deltas aqui (upsert em cursor
+    próprio, sem segurar locks na transação do webhook).
+    """
+    _name = 'wa.metrics'
+    _description = 'WhatsApp Stage Metrics'
+    _order = 'stage, provider, account_id'
+    _log_access = False
+
+    stage = fields.Char(string="Stage", required=True, readonly=True)
+    provider = fields.Char(string="Provider", readonly=True)
+    account_id = fields.Many2one('wa.account', string="Account", ondelete='cascade', readonly=True)
+    count = fields.Integer(string="Count", readonly=True)
+    error_count = fields.Integer(string="Errors", readonly=True)
+    total_ms = fields.Float(string="Total (ms)", readonly=True)
+    max_ms = fields.Float(string="Max (ms)", readonly=True)
+    avg_ms = fields.Float(string="Avg (ms)", compute='_compute_avg_ms')
+    histogram = fields.Json(string="Histogram", readonly=True,
+                            help="Executions per latency bucket (upper bound in ms)")
+    last_update = fields.Datetime(string="Last Update", readonly=True)
+
+    def init(self):
+        tools.create_unique_index(
+            self._cr, 'wa_metrics_key_uniq', self._table,
+            ['stage', "COALESCE(provider, '')", 'COALESCE(account_id, 0)'])
+
+    @api.depends('count', 'total_ms')
+    def _compute_avg_ms(self):
+        for rec in self:
+            rec.avg_ms = rec.total_ms / rec.count if rec.count else 0.0
+
+    # ==================== DESCARGA ====================
+    @api.model
+    def _flush_if_due(self):
+        if metrics.flush_due(FLUSH_INTERVAL):
+            self._flush()
+
+    @api.model
+    def _flush(self):
+        """Grava os deltas deste worker; em caso de erro eles voltam para a memória."""
+        pending = metrics.drain()
+        if not pending:
+            return
+        try:
+            with self.env.registry.cursor() as cr:
+                self._upsert(cr, pending)
+        except Exception as e:
+            metrics.restore(pending)
+            _logger.warning(f"[wa.metrics] Flush failed: {e}")
+
+    @api.model
+    def _upsert(self, cr, pending):
+        account_ids = {key[2] for key in pending if key[2]}
+        if account_ids:
+            cr.execute("SELECT id FROM wa_account WHERE id IN %s", [tuple(account_ids)])
+            account_ids = {row[0] for row in cr.fetchall()}
+        for (stage, provider, account_id), (count, errors, total, peak, buckets) in pending.items():
+            cr.execute("""
+                INSERT INTO wa_metrics (stage, provider, account_id, count, error_count, total_ms, max_ms,
+                                        histogram, last_update)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s::jsonb, now() at time zone 'UTC')
+                ON CONFLICT (stage, COALESCE(provider, ''), COALESCE(account_id, 0)) DO UPDATE SET
+                    count = wa_metrics.count + EXCLUDED.count,
+                    error_count = wa_metrics.error_count + EXCLUDED.error_count,
+                    total_ms = wa_metrics.total_ms + EXCLUDED.total_ms,
+                    max_ms = GREATEST(wa_metrics.max_ms, EXCLUDED.max_ms),
+                    histogram = (
+                        SELECT jsonb_object_agg(k, COALESCE((wa_metrics.histogram->>k)::int, 0)
+                                                   + COALESCE((EXCLUDED.histogram->>k)::int, 0))
+                          FROM jsonb_object_keys(COALESCE(wa_metrics.histogram, '{}'::jsonb)
+                                                 || EXCLUDED.histogram) AS k
+                    ),
+                    last_update = EXCLUDED.last_update
+            """, [stage, provider or None, account_id if account_id in account_ids else None,
+                  count, errors, total, peak, json.dumps(metrics.histogram_dict(buckets))])
+
+    # ==================== LEITURA ====================
+    @api.model
+    def _collect(self):
+        """
+        Descarrega este worker e lê o agregado de todos os workers num cursor
+        novo (a transação atual não enxerga o que foi gravado depois dela começar).
+        """
+        self._flush()
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                SELECT stage, COALESCE(provider, '') AS provider, COALESCE(account_id, 0) AS account,
+                       count, error_count, total_ms, max_ms, histogram
+                  FROM wa_metrics
+              ORDER BY stage, provider, account_id
+            """)
+            return cr.dictfetchall()
+
+    @api.model
+    def render_prometheus(self):
+        return (metrics.render_prometheus(self._collect())
+                + metrics.render_queue_depth(self.env['wa.send.queue'].sudo()._lane_depth()))
+
+    def action_refresh(self):
+        self._flush()
+        return {'type': 'ir.actions.client', 'tag': 'reload'}
+
+    def action_reset(self):
+        metrics.drain()
+        self.sudo().search([]).unlink()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Metrics'),
+                'message': _('Metrics were reset.'),
+                'type': 'success',
+                'next': {'type': 'ir.actions.client', 'tag': 'reload'},
+            },
+        }
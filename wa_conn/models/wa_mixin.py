@@ -1,9 +1,12 @@
 from odoo import _, models
 import requests
 import base64
+import logging
 from odoo.tools import html2plaintext
 from ..tools.util import get_media_type, get_mime_type
 
+_logger = logging.getLogger(__name__)
+
 
 class WAMixin(models.AbstractModel):
     _name = 'wa.mixin'
@@ -203,4 +206,4 @@ class WAMixin(models.AbstractModel):
                     avatar_b64 = False
             return response
         except Exception as e:
-             print(f'{str(e)}')
+             _logger.warning(f"[WA] Failed to fetch profile picture: {e}")
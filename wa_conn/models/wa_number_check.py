@@ -0,0 +1,96 @@
+from odoo import api, fields, models
+from datetime import timedelta
+import logging
+import re
+
+_logger = logging.getLogger(__name__)
+
+# Números por chamada ao endpoint de verificação do provider
+CHUNK_SIZE = 50
+
+
+class WANumberCheck(models.Model):
+    """
+    Cache de "este número tem WhatsApp?" por número normalizado (só dígitos).
+
+    Preenchido em lote por _lookup antes das campanhas; o resultado vale por
+    wa_conn.number_check_ttl_days (padrão 30) e as linhas vencidas são
+    removidas pelo autovacuum.
+    """
+    _name = 'wa.number.check'
+    _description = 'WhatsApp Number Check'
+    _rec_name = 'number'
+    _log_access = False
+
+    number = fields.Char(string="Number", required=True, readonly=True)
+    on_whatsapp = fields.Boolean(string="On WhatsApp", readonly=True)
+    checked_at = fields.Datetime(string="Checked At", required=True, readonly=True)
+
+    _sql_constraints = [
+        ('number_uniq', 'unique(number)', 'Number already checked.'),
+    ]
+
+    @api.model
+    def _normalize(self, account, mobile):
+        return re.sub(r'\D', '', account._fmt_number(mobile) or '')
+
+    @api.model
+    def _ttl(self):
+        days = int(self.env['ir.config_parameter'].sudo().get_param('wa_conn.number_check_ttl_days', 30))
+        return timedelta(days=days)
+
+    @api.model
+    def _lookup(self, account, mobiles):
+        """
+        {mobile: True/False/None} para os números informados. Consulta o
+        provider só para os que não estão no cache (em blocos de CHUNK_SIZE);
+        None quando o provider não sabe responder (o destinatário é mantido).
+        """
+        by_number = {}
+        for mobile in mobiles:
+            number = self._normalize(account, mobile)
+            if number:
+                by_number.setdefault(number, []).append(mobile)
+        result = dict.fromkeys(mobiles)
+        if not by_number:
+            return result
+
+        self.env.cr.execute("""
+            SELECT number, on_whatsapp FROM wa_number_check
+             WHERE number = ANY(%s) AND checked_at > %s
+        """, [list(by_number), fields.Datetime.now() - self._ttl()])
+        known = dict(self.env.cr.fetchall())
+        missing = [number for number in by_number if number not in known]
+        for start in range(0, len(missing), CHUNK_SIZE):
+            chunk = missing[start:start + CHUNK_SIZE]
+            try:
+                checked = account.check_numbers(chunk)
+            except NotImplementedError:
+                break
+            except Exception as e:
+                _logger.warning(f"[wa.number.check] Account {account.id}: check failed for {len(chunk)} numbers: {e}")
+                continue
+            checked = {self._normalize(account, number): bool(on_wa) for number, on_wa in checked.items()}
+            checked = {number: on_wa for number, on_wa in checked.items() if number in by_number}
+            self._store(checked)
+            known.update(checked)
+
+        for number, number_mobiles in by_number.items():
+            for mobile in number_mobiles:
+                result[mobile] = known.get(number)
+        return result
+
+    @api.model
+    def _store(self, checked):
+        if not checked:
+            return
+        self.env.cr.execute("""
+            INSERT INTO wa_number_check (number, on_whatsapp, checked_at)
+                 SELECT number, on_whatsapp, %s FROM unnest(%s::varchar[], %s::boolean[]) AS v(number, on_whatsapp)
+            ON CONFLICT (number) DO UPDATE SET on_whatsapp = EXCLUDED.on_whatsapp, checked_at = EXCLUDED.checked_at
+        """, [fields.Datetime.now(), list(checked), list(checked.values())])
+
+    @api.autovacuum
+    def _gc_expired(self):
+        self.env.cr.execute("DELETE FROM wa_number_check WHERE checked_at < %s",
+                            [fields.Datetime.now() - self._ttl()])
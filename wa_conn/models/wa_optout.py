@@ -0,0 +1,147 @@
+from odoo import _, api, fields, models
+import logging
+
+from ..tools import optout
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_OPTOUT_KEYWORDS = 'STOP,SAIR,PARAR,CANCELAR,UNSUBSCRIBE'
+DEFAULT_OPTIN_KEYWORDS = 'START,VOLTAR'
+# Sequência cujo valor é a geração do conjunto em memória (tools/optout.py)
+GENERATION_SEQUENCE = 'wa_optout_generation'
+
+
+class WAOptout(models.Model):
+    """
+    Números que não devem receber mensagens.
+
+    Alimentado pelas palavras-chave recebidas (wa_conn.optout_keywords) e por
+    cadastro manual. Os envios consultam o conjunto em memória do worker
+    (tools/optout.py) em vez de uma busca por destinatário.
+    """
+    _name = 'wa.optout'
+    _description = 'WhatsApp Opt-out'
+    _order = 'id desc'
+    _rec_name = 'number'
+
+    number = fields.Char(string="Number", required=True, index=True,
+                         help="Phone number; stored as international digits. Numbers without a "
+                              "country code get the company's country code.")
+    partner_id = fields.Many2one('res.partner', string="Contact", ondelete='set null')
+    scope = fields.Selection([
+        (optout.SCOPE_CAMPAIGNS, 'Campaigns'),
+        (optout.SCOPE_ALL, 'All Messages'),
+    ], string="Blocks", default=optout.SCOPE_CAMPAIGNS, required=True,
+        help="Campaigns: mass sends and the send queue skip this number. "
+             "All Messages: nothing is sent to this number, including chat replies.")
+    source = fields.Selection([
+        ('keyword', 'Inbound Keyword'),
+        ('manual', 'Manual'),
+    ], string="Source", default='manual', required=True, readonly=True)
+    reason = fields.Char(string="Reason")
+
+    _sql_constraints = [
+        ('number_uniq', 'unique(number)', 'This number is already opted out.'),
+    ]
+
+    def init(self):
+        self._cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {GENERATION_SEQUENCE}")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        phone_code = self._phone_code()
+        for vals in vals_list:
+            if vals.get('number'):
+                # Entradas por palavra-chave já chegam normalizadas (internacionais)
+                code = None if vals.get('source') == 'keyword' else phone_code
+                vals['number'] = optout.normalize_number(vals['number'], code)
+        # Inclusões entram na atualização incremental do conjunto (por id)
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if vals.get('number'):
+            vals['number'] = optout.normalize_number(vals['number'], self._phone_code())
+        res = super().write(vals)
+        if {'number', 'scope'} & set(vals):
+            self._bump_generation()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._bump_generation()
+        return res
+
+    # ==================== CONSULTA ====================
+    @api.model
+    def _phone_code(self):
+        """Código do país da empresa, para números cadastrados em formato local."""
+        code = self.env.company.country_id.phone_code
+        return str(code) if code else None
+
+    @api.model
+    def _bump_generation(self):
+        """
+        Força a recarga completa do conjunto em todos os workers, depois do
+        commit: antes disso eles releriam os dados antigos com a geração nova.
+        """
+        registry = self.env.registry
+
+        def bump():
+            with registry.cursor() as cr:
+                cr.execute(f"SELECT nextval('{GENERATION_SEQUENCE}')")
+
+        self.env.cr.postcommit.add(bump)
+
+    @api.model
+    def _blocked_numbers(self):
+        """{número: escopo} deste banco, mantido em memória pelo worker."""
+        self.env.cr.execute(f"SELECT last_value FROM {GENERATION_SEQUENCE}")
+        generation = self.env.cr.fetchone()[0]
+
+        def load(after_id):
+            self.env.cr.execute("SELECT id, number, scope FROM wa_optout WHERE id > %s ORDER BY id", [after_id])
+            return self.env.cr.fetchall()
+
+        return optout.CACHE.numbers(self.env.cr.dbname, generation, load)
+
+    @api.model
+    def _filter_partners(self, partners, lane='bulk'):
+        """Parceiros cujo celular não está bloqueado para ``lane``."""
+        numbers = self._blocked_numbers()
+        if not numbers:
+            return partners
+        phone_code = self._phone_code()
+        return partners.filtered(lambda p: not optout.is_blocked(numbers, p.mobile, lane, phone_code))
+
+    # ==================== INBOUND ====================
+    @api.model
+    def _keywords(self, param, default):
+        value = self.env['ir.config_parameter'].sudo().get_param(param, default)
+        return {word.strip().upper() for word in (value or '').split(',') if word.strip()}
+
+    @api.model
+    def _handle_keyword(self, mobile, text, partner=None):
+        """Mensagem recebida igual a uma palavra-chave de opt-out/opt-in (ex: STOP)."""
+        word = (text or '').strip().upper()
+        # Número vindo do WhatsApp já é internacional: sem código do país
+        number = optout.normalize_number(mobile)
+        if not word or not number or len(word) > 32:
+            return False
+        if word in self._keywords('wa_conn.optout_keywords', DEFAULT_OPTOUT_KEYWORDS):
+            if not self.search_count([('number', '=', number)]):
+                self.create({
+                    'number': number,
+                    'partner_id': partner.id if partner else False,
+                    'source': 'keyword',
+                    'reason': _('Sent "%s"', word),
+                })
+                _logger.info(f"[wa.optout] {number} opted out by keyword")
+            return True
+        if word in self._keywords('wa_conn.optin_keywords', DEFAULT_OPTIN_KEYWORDS):
+            # Só desfaz opt-outs feitos por palavra-chave; bloqueios manuais ficam
+            entries = self.search([('number', '=', number), ('source', '=', 'keyword')])
+            if entries:
+                entries.unlink()
+                _logger.info(f"[wa.optout] {number} opted back in by keyword")
+            return True
+        return False
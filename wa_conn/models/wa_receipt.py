@@ -0,0 +1,106 @@
+from odoo import api, fields, models
+from collections import defaultdict
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Status de entrega, do menos para o mais avançado; um recibo nunca faz o status voltar
+DELIVERY_STATUS = [
+    ('sent', 'Sent'),
+    ('failed', 'Failed'),
+    ('delivered', 'Delivered'),
+    ('read', 'Read'),
+    ('played', 'Played'),
+]
+STATUS_RANK = {key: rank for rank, (key, _label) in enumerate(DELIVERY_STATUS, start=1)}
+
+
+def _rank_sql(column):
+    whens = ' '.join(f"WHEN '{key}' THEN {rank}" for key, rank in STATUS_RANK.items())
+    return f"(CASE {column} {whens} ELSE 0 END)"
+
+
+class WAReceipt(models.AbstractModel):
+    """
+    Aplica recibos de entrega/leitura (dto.DeliveryReceipt) em lote.
+
+    Um UPDATE ... FROM unnest() por tabela (mail.message e wa.send.queue),
+    pelo índice de wa_message_id, sem carregar registros no ORM: uma
+    campanha com milhões de recibos não vira milhões de write().
+    """
+    _name = 'wa.receipt'
+    _description = 'WhatsApp Delivery Receipts'
+
+    @api.model
+    def _apply(self, account, receipts):
+        """Grava os recibos da conta; retorna o número de linhas atualizadas."""
+        latest = {}
+        for receipt in receipts:
+            rank = STATUS_RANK.get(receipt.status)
+            if not receipt.message_id or not rank:
+                continue
+            current = latest.get(receipt.message_id)
+            if not current or rank > STATUS_RANK[current.status]:
+                latest[receipt.message_id] = receipt
+        if not latest:
+            return 0
+        now = fields.Datetime.now()
+        params = [
+            list(latest),
+            [r.status for r in latest.values()],
+            [r.timestamp or now for r in latest.values()],
+        ]
+        # O cache do ORM não enxerga o UPDATE direto
+        self.env['mail.message'].flush_model(['wa_message_id', 'wa_delivery_status'])
+        self.env['wa.send.queue'].flush_model(['wa_message_id', 'wa_delivery_status'])
+        cr = self.env.cr
+        cr.execute(f"""
+            UPDATE mail_message m
+               SET wa_delivery_status = v.status, wa_status_date = v.ts
+              FROM unnest(%s::varchar[], %s::varchar[], %s::timestamp[]) AS v(mid, status, ts)
+             WHERE m.wa_message_id = v.mid
+               AND {_rank_sql('m.wa_delivery_status')} < {_rank_sql('v.status')}
+         RETURNING m.id, m.model, m.res_id, v.status
+        """, params)
+        messages = cr.fetchall()
+        # "old" é a mesma linha antes do UPDATE: o status anterior alimenta os contadores da campanha
+        cr.execute(f"""
+            UPDATE wa_send_queue q
+               SET wa_delivery_status = v.status, wa_status_date = v.ts
+              FROM unnest(%s::varchar[], %s::varchar[], %s::timestamp[]) AS v(mid, status, ts),
+                   wa_send_queue old
+             WHERE q.wa_message_id = v.mid
+               AND q.wa_account_id = %s
+               AND old.id = q.id
+               AND {_rank_sql('q.wa_delivery_status')} < {_rank_sql('v.status')}
+         RETURNING q.mass_send_id, old.wa_delivery_status, v.status
+        """, params + [account.id])
+        queue_rows = cr.fetchall()
+        queue_count = len(queue_rows)
+        self.env['mail.message'].invalidate_model(['wa_delivery_status', 'wa_status_date'])
+        self.env['wa.send.queue'].invalidate_model(['wa_delivery_status', 'wa_status_date'])
+        if messages and self._bus_enabled():
+            self._notify_channels(messages)
+        # Por último: se algo acima falhar, o savepoint do chamador desfaz tudo sem contar
+        self.env['wa.send.queue']._count_receipts(queue_rows)
+        _logger.debug(f"[wa.receipt] Account {account.id}: {len(latest)} receipts, "
+                      f"{len(messages)} messages and {queue_count} queue items updated")
+        return len(messages) + queue_count
+
+    @api.model
+    def _bus_enabled(self):
+        enabled = self.env['ir.config_parameter'].sudo().get_param('wa_conn.receipt_bus', '1')
+        return enabled not in ('0', 'False', 'false')
+
+    @api.model
+    def _notify_channels(self, rows):
+        """Uma notificação por canal com os novos status (wa.message_status)."""
+        by_channel = defaultdict(list)
+        for message_id, model, res_id, status in rows:
+            if model == 'discuss.channel' and res_id:
+                by_channel[res_id].append({'id': message_id, 'wa_delivery_status': status})
+        for channel in self.env['discuss.channel'].sudo().browse(list(by_channel)).exists():
+            self.env['bus.bus']._sendone(channel, 'wa.message_status', {
+                'channel_id': channel.id,
+                'messages': by_channel[channel.id],
+            })
@@ -1,7 +1,52 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
-import random
+from odoo.tools import sql
+from collections import Counter, defaultdict
+from datetime import timedelta
+import logging
 import time
+from ..tools import metrics
+from ..tools.hash_ring import HashRing
+from ..tools.resilience import BREAKER, backoff, is_retryable
+from ..tools.send_batch import LANES
+from .wa_mass_send import AUDIENCE_CHUNK
+from .wa_receipt import DELIVERY_STATUS, STATUS_RANK
+
+_logger = logging.getLogger(__name__)
+
+# Ordem de retirada da fila: faixas mais prioritárias primeiro
+LANE_ORDER_SQL = "CASE lane WHEN 'interactive' THEN 0 WHEN 'transactional' THEN 1 ELSE 2 END"
+
+# Contadores de progresso do wa.mass.send; 'sending' ainda conta como pendente
+STATUS_COUNTER = {
+    'pending': 'queue_pending_count',
+    'sending': 'queue_pending_count',
+    'sent': 'queue_sent_count',
+    'error': 'queue_error_count',
+    'cancelled': 'queue_cancelled_count',
+}
+COUNTER_FIELDS = ('queue_pending_count', 'queue_sent_count', 'queue_error_count',
+                  'queue_cancelled_count', 'queue_delivered_count', 'queue_read_count')
+# Campos do item que mudam os contadores
+PROGRESS_FIELDS = {'mass_send_id', 'status', 'wa_delivery_status'}
+# Chaves em cr.precommit.data: deltas ainda não gravados e envios a notificar no bus
+PROGRESS_DELTAS = 'wa.mass.send.progress_deltas'
+PROGRESS_PUSH = 'wa.mass.send.progress_push'
+# Canal do bus com o progresso de um envio em massa: PROGRESS_CHANNEL + id
+PROGRESS_CHANNEL = 'wa_mass_send_'
+# Sem envios há mais que isso, a vazão exibida volta a zero
+RATE_STALE_MINUTES = 5
+
+
+def _delivery_counters(status):
+    rank = STATUS_RANK.get(status, 0)
+    counters = []
+    if rank >= STATUS_RANK['delivered']:
+        counters.append('queue_delivered_count')
+    if rank >= STATUS_RANK['read']:
+        counters.append('queue_read_count')
+    return counters
+
 
 class WASendQueue(models.Model):
     _name = 'wa.send.queue'
@@ -10,12 +55,21 @@ class WASendQueue(models.Model):
 
     mass_send_id = fields.Many2one('wa.mass.send', string='Mass Send', ondelete='cascade', required=True)
     partner_id = fields.Many2one('res.partner', string='Recipient', required=True)
+    mobile_key = fields.Char(string='Normalized Mobile', readonly=True,
+                             help="Recipient number in digits only; one queue item per number and mass send.")
     wa_account_id = fields.Many2one('wa.account', string='WA Account', required=True)
     wa_template_id = fields.Many2one('wa.template', string='WA Template')
     wa_message = fields.Text(string='WA Message')
     wa_media = fields.Binary(string='Media File')
     wa_media_filename = fields.Char(string='Media Filename')
     scheduled_datetime = fields.Datetime(string='Scheduled Date/Time')
+    lane = fields.Selection([
+        ('interactive', 'Interactive'),
+        ('transactional', 'Transactional'),
+        ('bulk', 'Bulk'),
+    ], default='bulk', string='Lane', required=True,
+        help="Priority class: pending items are picked interactive first, then "
+             "transactional, then bulk; bulk only uses the account's campaign slots.")
     status = fields.Selection([
         ('pending', 'Pending'),
         ('sending', 'Sending'),
@@ -26,82 +80,481 @@ class WASendQueue(models.Model):
     error_message = fields.Text(string='Error Message')
     last_attempt = fields.Datetime(string='Last Attempt')
     attempts = fields.Integer(string='Attempts', default=0)
+    wa_message_id = fields.Char(string='WhatsApp Message ID', index='btree_not_null', readonly=True)
+    wa_delivery_status = fields.Selection(DELIVERY_STATUS, string='Delivery Status', readonly=True)
+    wa_status_date = fields.Datetime(string='Delivery Status Date', readonly=True)
+    next_attempt_at = fields.Datetime(string='Next Attempt',
+                                      help="Falha temporária: o item volta a ser enviado a partir deste horário.")
 
-    def process_queue_item(self):
+    def init(self):
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS wa_send_queue_mass_send_mobile_idx
+                ON wa_send_queue (mass_send_id, mobile_key)
+        """)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        items = super().create(vals_list)
+        items._count_progress(1)
+        # Acorda o dispatcher (LISTEN wa_work) assim que a transação for commitada
+        self.env['wa.dispatcher']._notify('send_queue')
+        return items
+
+    def write(self, vals):
+        tracked = bool(PROGRESS_FIELDS & set(vals))
+        if tracked:
+            self._count_progress(-1)
+        res = super().write(vals)
+        if tracked:
+            self._count_progress(1)
+        if vals.get('status') == 'pending':
+            self.env['wa.dispatcher']._notify('send_queue')
+        return res
+
+    def unlink(self):
+        self._count_progress(-1)
+        return super().unlink()
+
+    # ==================== PROGRESSO ====================
+    def _progress_counters(self):
+        """Contadores do envio em massa em que o item entra (status e entrega)."""
+        self.ensure_one()
+        return [STATUS_COUNTER[self.status]] + _delivery_counters(self.wa_delivery_status)
+
+    def _count_progress(self, sign):
+        """Tira (-1) ou soma (+1) os itens dos contadores; gravados uma vez antes do commit."""
+        if not self:
+            return
+        deltas = self.env['wa.mass.send']._progress_deltas()
         for item in self:
-            if item.status != 'pending':
+            for counter in item._progress_counters():
+                deltas[item.mass_send_id.id][counter] += sign
+
+    @api.model
+    def _count_receipts(self, rows):
+        """Recibos aplicados por SQL (wa.receipt): [(mass_send_id, status anterior, status novo)]."""
+        rows = [row for row in rows if row[0]]
+        if not rows:
+            return
+        deltas = self.env['wa.mass.send']._progress_deltas()
+        for mass_send_id, old_status, new_status in rows:
+            for counter in set(_delivery_counters(new_status)) - set(_delivery_counters(old_status)):
+                deltas[mass_send_id][counter] += 1
+
+    def _rebalance(self):
+        """
+        Itens de campanhas com pool cuja conta caiu (desconectada ou com o
+        circuito aberto) passam para a próxima conta disponível do anel.
+        """
+        for mass_send in self.mass_send_id:
+            pool = mass_send._wa_pool()
+            if len(pool) < 2:
+                continue
+            available = pool._pool_available()
+            stranded = self.filtered(lambda i: i.mass_send_id == mass_send
+                                     and i.wa_account_id in pool and i.wa_account_id not in available)
+            if not stranded or not available:
                 continue
-            item.status = 'sending'
-            item.last_attempt = fields.Datetime.now()
-            item.attempts += 1
-            account = item.wa_account_id
-            msg = item.wa_message
-            if item.wa_template_id:
-                msg = item.wa_template_id.render_template('wa_message', item.partner_id)
-            try:
+            ring = HashRing(pool.ids)
+            available_ids = set(available.ids)
+            for item in stranded:
+                item.wa_account_id = ring.node_for(item.partner_id.id, available_ids)
+
+    def _max_attempts(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param('wa_conn.send_queue_max_attempts', 5))
+
+    def _register_failure(self, result, max_attempts):
+        """
+        Falha temporária volta para a fila com backoff; número com opt-out
+        cancela o item; as demais (ou a última tentativa) viram erro.
+        """
+        self.ensure_one()
+        error = result.get('error') or str(result.get('raw') or '')
+        if result.get('opted_out'):
+            self.write({'status': 'cancelled', 'error_message': error, 'next_attempt_at': False})
+        elif is_retryable(result) and self.attempts < max_attempts:
+            self.write({
+                'status': 'pending',
+                'error_message': error,
+                'next_attempt_at': fields.Datetime.now() + timedelta(seconds=backoff(self.attempts)),
+            })
+        else:
+            self.write({'status': 'error', 'error_message': error, 'next_attempt_at': False})
+
+    def process_queue_item(self):
+        items = self.filtered(lambda i: i.status == 'pending')
+        if not items:
+            return
+        now = fields.Datetime.now()
+        for item in items:
+            item.write({'status': 'sending', 'last_attempt': now, 'attempts': item.attempts + 1})
+        items._rebalance()
+
+        # Um lote por conta e faixa, todas as contas enviadas em paralelo
+        by_account = defaultdict(lambda: self.browse())
+        for item in items.sorted(lambda i: LANES.index(i.lane)):
+            by_account[item.wa_account_id, item.lane] |= item
+        batches = []
+        for (account, lane), account_items in by_account.items():
+            messages = []
+            for item in account_items:
+                msg = item.wa_message
+                if item.wa_template_id:
+                    msg = item.wa_template_id.render_template('wa_message', item.partner_id)
+                options = {}
                 if item.wa_template_id and item.wa_template_id.wa_media:
-                    account.send_media(
-                        mobile=item.partner_id.mobile,
-                        caption=msg,
-                        b64=item.wa_template_id.wa_media,
-                        filename=item.wa_template_id.wa_media_filename
-                    )
+                    options = {'b64': item.wa_template_id.wa_media,
+                               'filename': item.wa_template_id.wa_media_filename}
+                messages.append((item.partner_id.mobile, msg, options))
+            batches.append((account, messages, lane))
+        try:
+            all_results = self.env['wa.account']._send_batches(batches)
+        except Exception as e:
+            # Mesma política de uma falha de rede dentro do lote: backoff até o limite de tentativas
+            _logger.warning(f"[wa.send.queue] Batch send failed: {e}")
+            result = {'ok': False, 'error': str(e), 'status_code': 0}
+            for account in items.wa_account_id:
+                BREAKER.record(account._circuit_key(), result)
+            max_attempts = self._max_attempts()
+            for item in items:
+                item._register_failure(result, max_attempts)
+            return
+        max_attempts = self._max_attempts()
+        done_at = fields.Datetime.now()
+        for account_items, results in zip(by_account.values(), all_results):
+            for item, result in zip(account_items, results):
+                if result.get('ok'):
+                    item.write({
+                        'status': 'sent',
+                        'error_message': False,
+                        'next_attempt_at': False,
+                        'wa_message_id': self.env['mail.message']._wa_response_id(result),
+                        'wa_delivery_status': 'sent',
+                    })
+                    item._observe_queue_wait(done_at)
                 else:
-                    account.send_text(
-                        mobile=item.partner_id.mobile,
-                        message=msg
-                    )
-                item.status = 'sent'
-                item.error_message = False
-            except Exception as e:
-                item.status = 'error'
-                item.error_message = str(e)
+                    item._register_failure(result, max_attempts)
+
+    def _observe_queue_wait(self, done_at):
+        """Tempo entre o item ficar disponível (criação ou agendamento) e o envio."""
+        self.ensure_one()
+        ready_at = max(self.create_date, self.scheduled_datetime or self.create_date)
+        metrics.observe(f'queue.{self.lane}.wait', max((done_at - ready_at).total_seconds(), 0) * 1000,
+                        self.wa_account_id.provider, self.wa_account_id.id)
+
+    @api.model
+    def _lane_depth(self):
+        """Itens pendentes por conta e faixa, com a idade do mais antigo (s)."""
+        self.flush_model(['status', 'lane'])
+        self.env.cr.execute("""
+            SELECT wa_account_id AS account, lane, count(*) AS depth,
+                   extract(epoch FROM (now() at time zone 'UTC')
+                           - min(greatest(create_date, scheduled_datetime))) AS oldest_seconds
+              FROM wa_send_queue
+             WHERE status = 'pending'
+          GROUP BY wa_account_id, lane
+          ORDER BY wa_account_id, lane
+        """)
+        return self.env.cr.dictfetchall()
 
 class WAMassSend(models.Model):
     _inherit = 'wa.mass.send'
 
     queue_ids = fields.One2many('wa.send.queue', 'mass_send_id', string='Queue Items')
+    queue_pending_count = fields.Integer(string="Pending", readonly=True, copy=False)
+    queue_sent_count = fields.Integer(string="Sent", readonly=True, copy=False)
+    queue_error_count = fields.Integer(string="Failed", readonly=True, copy=False)
+    queue_cancelled_count = fields.Integer(string="Cancelled", readonly=True, copy=False)
+    queue_delivered_count = fields.Integer(string="Delivered", readonly=True, copy=False)
+    queue_read_count = fields.Integer(string="Read", readonly=True, copy=False)
+    send_rate = fields.Float(string="Send Rate", readonly=True, copy=False,
+                             help="Smoothed messages per minute, updated as queue items are sent.")
+    progress_date = fields.Datetime(string="Last Progress", readonly=True, copy=False)
+    throughput = fields.Float(string="Messages / Minute", digits=(16, 1), compute='_compute_throughput')
 
-    def action_generate_queue(self):
+    def init(self):
+        super().init()
+        # Envios anteriores aos contadores (zerados, mas com fila): conta uma única vez;
+        # nos demais updates o EXISTS não encontra nada e nada é recontado
+        if sql.table_exists(self._cr, 'wa_send_queue'):
+            self._recount_progress(only_empty=True)
+
+    @api.depends('send_rate', 'progress_date')
+    def _compute_throughput(self):
+        stale = fields.Datetime.now() - timedelta(minutes=RATE_STALE_MINUTES)
         for mass_send in self:
-            queue_vals = []
-            for partner in mass_send.partner_ids:
-                queue_vals.append({
-                    'mass_send_id': mass_send.id,
-                    'partner_id': partner.id,
-                    'wa_account_id': mass_send.wa_account_id.id,
-                    'wa_template_id': mass_send.wa_template_id.id if mass_send.wa_template_id else False,
-                    'wa_message': mass_send.wa_message,
-                    'wa_media': mass_send.wa_template_id.wa_media if mass_send.wa_template_id else False,
-                    'wa_media_filename': mass_send.wa_template_id.wa_media_filename if mass_send.wa_template_id else False,
-                    'scheduled_datetime': mass_send.scheduled_datetime,
-                })
-            self.env['wa.send.queue'].create(queue_vals)
-            mass_send.state = 'scheduled'
+            recent = mass_send.progress_date and mass_send.progress_date >= stale
+            mass_send.throughput = mass_send.send_rate if recent else 0.0
+
+    # ==================== PROGRESSO ====================
+    @api.model
+    def _progress_deltas(self):
+        """
+        Deltas dos contadores desta transação, {mass_send_id: Counter}. Os
+        workers só somam em memória; _flush_progress grava tudo com um UPDATE
+        por envio em massa, no máximo uma vez por lote e antes do commit.
+        """
+        data = self.env.cr.precommit.data
+        deltas = data.get(PROGRESS_DELTAS)
+        if deltas is None:
+            deltas = data[PROGRESS_DELTAS] = defaultdict(Counter)
+            self.env.cr.precommit.add(self.env['wa.mass.send']._flush_progress)
+        return deltas
+
+    @api.model
+    def _flush_progress(self):
+        deltas = self.env.cr.precommit.data.pop(PROGRESS_DELTAS, None)
+        if not deltas:
+            return
+        sets = ', '.join(f"{name} = m.{name} + %({name})s" for name in COUNTER_FIELDS)
+        seconds = "greatest(extract(epoch FROM clock.now - m.progress_date), 1)"
+        changed = []
+        for mass_send_id, delta in deltas.items():
+            if not any(delta.values()):
+                continue
+            params = {name: delta[name] for name in COUNTER_FIELDS}
+            params['id'] = mass_send_id
+            # Vazão: média móvel exponencial (janela de ~1 minuto) entre gravações com envios
+            self.env.cr.execute(f"""
+                WITH clock AS (SELECT clock_timestamp() at time zone 'UTC' AS now)
+                UPDATE wa_mass_send m
+                   SET {sets},
+                       send_rate = CASE
+                           WHEN %(queue_sent_count)s <= 0 THEN m.send_rate
+                           WHEN m.progress_date IS NULL
+                             OR m.progress_date < clock.now - interval '{RATE_STALE_MINUTES} minutes' THEN 0
+                           ELSE m.send_rate + (1 - exp(-{seconds} / 60))
+                                * (%(queue_sent_count)s * 60 / {seconds} - m.send_rate)
+                       END,
+                       progress_date = CASE WHEN %(queue_sent_count)s > 0 THEN clock.now ELSE m.progress_date END
+                  FROM clock
+                 WHERE m.id = %(id)s
+            """, params)
+            if self.env.cr.rowcount:
+                changed.append(mass_send_id)
+        mass_sends = self.browse(changed)
+        mass_sends.invalidate_recordset(list(COUNTER_FIELDS) + ['send_rate', 'progress_date', 'throughput'])
+        mass_sends._notify_progress()
+
+    def _notify_progress(self):
+        """Agenda uma notificação de progresso por envio em massa, no commit."""
+        if not self:
+            return
+        data = self.env.cr.precommit.data
+        if PROGRESS_PUSH not in data:
+            data[PROGRESS_PUSH] = set()
+            self.env.cr.precommit.add(self.env['wa.mass.send']._push_progress)
+        data[PROGRESS_PUSH].update(self.ids)
+
+    @api.model
+    def _push_progress(self):
+        """
+        Envia o progresso no canal wa_mass_send_<id> (wa.mass_send/progress),
+        assinado pelo formulário aberto (só por quem pode ler o envio, ver
+        ir.websocket): acompanhar uma campanha não lê a fila.
+        """
+        ids = self.env.cr.precommit.data.pop(PROGRESS_PUSH, None)
+        if not ids:
+            return
+        for mass_send in self.sudo().browse(sorted(ids)).exists():
+            self.env['bus.bus']._sendone(f'{PROGRESS_CHANNEL}{mass_send.id}', 'wa.mass_send/progress',
+                                         mass_send._progress_payload())
+
+    def _progress_payload(self):
+        self.ensure_one()
+        payload = {name: self[name] for name in COUNTER_FIELDS}
+        payload.update(id=self.id, state=self.state, throughput=self.throughput)
+        return payload
+
+    def _recount_progress(self, only_empty=False):
+        """
+        Recalcula os contadores a partir da fila (lê os itens dos envios;
+        só para correção). only_empty: apenas envios com todos os contadores
+        zerados que já têm itens na fila.
+        """
+        self._flush_progress()
+        self.env['wa.send.queue'].flush_model(['mass_send_id', 'status', 'wa_delivery_status'])
+        mass_send_ids = self.ids
+        if only_empty:
+            # EXISTS pelo índice (mass_send_id, mobile_key): não percorre a fila inteira
+            self.env.cr.execute(f"""
+                SELECT m.id FROM wa_mass_send m
+                 WHERE {' AND '.join(f"coalesce(m.{name}, 0) = 0" for name in COUNTER_FIELDS)}
+                   AND (%(all)s OR m.id = ANY(%(ids)s))
+                   AND EXISTS (SELECT 1 FROM wa_send_queue q WHERE q.mass_send_id = m.id)
+            """, {'all': not self, 'ids': self.ids})
+            mass_send_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not mass_send_ids:
+                return True
+        delivered = [key for key, rank in STATUS_RANK.items() if rank >= STATUS_RANK['delivered']]
+        read = [key for key, rank in STATUS_RANK.items() if rank >= STATUS_RANK['read']]
+        self.env.cr.execute("""
+            UPDATE wa_mass_send m
+               SET queue_pending_count = c.pending,
+                   queue_sent_count = c.sent,
+                   queue_error_count = c.error,
+                   queue_cancelled_count = c.cancelled,
+                   queue_delivered_count = c.delivered,
+                   queue_read_count = c.read
+              FROM (SELECT mass_send_id,
+                           count(*) FILTER (WHERE status IN ('pending', 'sending')) AS pending,
+                           count(*) FILTER (WHERE status = 'sent') AS sent,
+                           count(*) FILTER (WHERE status = 'error') AS error,
+                           count(*) FILTER (WHERE status = 'cancelled') AS cancelled,
+                           count(*) FILTER (WHERE wa_delivery_status = ANY(%(delivered)s)) AS delivered,
+                           count(*) FILTER (WHERE wa_delivery_status = ANY(%(read)s)) AS read
+                      FROM wa_send_queue
+                     WHERE %(all)s OR mass_send_id = ANY(%(ids)s)
+                  GROUP BY mass_send_id) c
+             WHERE c.mass_send_id = m.id
+         RETURNING m.id
+        """, {'delivered': delivered, 'read': read, 'all': not mass_send_ids, 'ids': mass_send_ids})
+        mass_sends = self.browse([row[0] for row in self.env.cr.fetchall()])
+        mass_sends.invalidate_recordset(list(COUNTER_FIELDS))
+        mass_sends._notify_progress()
+        return True
+
+    def action_recount_progress(self):
+        return self._recount_progress()
+
+    def action_generate_queue(self):
+        """
+        Gera a fila pelo cron WA: Generate Send Queue, em blocos de
+        AUDIENCE_CHUNK parceiros com commit a cada bloco; queue_cursor guarda
+        até onde a audiência já foi lida.
+        """
+        self.write({'state': 'generating', 'queue_cursor': 0, 'invalid_partner_ids': [(5, 0, 0)]})
+        self.env.ref('wa_conn.ir_cron_wa_mass_send_generate_queue')._trigger()
+        return True
+
+    def _generate_queue_chunk(self, size=AUDIENCE_CHUNK):
+        """Transforma o próximo bloco da audiência em itens da fila; retorna True se pode haver mais."""
+        self.ensure_one()
+        chunk = next(self._wa_audience_chunks(after_id=self.queue_cursor, size=size), None)
+        if not chunk:
+            return False
+        Queue = self.env['wa.send.queue']
+        # Sem celular ou sem WhatsApp: nem entra na fila
+        recipients = self._wa_recipients(chunk)
+        by_key = {}
+        for partner in recipients:
+            key = self.env['wa.number.check']._normalize(self.wa_account_id, partner.mobile)
+            if key:
+                by_key.setdefault(key, partner)
+        # Celular já enfileirado por um bloco anterior (índice mass_send_id, mobile_key)
+        Queue.flush_model(['mass_send_id', 'mobile_key'])
+        self.env.cr.execute("""
+            SELECT mobile_key FROM wa_send_queue WHERE mass_send_id = %s AND mobile_key = ANY(%s)
+        """, [self.id, list(by_key)])
+        for (key,) in self.env.cr.fetchall():
+            by_key.pop(key, None)
+        keys = {partner.id: key for key, partner in by_key.items()}
+        queue_vals = []
+        for account, partners in self._wa_shard(self.env['res.partner'].browse(list(keys))).items():
+            for partner in partners:
+                queue_vals.append(self._wa_queue_vals(partner, account, keys[partner.id]))
+        Queue.create(queue_vals)
+        self.queue_cursor = chunk[-1].id
+        return len(chunk) >= size
+
+    def _wa_queue_vals(self, partner, account, mobile_key):
+        template = self.wa_template_id
+        return {
+            'mass_send_id': self.id,
+            'partner_id': partner.id,
+            'mobile_key': mobile_key,
+            'wa_account_id': account.id,
+            'wa_template_id': template.id if template else False,
+            'wa_message': self.wa_message,
+            'wa_media': template.wa_media if template else False,
+            'wa_media_filename': template.wa_media_filename if template else False,
+            'scheduled_datetime': self.scheduled_datetime,
+        }
+
+    @api.model
+    def _cron_generate_queue(self, time_limit=50):
+        """Gera a fila dos envios em 'generating', um bloco por transação, até time_limit segundos."""
+        deadline = time.monotonic() + time_limit
+        for mass_send in self.search([('state', '=', 'generating')]):
+            while True:
+                if time.monotonic() >= deadline:
+                    # Sobrou audiência: continua numa nova execução
+                    self.env.ref('wa_conn.ir_cron_wa_mass_send_generate_queue')._trigger()
+                    return
+                more = mass_send._generate_queue_chunk()
+                if not more:
+                    # Blocos anteriores podem já ter sido enviados (ou nenhum item ter
+                    # entrado na fila): o estado final vem dos contadores
+                    mass_send.state = 'scheduled'
+                    mass_send._update_state_from_queue()
+                self.env.cr.commit()
+                # Memória constante: descarta os parceiros do bloco já gravado
+                self.env.invalidate_all()
+                if not more:
+                    _logger.info(f"[wa.mass.send] Queue generated for mass send {mass_send.id}")
+                    break
 
     def action_send_queue(self):
+        # Itens pendentes e vencidos destes envios, com o mesmo bloqueio do cron/dispatcher
+        self._claim_due_items(mass_send_ids=self.ids).process_queue_item()
+        self._update_state_from_queue()
+
+    def _update_state_from_queue(self):
+        """Estado do envio em massa pelos contadores de progresso (sem ler a fila)."""
+        self._flush_progress()
         for mass_send in self:
-            # Processa todos os itens pendentes da fila
-            pending_items = mass_send.queue_ids.filtered(lambda q: q.status == 'pending')
-            for item in pending_items:
-                item.process_queue_item()
-            # Atualiza status do envio em massa
-            if all(q.status == 'sent' for q in mass_send.queue_ids):
-                mass_send.state = 'done'
-            elif any(q.status == 'error' for q in mass_send.queue_ids):
-                mass_send.state = 'error'
+            if mass_send.state == 'generating':
+                continue
+            finished = mass_send.queue_sent_count + mass_send.queue_cancelled_count
+            if mass_send.queue_error_count:
+                state = 'error'
+            elif mass_send.queue_pending_count:
+                # Fila recém-gerada, nada processado ainda: continua agendado
+                state = 'scheduled' if mass_send.state == 'scheduled' and not finished else 'sending'
             else:
-                mass_send.state = 'sending'
+                state = 'done'
+            if mass_send.state != state:
+                mass_send.state = state
+                mass_send._notify_progress()
+
+    @api.model
+    def cron_process_send_queue(self, limit=100):
+        """
+        Processa um lote de itens pendentes e vencidos (um send_batch por
+        conta e faixa, faixas mais prioritárias primeiro). Chamado pelo cron e
+        pelo dispatcher; SKIP LOCKED evita que os dois enviem os mesmos itens.
+        Retorna o número de itens processados.
+        """
+        pending_items = self._claim_due_items(limit=limit)
+        pending_items.process_queue_item()
+        # Só atualiza o estado dos envios em massa: os demais itens ficam para o próximo lote
+        pending_items.mass_send_id._update_state_from_queue()
+        return len(pending_items)
+
+    @api.model
+    def _claim_due_items(self, limit=None, mass_send_ids=None):
+        """
+        Itens pendentes e vencidos (agendamento e backoff), bloqueados até o
+        commit; SKIP LOCKED pula os que outro worker já pegou.
+        """
+        self.env['wa.send.queue'].flush_model(['status', 'lane', 'scheduled_datetime', 'next_attempt_at'])
+        where, params = "", []
+        if mass_send_ids is not None:
+            where = "AND mass_send_id = ANY(%s)"
+            params.append(list(mass_send_ids))
+        params.append(limit)
+        self.env.cr.execute(f"""
+            SELECT id FROM wa_send_queue
+             WHERE status = 'pending'
+               AND (scheduled_datetime IS NULL OR scheduled_datetime <= now() at time zone 'UTC')
+               AND (next_attempt_at IS NULL OR next_attempt_at <= now() at time zone 'UTC')
+               {where}
+          ORDER BY {LANE_ORDER_SQL}, scheduled_datetime, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, params)
+        return self.env['wa.send.queue'].browse([row[0] for row in self.env.cr.fetchall()])
 
     @api.model
-    def cron_process_send_queue(self):
-        # Processa todos os itens pendentes da fila, pode ser chamado por um cron
-        pending_items = self.env['wa.send.queue'].search([
-            ('status', '=', 'pending'),
-            ('scheduled_datetime', '<=', fields.Datetime.now()),
-        ], limit=10)  # Processa em lotes de 10
-        for item in pending_items:
-            item.process_queue_item()
-        # Atualiza o status dos envios em massa relacionados
-        for mass_send in pending_items.mapped('mass_send_id'):
-            mass_send.action_send_queue()
+    def _dispatch_send_queue(self, limit=100):
+        return self.cron_process_send_queue(limit=limit) >= limit
@@ -68,7 +68,6 @@ class WATemplate(models.Model):
 
         # Use template language if set, else recipient/user/default
         lang = self.lang_id.code or getattr(record, 'lang', False) or self.env.user.lang or 'en_US'
-        print(lang)
         record = record.with_context(lang=lang)
 
         def format_currency(amount, currency):
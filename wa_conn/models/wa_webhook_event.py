@@ -0,0 +1,166 @@
+from odoo import api, fields, models
+from collections import defaultdict
+from datetime import timedelta
+import logging
+import time
+
+from ..tools.resilience import backoff
+
+_logger = logging.getLogger(__name__)
+
+# Canal NOTIFY usado pelo gateway e pelo Odoo para avisar mudanças de webhook
+ACCOUNT_CHANNEL = 'wa_account_changed'
+# Tentativas antes de um evento ficar em erro
+MAX_ATTEMPTS = 5
+# Eventos por transação e tempo máximo (s) de uma execução do cron
+BATCH_SIZE = 100
+TIME_LIMIT = 50
+
+
+class WAWebhookEvent(models.Model):
+    """
+    Caixa de entrada de webhooks brutos.
+
+    O gateway (tools/webhook_gateway.py) grava os eventos em lote direto no
+    Postgres e acorda o cron pelo mesmo NOTIFY usado por ir.cron._trigger();
+    o cron processa na ordem de chegada via wa.account.inbound_handle.
+    """
+    _name = 'wa.webhook.event'
+    _description = 'WhatsApp Webhook Event'
+    _order = 'id desc'
+    _log_access = False
+
+    account_id = fields.Many2one('wa.account', string="Account", required=True, ondelete='cascade',
+                                 readonly=True, index=True)
+    payload = fields.Json(string="Payload", readonly=True)
+    received_at = fields.Datetime(string="Received At", readonly=True, default=fields.Datetime.now)
+    processed_at = fields.Datetime(string="Processed At", readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('error', 'Error'),
+    ], string="State", default='pending', required=True, readonly=True)
+    attempts = fields.Integer(string="Attempts", readonly=True)
+    next_attempt_at = fields.Datetime(string="Next Attempt", readonly=True,
+                                      help="Falhou: volta a ser processado a partir deste horário (backoff).")
+    error = fields.Text(string="Error", readonly=True)
+
+    def init(self):
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS wa_webhook_event_pending_idx
+                ON wa_webhook_event (id) WHERE state = 'pending'
+        """)
+
+    # ==================== PROCESSAMENTO ====================
+    @api.model
+    def _cron_process(self, batch_size=BATCH_SIZE, time_limit=TIME_LIMIT):
+        """Processa eventos pendentes (e já fora do backoff) em lotes, com commit a cada lote."""
+        deadline = time.monotonic() + time_limit
+        total = 0
+        while time.monotonic() < deadline:
+            processed = self._process_batch(batch_size)
+            self.env.cr.commit()
+            total += processed
+            if processed < batch_size:
+                break
+        else:
+            # Sobrou trabalho: agenda outra execução imediata
+            self.env.ref('wa_conn.ir_cron_wa_webhook_event_process')._trigger()
+        if total:
+            _logger.info(f"[wa.webhook.event] Processed {total} events")
+        return total
+
+    @api.model
+    def _process_batch(self, limit):
+        # SKIP LOCKED: um processamento manual concorrente não pega os mesmos eventos
+        self.flush_model(['state', 'next_attempt_at'])
+        self.env.cr.execute("""
+            SELECT id FROM wa_webhook_event
+             WHERE state = 'pending'
+               AND (next_attempt_at IS NULL OR next_attempt_at <= now() at time zone 'UTC')
+          ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, [limit])
+        events = self.browse([row[0] for row in self.env.cr.fetchall()])
+        for event in events - events._process_receipts():
+            event._process()
+        return len(events)
+
+    def _process_receipts(self):
+        """
+        Recibos de entrega do lote inteiro aplicados num único UPDATE por
+        conta (wa.receipt); retorna os eventos atendidos. Se algo falhar, os
+        eventos seguem pelo caminho normal (_process), um a um.
+        """
+        events_by_account = defaultdict(lambda: self.browse())
+        receipts_by_account = defaultdict(list)
+        for event in self:
+            try:
+                receipts = event.account_id.sudo().normalize_receipts(event.payload or {})
+            except Exception as e:
+                _logger.warning(f"[wa.webhook.event] Event {event.id}: could not read receipts: {e}")
+                continue
+            if receipts:
+                events_by_account[event.account_id] |= event
+                receipts_by_account[event.account_id].extend(receipts)
+        handled = self.browse()
+        for account, events in events_by_account.items():
+            try:
+                with self.env.cr.savepoint():
+                    self.env['wa.receipt'].sudo()._apply(account, receipts_by_account[account])
+            except Exception as e:
+                _logger.warning(f"[wa.webhook.event] Receipts for account {account.id} failed: {e}")
+                continue
+            handled |= events
+        if handled:
+            handled.write({'state': 'done', 'processed_at': fields.Datetime.now(), 'error': False})
+        return handled
+
+    def _process(self):
+        self.ensure_one()
+        try:
+            with self.env.cr.savepoint():
+                self.account_id.sudo().inbound_handle(self.payload or {})
+        except Exception as e:
+            attempts = self.attempts + 1
+            _logger.warning(f"[wa.webhook.event] Event {self.id} failed (attempt {attempts}): {e}")
+            # Backoff: uma instabilidade curta não consome todas as tentativas em segundos
+            self.write({
+                'state': 'error' if attempts >= MAX_ATTEMPTS else 'pending',
+                'attempts': attempts,
+                'error': str(e),
+                'next_attempt_at': False if attempts >= MAX_ATTEMPTS
+                else fields.Datetime.now() + timedelta(seconds=backoff(attempts)),
+            })
+            return False
+        self.write({'state': 'done', 'processed_at': fields.Datetime.now(), 'error': False,
+                    'next_attempt_at': False})
+        return True
+
+    @api.model
+    def _dispatch_webhook_events(self):
+        # Um lote por chamada; o dispatcher repete enquanto houver lotes cheios
+        return self._process_batch(BATCH_SIZE) >= BATCH_SIZE
+
+    def action_retry(self):
+        self.write({'state': 'pending', 'attempts': 0, 'error': False, 'next_attempt_at': False})
+        self.env['wa.dispatcher']._notify('webhook_event')
+        self.env.ref('wa_conn.ir_cron_wa_webhook_event_process')._trigger()
+        return True
+
+    @api.autovacuum
+    def _gc_done_events(self):
+        """Remove eventos processados há mais de wa_conn.webhook_event_retention_days (padrão 7)."""
+        days = int(self.env['ir.config_parameter'].sudo().get_param('wa_conn.webhook_event_retention_days', 7))
+        self.env.cr.execute("""
+            DELETE FROM wa_webhook_event
+             WHERE state = 'done'
+               AND processed_at < (now() at time zone 'UTC') - %s * interval '1 day'
+        """, [days])
+
+    # ==================== GATEWAY ====================
+    @api.model
+    def _notify_accounts_changed(self):
+        """Avisa o gateway para recarregar o cache de contas (entregue no commit)."""
+        self.env.cr.execute(f"NOTIFY {ACCOUNT_CHANNEL}")
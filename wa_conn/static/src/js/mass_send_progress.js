@@ -0,0 +1,102 @@
+/** @odoo-module */
+
+import { Component, onWillUnmount, onWillUpdateProps, useState } from "@odoo/owl";
+
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { standardWidgetProps } from "@web/views/widgets/standard_widget_props";
+
+const COUNTERS = [
+	"queue_pending_count",
+	"queue_sent_count",
+	"queue_error_count",
+	"queue_cancelled_count",
+	"queue_delivered_count",
+	"queue_read_count",
+	"throughput",
+];
+
+/**
+ * Campaign progress on the wa.mass.send form. The counters are stored on the
+ * record and the server pushes them on the wa_mass_send_<id> bus channel
+ * (wa.mass_send/progress), so the widget updates without reloading the record
+ * or reading the send queue.
+ */
+export class MassSendProgress extends Component {
+	static props = { ...standardWidgetProps };
+	static template = "wa_conn.MassSendProgress";
+
+	setup() {
+		this.busService = useService("bus_service");
+		this.state = useState(this.readRecord(this.props.record));
+		this.channel = null;
+		this.onProgress = (payload) => {
+			if (payload.id === this.props.record.resId) {
+				Object.assign(this.state, payload);
+			}
+		};
+		this.busService.subscribe("wa.mass_send/progress", this.onProgress);
+		this.listen(this.props.record.resId);
+		onWillUpdateProps((nextProps) => {
+			Object.assign(this.state, this.readRecord(nextProps.record));
+			this.listen(nextProps.record.resId);
+		});
+		onWillUnmount(() => {
+			this.busService.unsubscribe("wa.mass_send/progress", this.onProgress);
+			this.listen(false);
+		});
+	}
+
+	readRecord(record) {
+		const values = { state: record.data.state };
+		for (const name of COUNTERS) {
+			values[name] = record.data[name] || 0;
+		}
+		return values;
+	}
+
+	listen(resId) {
+		const channel = resId ? `wa_mass_send_${resId}` : null;
+		if (channel === this.channel) {
+			return;
+		}
+		if (this.channel) {
+			this.busService.deleteChannel(this.channel);
+		}
+		if (channel) {
+			this.busService.addChannel(channel);
+		}
+		this.channel = channel;
+	}
+
+	get total() {
+		return (
+			this.state.queue_pending_count +
+			this.state.queue_sent_count +
+			this.state.queue_error_count +
+			this.state.queue_cancelled_count
+		);
+	}
+
+	percent(count) {
+		return this.total ? (count * 100) / this.total : 0;
+	}
+
+	get progress() {
+		return Math.floor(this.percent(this.total - this.state.queue_pending_count));
+	}
+
+	get throughput() {
+		return this.state.throughput.toFixed(1);
+	}
+}
+
+export const massSendProgress = {
+	component: MassSendProgress,
+	fieldDependencies: [
+		{ name: "state", type: "selection" },
+		...COUNTERS.map((name) => ({ name, type: name === "throughput" ? "float" : "integer" })),
+	],
+};
+
+registry.category("view_widgets").add("wa_mass_send_progress", massSendProgress);
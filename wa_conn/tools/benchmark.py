@@ -0,0 +1,388 @@
+"""
+Benchmarks dos hot paths de entrada e saída.
+
+Roda num shell do Odoo. Tudo acontece dentro de um savepoint desfeito no fim
+e nenhum HTTP sai da máquina (o transporte dos adapters é trocado por um stub):
+
+    odoo-bin shell -d <db> --no-http <<'EOF'
+    from odoo.addons.wa_conn.tools.benchmark import run
+    run(env, output='bench.json', label='my-branch')
+    EOF
+
+Cada caso reporta throughput, latência (avg/p50/p99/max), queries SQL por
+iteração e pico de memória (tracemalloc, numa passada separada para não
+distorcer a latência). Para comparar dois resultados (não precisa do Odoo):
+
+    python wa_conn/tools/benchmark.py compare before.json after.json
+
+Casos:
+    inbound.<provider>.<kind>   inbound_handle (normalize -> resolve -> post)
+                                para text, media, reaction, reply e batch
+    outbound.<provider>.send_text / send_batch   com transporte stub
+    mail_message.create          message_post num canal WhatsApp
+    template.render              render_template sobre 10k parceiros
+    bot.flow                     wa.bot.simulate (se wa_conn_bot instalado)
+"""
+import argparse
+import contextlib
+import datetime
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    from . import payloads
+except ImportError:
+    import payloads
+
+INBOUND_KINDS = ('text', 'media', 'reaction', 'reply', 'batch')
+BATCH_SIZE = 10
+
+# Valores mínimos para criar uma conta de cada provider
+PROVIDER_VALS = {
+    'evolution': {'api_url': 'http://bench.invalid', 'api_key': 'bench'},
+    'quepasa': {'quepasa_url': 'http://bench.invalid', 'quepasa_bot_token': 'bench'},
+}
+
+TEMPLATE_BODY = (
+    "Hello {{ name }}!\n"
+    "Your email is {{ email }} and your phone {{ object.mobile }}.\n"
+    "{% for tag in category_id %}- {{ tag.name }}\n{% endfor %}"
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+# ==================== TRANSPORTE STUB ====================
+class StubTransport:
+    """Substitui Sync/AsyncTransport: responde 200 sem rede (available=False desativa o asyncio)."""
+
+    available = False
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+
+    def request(self, method, url, *, timeout=20, **kwargs):
+        from .transport import Response
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        message_id = payloads.new_message_id()
+        return Response(200, json.dumps({'id': message_id, 'key': {'id': message_id}, 'status': 'PENDING'}))
+
+
+@contextlib.contextmanager
+def stub_transport(latency_ms=0.0):
+    from . import transport
+    saved = transport._SYNC, transport._ASYNC
+    stub = transport._SYNC = transport._ASYNC = StubTransport(latency_ms)
+    try:
+        yield stub
+    finally:
+        transport._SYNC, transport._ASYNC = saved
+
+
+# ==================== MEDIÇÃO ====================
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(latencies, queries, wall, units=1):
+    """Estatísticas de um caso; ``units`` = itens processados por iteração (ex: mensagens num batch)."""
+    n = len(latencies)
+    return {
+        'iterations': n,
+        'throughput': round(n * units / wall, 2) if wall else 0.0,
+        'avg_ms': round(sum(latencies) / n, 3) if n else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(max(latencies), 3) if n else 0.0,
+        'queries_avg': round(sum(queries) / n, 2) if n else 0.0,
+        'queries_max': max(queries) if n else 0,
+    }
+
+
+def measure(env, make_call, iterations, units=1, memory_iterations=20):
+    """
+    Executa ``make_call(i)()`` ``iterations`` vezes medindo latência e
+    queries (com flush, para contar as escritas adiadas do ORM), depois uma
+    passada curta com tracemalloc para o pico de memória.
+    """
+    cr = env.cr
+    latencies, queries = [], []
+    gc.collect()
+    started = time.perf_counter()
+    for i in range(iterations):
+        call = make_call(i)
+        count = cr.sql_log_count
+        start = time.perf_counter()
+        call()
+        env.flush_all()
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(cr.sql_log_count - count)
+    result = summarize(latencies, queries, time.perf_counter() - started, units)
+
+    if memory_iterations:
+        tracemalloc.start()
+        try:
+            for i in range(iterations, iterations + memory_iterations):
+                make_call(i)()
+                env.flush_all()
+            result['peak_mem_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+# ==================== FIXTURES ====================
+def available_providers(env):
+    selection = env['wa.account']._fields['provider'].get_values(env)
+    return [key for key in selection if key in PROVIDER_VALS]
+
+
+def make_account(env, provider):
+    return env['wa.account'].create(dict(
+        PROVIDER_VALS[provider],
+        name=f'Benchmark {provider}',
+        provider=provider,
+    ))
+
+
+def _inbound_payload(provider, kind, seq, contacts, seeds):
+    mobile = payloads.mobile_for(seq % contacts)
+    if kind == 'batch':
+        mobiles = [payloads.mobile_for((seq * BATCH_SIZE + j) % contacts) for j in range(BATCH_SIZE)]
+        if provider == 'evolution':
+            return payloads.evolution_batch(mobiles)
+        return payloads.quepasa_batch(mobiles)
+    return payloads.make(provider, kind, mobile, target_id=seeds.get(mobile))
+
+
+def bench_inbound(env, account, iterations, contacts):
+    provider = account.provider
+    results = {}
+    # Uma mensagem por contato: cria parceiros/canais e dá alvo a reações e replies
+    seeds = {}
+    for seq in range(contacts):
+        mobile = payloads.mobile_for(seq)
+        seeds[mobile] = payloads.new_message_id()
+        raw = (payloads.evolution_text(mobile, message_id=seeds[mobile]) if provider == 'evolution'
+               else payloads.quepasa_text(mobile, message_id=seeds[mobile]))
+        account.inbound_handle(raw)
+    env.flush_all()
+
+    for kind in INBOUND_KINDS:
+        n = max(iterations // BATCH_SIZE, 1) if kind == 'batch' else iterations
+        raws = [_inbound_payload(provider, kind, seq, contacts, seeds) for seq in range(n + 20)]
+        results[f'inbound.{provider}.{kind}'] = measure(
+            env, lambda i: lambda: account.inbound_handle(raws[i]), n,
+            units=BATCH_SIZE if kind == 'batch' else 1)
+    return results
+
+
+def bench_outbound(env, account, iterations):
+    provider = account.provider
+    results = {}
+    results[f'outbound.{provider}.send_text'] = measure(
+        env, lambda i: lambda: account.send_text(payloads.mobile_for(i), 'Benchmark'), iterations)
+    batch = [(payloads.mobile_for(i), f'Benchmark {i}', {}) for i in range(100)]
+    results[f'outbound.{provider}.send_batch'] = measure(
+        env, lambda i: lambda: account.send_batch(batch), max(iterations // 20, 1), units=len(batch),
+        memory_iterations=3)
+    return results
+
+
+def bench_mail_message(env, account, iterations):
+    partner = env['res.partner'].create({'name': 'Benchmark outbound', 'mobile': payloads.mobile_for(99999)})
+    channel = env['discuss.channel'].create({
+        'name': partner.name,
+        'channel_type': 'channel',
+        'is_wa': True,
+        'wa_partner_id': partner.id,
+        'wa_account_id': account.id,
+    })
+    return {'mail_message.create': measure(
+        env, lambda i: lambda: channel.message_post(
+            body=f'Benchmark {i}', message_type='comment', subtype_xmlid='mail.mt_comment'),
+        iterations)}
+
+
+def bench_template(env, records=10000):
+    Partner = env['res.partner']
+    tags = env['res.partner.category'].create([{'name': f'Benchmark tag {i}'} for i in range(3)])
+    partners = Partner.create([{
+        'name': f'Benchmark {i}',
+        'email': f'bench{i}@example.com',
+        'mobile': payloads.mobile_for(i),
+        'category_id': [(6, 0, tags.ids)],
+    } for i in range(records)])
+    env.flush_all()
+    env.invalidate_all()
+    template = env['wa.template'].create({
+        'name': 'Benchmark',
+        'model_id': env['ir.model']._get_id('res.partner'),
+        'wa_message': TEMPLATE_BODY,
+    })
+    return {'template.render': measure(
+        env, lambda i: lambda: template.render_template('wa_message', partners[i % records]),
+        records, memory_iterations=100)}
+
+
+def bench_bot(env, sessions=20, script='Hello\n/help\n@wait 5\nOk'):
+    if 'wa.bot' not in env:
+        return {}
+    bot = env['wa.bot'].search([('active', '=', True)], limit=1)
+    if not bot:
+        return {}
+    report = bot.simulate(script, sessions=sessions, details=0, rollback=False)
+    latency = report['latency_ms']
+    return {'bot.flow': {
+        'iterations': report['messages'],
+        'throughput': report['throughput'],
+        'avg_ms': latency['avg'],
+        'p50_ms': latency['p50'],
+        'p95_ms': latency['p95'],
+        'max_ms': latency['max'],
+        'queries_avg': report['queries']['avg'],
+        'queries_max': report['queries']['max'],
+        'errors': report['errors'],
+    }}
+
+
+# ==================== EXECUÇÃO ====================
+def run(env, cases=None, iterations=200, contacts=50, template_records=10000,
+        output=None, label=None, latency_ms=0.0):
+    """
+    Executa os benchmarks e desfaz tudo no fim.
+
+    Args:
+        env: Environment do shell do Odoo.
+        cases: prefixos dos casos a rodar (ex: ['inbound', 'template']); todos se None.
+        iterations: iterações por caso.
+        contacts: contatos distintos usados no inbound.
+        template_records: parceiros renderizados em template.render.
+        output: caminho do JSON de resultado.
+        label: identificação do resultado (ex: hash do commit).
+        latency_ms: latência simulada por requisição no transporte stub.
+
+    Returns:
+        dict: {'meta': {...}, 'results': {case: stats}}
+    """
+    def wanted(prefix):
+        return not cases or any(prefix.startswith(c) or c.startswith(prefix) for c in cases)
+
+    env = env(su=True)
+    results = {}
+    try:
+        with stub_transport(latency_ms), env.cr.savepoint():
+            accounts = [make_account(env, provider) for provider in available_providers(env)]
+            env.flush_all()
+            for account in accounts:
+                if wanted(f'inbound.{account.provider}'):
+                    results.update(bench_inbound(env, account, iterations, contacts))
+                if wanted(f'outbound.{account.provider}'):
+                    results.update(bench_outbound(env, account, iterations))
+            if accounts and wanted('mail_message'):
+                results.update(bench_mail_message(env, accounts[0], iterations))
+            if wanted('template'):
+                results.update(bench_template(env, template_records))
+            if wanted('bot'):
+                results.update(bench_bot(env))
+            raise _Rollback()
+    except _Rollback:
+        pass
+    finally:
+        env.invalidate_all()
+
+    report = {
+        'meta': {
+            'label': label,
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'database': env.cr.dbname,
+            'iterations': iterations,
+            'stub_latency_ms': latency_ms,
+            'python': sys.version.split()[0],
+        },
+        'results': results,
+    }
+    print(format_report(report))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    return report
+
+
+def format_report(report):
+    lines = [f"{'case':<34} {'iter':>6} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8} {'mem kb':>9}"]
+    for case, r in sorted(report['results'].items()):
+        lines.append(
+            f"{case:<34} {r['iterations']:>6} {r['throughput']:>9} {r['p50_ms']:>9} "
+            f"{r.get('p99_ms', r.get('p95_ms', '')):>9} {r['queries_avg']:>8} {r.get('peak_mem_kb', ''):>9}")
+    return '\n'.join(lines)
+
+
+# ==================== COMPARAÇÃO ====================
+# (métrica, maior é melhor)
+COMPARED = (('throughput', True), ('p50_ms', False), ('p99_ms', False), ('queries_avg', False),
+            ('peak_mem_kb', False))
+
+
+def compare(before, after, threshold=10.0):
+    """
+    Compara dois relatórios; retorna (linhas, regressões). Uma regressão é
+    uma piora maior que ``threshold`` % em alguma métrica.
+    """
+    lines, regressions = [], []
+    for case in sorted(set(before['results']) | set(after['results'])):
+        old, new = before['results'].get(case), after['results'].get(case)
+        if old is None or new is None:
+            lines.append(f"{case}: {'removed' if new is None else 'added'}")
+            continue
+        parts = []
+        for metric, higher_is_better in COMPARED:
+            if metric not in old or metric not in new:
+                continue
+            a, b = old[metric], new[metric]
+            change = ((b - a) / a * 100) if a else 0.0
+            worse = change < -threshold if higher_is_better else change > threshold
+            if worse:
+                regressions.append((case, metric, a, b, change))
+            parts.append(f"{metric} {a} -> {b} ({change:+.1f}%){' !' if worse else ''}")
+        lines.append(f"{case}: " + ', '.join(parts))
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare wa_conn benchmark results')
+    sub = parser.add_subparsers(dest='command', required=True)
+    cmp_parser = sub.add_parser('compare')
+    cmp_parser.add_argument('before')
+    cmp_parser.add_argument('after')
+    cmp_parser.add_argument('--threshold', type=float, default=10.0, help='regression threshold in %%')
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    lines, regressions = compare(before, after, args.threshold)
+    print('\n'.join(lines))
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) above {args.threshold}%')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Ids de canais WhatsApp (discuss.channel.is_wa) em memória, por banco e por worker.
+
+Usado por MailMessage.create para descartar mensagens de outros canais sem
+ler discuss.channel. O cache guarda também os ids que não são WA: um id
+desconhecido (canal novo) é consultado uma única vez e classificado, então
+criar canais não invalida nada. Só a troca de is_wa de um canal existente
+avança a geração (sequência wa_channel_generation, depois do commit); cada
+worker confere a geração no máximo a cada ``min_interval`` segundos.
+"""
+import threading
+import time
+
+
+class ChannelCache:
+
+    def __init__(self, min_interval=2.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        # {dbname: [geração, última conferência (monotonic), ids WA, ids não WA]}
+        self._state = {}
+
+    def wa_ids(self, dbname, ids, generation, load):
+        """
+        Subconjunto de ``ids`` que são canais WA. ``generation()`` lê a
+        geração atual; ``load(ids)`` retorna [(id, is_wa)] dos canais
+        existentes entre ``ids``.
+        """
+        with self._lock:
+            state = self._state.get(dbname)
+            now = time.monotonic()
+            if state is None or now - state[1] >= self.min_interval:
+                current = generation()
+                if state is None or state[0] != current:
+                    state = self._state[dbname] = [current, now, set(), set()]
+                else:
+                    state[1] = now
+            unknown = [cid for cid in ids if cid not in state[2] and cid not in state[3]]
+            if unknown:
+                # Canal ainda não commitado não aparece: continua desconhecido
+                for cid, is_wa in load(unknown):
+                    (state[2] if is_wa else state[3]).add(cid)
+            return {cid for cid in ids if cid in state[2]}
+
+    def forget(self, dbname, ids):
+        """Volta ``ids`` a desconhecidos neste worker (relidos na próxima consulta)."""
+        with self._lock:
+            state = self._state.get(dbname)
+            if state:
+                state[2].difference_update(ids)
+                state[3].difference_update(ids)
+
+    def clear(self, dbname=None):
+        with self._lock:
+            if dbname:
+                self._state.pop(dbname, None)
+            else:
+                self._state.clear()
+
+
+# Cache compartilhado pelo worker
+CACHE = ChannelCache()
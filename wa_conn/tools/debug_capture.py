@@ -0,0 +1,43 @@
+"""
+Redução de payloads para a captura de debug (wa.debug.capture).
+
+Strings longas (base64 de mídia, thumbnails) são cortadas antes de
+serializar, então capturar um webhook de vários MB custa o mesmo que
+capturar um de texto.
+"""
+import json
+
+# Cabeçalhos que nunca são gravados na captura
+SECRET_HEADERS = {'authorization', 'cookie', 'apikey', 'webhook_key', 'webhook-key', 'x-webhook-key'}
+
+
+def _shrink(value, max_str, depth=0):
+    if isinstance(value, str):
+        if len(value) > max_str:
+            return f"{value[:max_str]}…(+{len(value) - max_str} chars)"
+        return value
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    if depth > 20:
+        return '…'
+    if isinstance(value, dict):
+        return {str(k): _shrink(v, max_str, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_shrink(v, max_str, depth + 1) for v in value]
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if hasattr(value, '__dict__'):
+        return _shrink(vars(value), max_str, depth + 1)
+    return repr(value)
+
+
+def shrink(payload, max_str=256, max_bytes=16384):
+    """Serializa ``payload`` em JSON com strings e tamanho total limitados."""
+    text = json.dumps(_shrink(payload, max_str), ensure_ascii=False, default=str, indent=1)
+    if len(text) > max_bytes:
+        text = f"{text[:max_bytes]}\n…(+{len(text) - max_bytes} chars)"
+    return text
+
+
+def redact_headers(headers):
+    return {k: ('***' if k.lower() in SECRET_HEADERS else v) for k, v in dict(headers).items()}
@@ -0,0 +1,426 @@
+"""
+Servidor fake de Evolution API e Quepasa para testes end-to-end e de carga.
+
+Implementa os endpoints usados pelos adapters (wa_conn_evolution e
+wa_conn_quepasa) com latência, taxa de erro e rate limit (HTTP 429)
+configuráveis, e pode disparar webhooks realistas contra o Odoo a uma taxa
+fixa. Só usa a stdlib.
+
+Uso:
+    python wa_conn/tools/fake_provider.py --port 8090 --latency 80 --jitter 40 \\
+        --error-rate 0.01 --rate-limit 50
+
+    # também dispara 20 webhooks/s (Evolution) contra a conta do Odoo
+    python wa_conn/tools/fake_provider.py --webhook-url http://localhost:8069/wa/webhook/<uuid> \\
+        --webhook-key <key> --webhook-rate 20 --webhook-provider evolution --webhook-kinds text,reply
+
+Configure a conta no Odoo com API URL (Evolution) ou Quepasa URL apontando
+para http://<host>:<port>. GET /__stats retorna os contadores em JSON.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    from . import payloads
+except ImportError:
+    import payloads
+
+QR_DATA_URI = 'data:image/png;base64,' + payloads.PNG_1PX_B64
+
+
+class Behaviour:
+    """Latência, erros e rate limit aplicados a cada requisição."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=0.0, seed=None):
+        self.latency = latency / 1000.0
+        self.jitter = jitter / 1000.0
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = rate_limit
+        self._refill = time.monotonic()
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+
+    def allow(self):
+        """Token bucket: False quando a taxa passou de rate_limit req/s."""
+        if not self.rate_limit:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refill) * self.rate_limit)
+            self._refill = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def fail(self):
+        return self.error_rate and self.random.random() < self.error_rate
+
+
+class Stats:
+    def __init__(self):
+        self.counter = Counter()
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def incr(self, key, n=1):
+        with self._lock:
+            self.counter[key] += n
+
+    def as_dict(self):
+        with self._lock:
+            data = dict(self.counter)
+        data['uptime'] = round(time.time() - self.started, 1)
+        return data
+
+
+def _message_key(number):
+    number = str(number or '').lstrip('+')
+    return {'remoteJid': f'{number}@s.whatsapp.net', 'fromMe': True, 'id': payloads.new_message_id()}
+
+
+# ==================== ROTAS ====================
+# (método, regex do path) -> handler(server, match, body, headers) -> (status, dict)
+ROUTES = []
+
+
+def route(method, pattern):
+    def decorator(func):
+        ROUTES.append((method, re.compile(f'^{pattern}$'), func))
+        return func
+    return decorator
+
+
+# Evolution API
+@route('POST', r'/message/sendText/(?P<instance>[^/]+)')
+def evolution_send_text(server, match, body, headers):
+    return 201, {
+        'key': _message_key(body.get('number')),
+        'message': {'conversation': body.get('text', '')},
+        'messageTimestamp': int(time.time()),
+        'status': 'PENDING',
+    }
+
+
+@route('POST', r'/message/sendMedia/(?P<instance>[^/]+)')
+def evolution_send_media(server, match, body, headers):
+    if not body.get('media'):
+        return 400, {'status': 400, 'error': 'Bad Request', 'response': {'message': ['media is required']}}
+    return 201, {
+        'key': _message_key(body.get('number')),
+        'message': {f"{body.get('mediatype') or 'document'}Message": {
+            'caption': body.get('caption', ''), 'mimetype': body.get('mimetype')}},
+        'messageTimestamp': int(time.time()),
+        'status': 'PENDING',
+    }
+
+
+@route('POST', r'/message/sendReaction/(?P<instance>[^/]+)')
+def evolution_send_reaction(server, match, body, headers):
+    key = body.get('key') or {}
+    return 201, {
+        'key': _message_key(key.get('remoteJid', '').split('@')[0]),
+        'message': {'reactionMessage': {'key': key, 'text': body.get('reaction', '')}},
+        'status': 'PENDING',
+    }
+
+
+@route('POST', r'/instance/create')
+def evolution_instance_create(server, match, body, headers):
+    name = body.get('instanceName') or 'fake'
+    server.instances[name] = 'connecting'
+    return 201, {
+        'instance': {'instanceName': name, 'instanceId': payloads.new_message_id(), 'status': 'connecting'},
+        'hash': 'fake-hash',
+        'base64': QR_DATA_URI,
+    }
+
+
+@route('GET', r'/instance/connect/(?P<instance>[^/]+)')
+def evolution_instance_connect(server, match, body, headers):
+    # O "scan" acontece imediatamente: o próximo connectionState já retorna open
+    server.instances[match['instance']] = 'open'
+    return 200, {'pairingCode': None, 'code': '2@fake', 'base64': QR_DATA_URI, 'count': 1}
+
+
+@route('GET', r'/instance/connectionState/(?P<instance>[^/]+)')
+def evolution_connection_state(server, match, body, headers):
+    state = server.instances.get(match['instance'], 'open')
+    return 200, {'instance': {'instanceName': match['instance'], 'state': state}}
+
+
+@route('POST', r'/instance/restart/(?P<instance>[^/]+)')
+def evolution_instance_restart(server, match, body, headers):
+    server.instances[match['instance']] = 'open'
+    return 200, {'instance': {'instanceName': match['instance'], 'state': 'open'}}
+
+
+@route('DELETE', r'/instance/(?P<action>logout|delete)/(?P<instance>[^/]+)')
+def evolution_instance_logout(server, match, body, headers):
+    if match['action'] == 'delete':
+        server.instances.pop(match['instance'], None)
+    else:
+        server.instances[match['instance']] = 'close'
+    return 200, {'status': 'SUCCESS', 'error': False, 'response': {'message': 'Instance logged out'}}
+
+
+@route('POST', r'/chat/fetchProfilePictureUrl/(?P<instance>[^/]+)')
+def evolution_profile_picture(server, match, body, headers):
+    number = str(body.get('number') or '').lstrip('+')
+    return 200, {
+        'wuid': f'{number}@s.whatsapp.net',
+        'profilePictureUrl': f'http://{server.public_host}/__avatar/{number}.png',
+    }
+
+
+# Quepasa
+@route('POST', r'/send')
+def quepasa_send(server, match, body, headers):
+    if not headers.get('X-QUEPASA-CHATID'):
+        return 400, {'success': False, 'status': 'missing chat id'}
+    return 200, {
+        'success': True,
+        'status': 'sended with success',
+        'message': {'id': payloads.new_message_id(), 'wid': headers.get('X-QUEPASA-CHATID')},
+    }
+
+
+@route('GET', r'/info')
+def quepasa_info(server, match, body, headers):
+    return 200, {
+        'success': True,
+        'server': {'verified': True, 'wid': '5500000000000@s.whatsapp.net', 'user': 'fake'},
+    }
+
+
+@route('POST', r'/scan')
+def quepasa_scan(server, match, body, headers):
+    return 200, {'success': True, 'qrcode': QR_DATA_URI}
+
+
+@route('POST', r'/logout')
+def quepasa_logout(server, match, body, headers):
+    return 200, {'success': True, 'status': 'logged out'}
+
+
+@route('POST', r'/webhook')
+def quepasa_webhook(server, match, body, headers):
+    return 200, {'success': True, 'status': 'webhook updated', 'url': body.get('url')}
+
+
+# ==================== SERVIDOR ====================
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _reply(self, status, data, content_type='application/json'):
+        body = data if isinstance(data, bytes) else json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        path = self.path.split('?', 1)[0]
+
+        if path == '/__stats':
+            return self._reply(200, server.stats.as_dict())
+        if path.startswith('/__avatar/'):
+            return self._reply(200, payloads.PNG_1PX, 'image/png')
+
+        for route_method, pattern, func in ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                break
+        else:
+            server.stats.incr('404')
+            return self._reply(404, {'status': 404, 'error': 'Not Found', 'path': path})
+
+        name = func.__name__
+        server.stats.incr(f'{name}.requests')
+        if not server.behaviour.allow():
+            server.stats.incr(f'{name}.429')
+            return self._reply(429, {'status': 429, 'error': 'Too Many Requests'})
+        server.behaviour.delay()
+        if server.behaviour.fail():
+            server.stats.incr(f'{name}.500')
+            return self._reply(500, {'status': 500, 'error': 'Internal Server Error (injected)'})
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            return self._reply(400, {'status': 400, 'error': 'invalid json'})
+        status, data = func(server, match, body, self.headers)
+        server.stats.incr(f'{name}.{status}')
+        return self._reply(status, data)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, behaviour=None, verbose=False):
+        super().__init__(address, Handler)
+        self.behaviour = behaviour or Behaviour()
+        self.verbose = verbose
+        self.stats = Stats()
+        self.instances = {}
+        host, port = self.server_address[:2]
+        self.public_host = f"{'localhost' if host in ('0.0.0.0', '') else host}:{port}"
+
+    def start(self):
+        """Roda em uma thread daemon (uso em scripts de benchmark)."""
+        thread = threading.Thread(target=self.serve_forever, name='fake_provider', daemon=True)
+        thread.start()
+        return thread
+
+
+# ==================== WEBHOOKS ====================
+class WebhookFirer:
+    """
+    Dispara webhooks contra o Odoo a ``rate`` req/s, alternando entre
+    ``contacts`` números e os tipos de ``kinds``. Replies e reações
+    referenciam a última mensagem enviada pelo mesmo contato.
+    """
+
+    def __init__(self, url, key=None, provider='evolution', rate=10.0, kinds=('text',),
+                 contacts=100, instance='fake', stats=None, duration=None, timeout=30):
+        self.url = url
+        self.key = key
+        self.provider = provider
+        self.rate = rate
+        self.kinds = list(kinds)
+        self.contacts = contacts
+        self.instance = instance
+        self.stats = stats or Stats()
+        self.duration = duration
+        self.timeout = timeout
+        self._last_ids = {}
+        self._stop = threading.Event()
+        self._sem = threading.BoundedSemaphore(64)
+
+    def payload(self, seq):
+        mobile = payloads.mobile_for(seq % self.contacts)
+        kind = self.kinds[seq % len(self.kinds)]
+        data = payloads.make(self.provider, kind, mobile,
+                             target_id=self._last_ids.get(mobile), instance=self.instance)
+        items = data if isinstance(data, list) else [data.get('data')]
+        if kind in ('text', 'media'):
+            last = items[-1]
+            self._last_ids[mobile] = (last.get('key') or {}).get('id') or last.get('id')
+        return kind, data
+
+    def _post(self, kind, data):
+        headers = {'Content-Type': 'application/json'}
+        if self.key:
+            headers['webhook_key'] = self.key
+        req = urllib.request.Request(self.url, data=json.dumps(data).encode(), headers=headers, method='POST')
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                resp.read()
+                self.stats.incr(f'webhook.{kind}.{resp.status}')
+        except Exception as e:
+            self.stats.incr(f'webhook.{kind}.error')
+            self.stats.incr(f'webhook.error.{type(e).__name__}')
+        finally:
+            self.stats.incr('webhook.latency_ms', int((time.perf_counter() - start) * 1000))
+            self.stats.incr('webhook.sent')
+            self._sem.release()
+
+    def run(self):
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        deadline = time.monotonic() + self.duration if self.duration else None
+        next_at = time.monotonic()
+        seq = 0
+        while not self._stop.is_set():
+            if deadline and time.monotonic() >= deadline:
+                break
+            kind, data = self.payload(seq)
+            self._sem.acquire()
+            threading.Thread(target=self._post, args=(kind, data), daemon=True).start()
+            seq += 1
+            next_at += interval
+            wait = next_at - time.monotonic()
+            if wait > 0:
+                self._stop.wait(wait)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name='webhook_firer', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.0, help='mean response latency (ms)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='+/- random latency (ms)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 500')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='requests/s before answering 429 (0 = off)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--webhook-url', help='Odoo webhook URL (/wa/webhook/<uuid>)')
+    parser.add_argument('--webhook-key', help='account webhook key')
+    parser.add_argument('--webhook-provider', choices=('evolution', 'quepasa'), default='evolution')
+    parser.add_argument('--webhook-rate', type=float, default=10.0, help='webhooks/s')
+    parser.add_argument('--webhook-kinds', default='text', help=f"comma separated: {','.join(payloads.KINDS)}")
+    parser.add_argument('--webhook-contacts', type=int, default=100)
+    parser.add_argument('--webhook-instance', default='fake', help='Evolution instance name')
+    parser.add_argument('--duration', type=float, default=None, help='stop firing webhooks after N seconds')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    behaviour = Behaviour(args.latency, args.jitter, args.error_rate, args.rate_limit, args.seed)
+    server = FakeProviderServer((args.host, args.port), behaviour, verbose=args.verbose)
+    print(f'Fake Evolution/Quepasa server on http://{server.public_host}')
+    firer = None
+    if args.webhook_url:
+        kinds = [k.strip() for k in args.webhook_kinds.split(',') if k.strip() in payloads.KINDS] or ['text']
+        firer = WebhookFirer(args.webhook_url, args.webhook_key, args.webhook_provider, args.webhook_rate,
+                             kinds, args.webhook_contacts, args.webhook_instance, server.stats, args.duration)
+        firer.start()
+        print(f'Firing {args.webhook_rate} {args.webhook_provider} webhooks/s ({",".join(kinds)}) '
+              f'at {args.webhook_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if firer:
+            firer.stop()
+        server.server_close()
+        print(json.dumps(server.stats.as_dict(), indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
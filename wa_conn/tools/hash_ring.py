@@ -0,0 +1,36 @@
+"""
+Hash consistente para distribuir destinatários entre contas (wa.mass.send).
+
+Cada nó ocupa ``replicas`` pontos no anel; a chave vai para o primeiro nó
+no sentido horário. Incluir ou tirar um nó só move as chaves vizinhas, e um
+nó indisponível é pulado (a chave vai para o próximo do anel), então o mesmo
+contato continua saindo pelo mesmo número enquanto ele estiver no ar.
+"""
+import bisect
+import hashlib
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+
+    def __init__(self, nodes, replicas=100):
+        self.nodes = set(nodes)
+        self._ring = sorted((_hash(f'{node}:{i}'), node) for node in self.nodes for i in range(replicas))
+        self._points = [point for point, _node in self._ring]
+
+    def __bool__(self):
+        return bool(self._ring)
+
+    def node_for(self, key, available=None):
+        """Nó da chave; com ``available`` (conjunto), o primeiro nó disponível do anel."""
+        if not self._ring or (available is not None and not self.nodes & set(available)):
+            return None
+        start = bisect.bisect(self._points, _hash(key))
+        for offset in range(len(self._ring)):
+            node = self._ring[(start + offset) % len(self._ring)][1]
+            if available is None or node in available:
+                return node
+        return None
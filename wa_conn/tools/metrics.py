@@ -0,0 +1,143 @@
+"""
+Métricas em memória por estágio (inbound, bot, chamadas ao provider).
+
+Cada worker acumula contagem, erros e histograma de latência por
+(estágio, provider, conta) sem tocar no banco; wa.metrics descarrega os
+deltas periodicamente (upsert) para somar os workers e expor em
+/wa/metrics no formato texto do Prometheus.
+
+    with metrics.timed('inbound.partner', provider='evolution', account=account.id):
+        ...
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites superiores (ms) dos buckets do histograma; o último é +Inf
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_lock = threading.Lock()
+# {(stage, provider, account_id): [count, errors, total_ms, max_ms, [bucket counts..., +Inf]]}
+_pending = {}
+_last_flush = time.monotonic()
+
+
+def _bucket_index(ms):
+    for i, bound in enumerate(BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return len(BUCKETS_MS)
+
+
+def observe(stage, ms, provider='', account=0, error=False):
+    """Registra uma execução de ``stage`` com duração ``ms``."""
+    key = (stage, provider or '', account or 0)
+    index = _bucket_index(ms)
+    with _lock:
+        entry = _pending.get(key)
+        if entry is None:
+            entry = _pending[key] = [0, 0, 0.0, 0.0, [0] * (len(BUCKETS_MS) + 1)]
+        entry[0] += 1
+        if error:
+            entry[1] += 1
+        entry[2] += ms
+        if ms > entry[3]:
+            entry[3] = ms
+        entry[4][index] += 1
+
+
+@contextmanager
+def timed(stage, provider='', account=0):
+    """Mede o bloco; uma exceção conta como erro e é propagada."""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        observe(stage, (time.perf_counter() - start) * 1000, provider, account, error)
+
+
+def drain():
+    """Retorna e zera os deltas acumulados neste worker."""
+    global _pending, _last_flush
+    with _lock:
+        pending, _pending = _pending, {}
+        _last_flush = time.monotonic()
+    return pending
+
+
+def restore(pending):
+    """Devolve deltas que não puderam ser gravados (ex: rollback)."""
+    for key, (count, errors, total, peak, buckets) in pending.items():
+        with _lock:
+            entry = _pending.setdefault(key, [0, 0, 0.0, 0.0, [0] * (len(BUCKETS_MS) + 1)])
+            entry[0] += count
+            entry[1] += errors
+            entry[2] += total
+            entry[3] = max(entry[3], peak)
+            entry[4] = [a + b for a, b in zip(entry[4], buckets)]
+
+
+def flush_due(interval):
+    return bool(_pending) and time.monotonic() - _last_flush >= interval
+
+
+def histogram_dict(buckets):
+    """Converte a lista de buckets em {'5': n, ..., '+Inf': n} (não cumulativo)."""
+    labels = [str(b) for b in BUCKETS_MS] + ['+Inf']
+    return {label: n for label, n in zip(labels, buckets) if n}
+
+
+# ==================== PROMETHEUS ====================
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(rows):
+    """
+    Formato texto do Prometheus para linhas agregadas:
+    dicts com stage, provider, account, count, error_count, total_ms, histogram.
+    """
+    lines = [
+        '# HELP wa_stage_duration_seconds Duration of WhatsApp processing stages.',
+        '# TYPE wa_stage_duration_seconds histogram',
+    ]
+    errors = []
+    for row in rows:
+        labels = (f'stage="{_escape(row["stage"])}",provider="{_escape(row["provider"])}",'
+                  f'account="{_escape(row["account"])}"')
+        histogram = row.get('histogram') or {}
+        cumulative = 0
+        for bound in BUCKETS_MS:
+            cumulative += histogram.get(str(bound), 0)
+            lines.append(f'wa_stage_duration_seconds_bucket{{{labels},le="{bound / 1000}"}} {cumulative}')
+        lines.append(f'wa_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {row["count"]}')
+        lines.append(f'wa_stage_duration_seconds_sum{{{labels}}} {row["total_ms"] / 1000:.6f}')
+        lines.append(f'wa_stage_duration_seconds_count{{{labels}}} {row["count"]}')
+        errors.append(f'wa_stage_errors_total{{{labels}}} {row["error_count"]}')
+    lines += [
+        '# HELP wa_stage_errors_total Failed executions of WhatsApp processing stages.',
+        '# TYPE wa_stage_errors_total counter',
+    ] + errors
+    return '\n'.join(lines) + '\n'
+
+
+def render_queue_depth(rows):
+    """Gauges da fila de envio por faixa: dicts com account, lane, depth e oldest_seconds."""
+    lines = [
+        '# HELP wa_send_queue_depth Pending send-queue items per priority lane.',
+        '# TYPE wa_send_queue_depth gauge',
+    ]
+    oldest = []
+    for row in rows:
+        labels = f'lane="{_escape(row["lane"])}",account="{_escape(row["account"])}"'
+        lines.append(f'wa_send_queue_depth{{{labels}}} {row["depth"]}')
+        oldest.append(f'wa_send_queue_oldest_seconds{{{labels}}} {float(row["oldest_seconds"] or 0):.0f}')
+    lines += [
+        '# HELP wa_send_queue_oldest_seconds Age of the oldest pending send-queue item per lane.',
+        '# TYPE wa_send_queue_oldest_seconds gauge',
+    ] + oldest
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,108 @@
+"""
+Conjunto de números bloqueados (wa.optout) em memória, por banco e por worker.
+
+A primeira consulta carrega a tabela inteira; as seguintes só buscam linhas
+novas (id maior que o último visto, relendo uma pequena janela para pegar
+transações que commitaram fora de ordem). Remoções e alterações avançam a
+"geração" (sequência wa_optout_generation, depois do commit) e forçam uma
+recarga completa.
+"""
+import re
+import threading
+import time
+
+OPTOUT_ERROR = 'opted_out'
+SCOPE_CAMPAIGNS = 'campaigns'
+SCOPE_ALL = 'all'
+
+# Ids relidos a cada atualização incremental
+RESCAN = 100
+
+
+_PUNCTUATION = str.maketrans('', '', ' +-().')
+_NON_DIGIT = re.compile(r'\D')
+
+
+def normalize_number(mobile, phone_code=None):
+    """
+    Dígitos E.164 do número. Com ``phone_code`` (código do país), um número
+    em formato local, sem '+'/'00' e sem o código na frente, recebe o código
+    (sem o 0 de tronco): "(11) 98765-4321" e "+55 11 98765-4321" viram o
+    mesmo número.
+    """
+    # Caminho rápido sem regex: a maioria dos celulares já vem só com dígitos
+    # e com o código do país
+    if isinstance(mobile, str) and mobile.isdigit() and (not phone_code or mobile.startswith(phone_code)):
+        return mobile
+    raw = str(mobile or '').strip()
+    number = raw.translate(_PUNCTUATION)
+    if not number.isdigit():
+        number = _NON_DIGIT.sub('', number)
+    if not number or raw.startswith('+'):
+        return number
+    if number.startswith('00'):
+        return number[2:]
+    if phone_code and not number.startswith(phone_code):
+        return phone_code + number.lstrip('0')
+    return number
+
+
+def optout_result():
+    return {'ok': False, 'error': OPTOUT_ERROR, 'status_code': 0, 'opted_out': True}
+
+
+def is_blocked(numbers, mobile, lane, phone_code=None):
+    """
+    Opt-out de campanha bloqueia a faixa bulk; bloqueio total bloqueia todas.
+    Confere o número como veio e, se parecer local, com ``phone_code`` na frente.
+    """
+    if not numbers:
+        return False
+    number = normalize_number(mobile)
+    scope = numbers.get(number)
+    if scope is None and phone_code:
+        local = normalize_number(mobile, phone_code)
+        if local != number:
+            scope = numbers.get(local)
+    return scope == SCOPE_ALL or (scope is not None and lane == 'bulk')
+
+
+class OptoutCache:
+
+    def __init__(self, min_interval=2.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        # {dbname: [geração, último id, última atualização (monotonic), {número: escopo}]}
+        self._state = {}
+
+    def numbers(self, dbname, generation, load):
+        """
+        {número: escopo} do banco. ``load(after_id)`` retorna [(id, número,
+        escopo)] das linhas com id > after_id.
+        """
+        with self._lock:
+            state = self._state.get(dbname)
+            if state is None or state[0] != generation:
+                state = self._state[dbname] = [generation, 0, 0.0, {}]
+                after_id = 0
+            elif time.monotonic() - state[2] < self.min_interval:
+                return state[3]
+            else:
+                after_id = max(state[1] - RESCAN, 0)
+            for row_id, number, scope in load(after_id):
+                state[3][number] = scope
+                if row_id > state[1]:
+                    state[1] = row_id
+            state[2] = time.monotonic()
+            return state[3]
+
+    def clear(self, dbname=None):
+        with self._lock:
+            if dbname:
+                self._state.pop(dbname, None)
+            else:
+                self._state.clear()
+
+
+# Cache compartilhado pelo worker
+CACHE = OptoutCache()
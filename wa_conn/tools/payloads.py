@@ -0,0 +1,177 @@
+"""
+Payloads de webhook realistas (Evolution e Quepasa) para testes de carga e
+benchmarks. Só usa a stdlib: é importado tanto pelo servidor fake
+(fake_provider.py) quanto pelo código do Odoo.
+"""
+import base64
+import time
+import uuid
+
+KINDS = ('text', 'media', 'reaction', 'reply')
+
+# PNG 1x1 transparente (avatar e mídia de teste)
+PNG_1PX = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII='
+)
+PNG_1PX_B64 = base64.b64encode(PNG_1PX).decode()
+
+
+def new_message_id():
+    return '3EB0' + uuid.uuid4().hex[:16].upper()
+
+
+def mobile_for(seq, base='5500900000000'):
+    """Número sequencial a partir de ``base`` (um contato por seq)."""
+    return str(int(base) + seq)
+
+
+# ==================== EVOLUTION ====================
+def _evolution_envelope(data, instance='fake', event='messages.upsert'):
+    return {
+        'event': event,
+        'instance': instance,
+        'data': data,
+        'destination': '',
+        'date_time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sender': '5500000000000@s.whatsapp.net',
+        'server_url': 'http://localhost:8080',
+        'apikey': 'fake',
+    }
+
+
+def _evolution_data(mobile, message, message_type, message_id=None, push_name=None):
+    return {
+        'key': {
+            'remoteJid': f'{mobile}@s.whatsapp.net',
+            'fromMe': False,
+            'id': message_id or new_message_id(),
+        },
+        'pushName': push_name or f'Contact {mobile[-4:]}',
+        'message': message,
+        'messageType': message_type,
+        'messageTimestamp': int(time.time()),
+        'instanceId': 'fake-instance',
+        'source': 'android',
+    }
+
+
+def evolution_text(mobile, text='Hello', message_id=None, instance='fake', push_name=None):
+    data = _evolution_data(mobile, {'conversation': text}, 'conversation', message_id, push_name)
+    return _evolution_envelope(data, instance)
+
+
+def evolution_media(mobile, caption='Photo', message_id=None, instance='fake', push_name=None):
+    message = {
+        'imageMessage': {
+            'caption': caption,
+            'mimetype': 'image/png',
+            'fileLength': str(len(PNG_1PX)),
+            'height': 1,
+            'width': 1,
+        },
+        'base64': PNG_1PX_B64,
+    }
+    data = _evolution_data(mobile, message, 'imageMessage', message_id, push_name)
+    return _evolution_envelope(data, instance)
+
+
+def evolution_reaction(mobile, target_id, emoji='👍', message_id=None, instance='fake', push_name=None):
+    message = {
+        'reactionMessage': {
+            'key': {'remoteJid': f'{mobile}@s.whatsapp.net', 'fromMe': True, 'id': target_id},
+            'text': emoji,
+            'senderTimestampMs': int(time.time() * 1000),
+        },
+    }
+    data = _evolution_data(mobile, message, 'reactionMessage', message_id, push_name)
+    return _evolution_envelope(data, instance)
+
+
+def evolution_reply(mobile, quoted_id, text='Reply', quoted_text='Original', message_id=None,
+                    instance='fake', push_name=None):
+    message = {
+        'extendedTextMessage': {
+            'text': text,
+            'contextInfo': {
+                'stanzaId': quoted_id,
+                'participant': '5500000000000@s.whatsapp.net',
+                'quotedMessage': {'conversation': quoted_text},
+            },
+        },
+        'conversation': text,
+    }
+    data = _evolution_data(mobile, message, 'extendedTextMessage', message_id, push_name)
+    data['contextInfo'] = message['extendedTextMessage']['contextInfo']
+    return _evolution_envelope(data, instance)
+
+
+def evolution_batch(mobiles, text='Hello', instance='fake'):
+    """Um webhook com várias mensagens (data.messages)."""
+    items = [_evolution_data(mobile, {'conversation': f'{text} {i}'}, 'conversation')
+             for i, mobile in enumerate(mobiles)]
+    return _evolution_envelope({'messages': items}, instance)
+
+
+# ==================== QUEPASA ====================
+def _quepasa_item(mobile, message_type='text', message_id=None, push_name=None, **extra):
+    item = {
+        'id': message_id or new_message_id(),
+        'timestamp': int(time.time()),
+        'type': message_type,
+        'from': f'{mobile}@s.whatsapp.net',
+        'participant': f'{mobile}@s.whatsapp.net',
+        'recipient': '5500000000000@s.whatsapp.net',
+        'fromMe': False,
+        'pushName': push_name or f'Contact {mobile[-4:]}',
+    }
+    item.update(extra)
+    return item
+
+
+def quepasa_text(mobile, text='Hello', message_id=None, push_name=None):
+    return _quepasa_item(mobile, 'text', message_id, push_name, text=text)
+
+
+def quepasa_media(mobile, caption='Photo', message_id=None, push_name=None):
+    return _quepasa_item(mobile, 'image', message_id, push_name, caption=caption, attachment={
+        'mime': 'image/png',
+        'filelength': len(PNG_1PX),
+        'filename': 'photo.png',
+    })
+
+
+def quepasa_reaction(mobile, target_id, emoji='👍', message_id=None, push_name=None):
+    return _quepasa_item(mobile, 'text', message_id, push_name, text=emoji, inreaction=True, inreply=target_id)
+
+
+def quepasa_reply(mobile, quoted_id, text='Reply', message_id=None, push_name=None):
+    return _quepasa_item(mobile, 'text', message_id, push_name, text=text, inreply=quoted_id)
+
+
+def quepasa_batch(mobiles, text='Hello'):
+    """Quepasa aceita uma lista de mensagens no mesmo webhook."""
+    return [quepasa_text(mobile, f'{text} {i}') for i, mobile in enumerate(mobiles)]
+
+
+# ==================== FÁBRICA ====================
+def make(provider, kind, mobile, target_id=None, instance='fake'):
+    """
+    Payload de ``kind`` (text, media, reaction, reply) para o provider.
+    Reações e replies referenciam ``target_id`` (um id inventado se None).
+    """
+    target_id = target_id or new_message_id()
+    if provider == 'evolution':
+        if kind == 'media':
+            return evolution_media(mobile, instance=instance)
+        if kind == 'reaction':
+            return evolution_reaction(mobile, target_id, instance=instance)
+        if kind == 'reply':
+            return evolution_reply(mobile, target_id, instance=instance)
+        return evolution_text(mobile, instance=instance)
+    if kind == 'media':
+        return quepasa_media(mobile)
+    if kind == 'reaction':
+        return quepasa_reaction(mobile, target_id)
+    if kind == 'reply':
+        return quepasa_reply(mobile, target_id)
+    return quepasa_text(mobile)
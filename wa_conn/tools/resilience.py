@@ -0,0 +1,125 @@
+"""
+Retry e circuit breaker para chamadas ao provider.
+
+- is_retryable / backoff: classificação do resultado padrão de envio
+  ({'ok', 'status_code', 'error', ...}) e espera exponencial com jitter,
+  usados pela fila de envio (wa.send.queue).
+- CircuitBreaker: por conta e por worker. Após ``threshold`` falhas
+  seguidas de "provider fora do ar" (rede, timeout, 5xx) o circuito abre e
+  as chamadas retornam na hora com CIRCUIT_OPEN_ERROR; passado o cooldown,
+  uma única chamada de teste (check_status, feito pelo wa.account) decide se
+  fecha ou reabre com cooldown dobrado.
+"""
+import random
+import threading
+import time
+
+CIRCUIT_OPEN_ERROR = 'circuit_open'
+
+# Status HTTP que valem nova tentativa (além de 0 = erro de rede e 5xx)
+RETRYABLE_STATUS = {408, 425, 429}
+
+
+def is_provider_down(result):
+    """Falha que indica provider indisponível (conta para o circuit breaker)."""
+    if result.get('opted_out'):
+        return False
+    status = result.get('status_code') or 0
+    return not result.get('ok') and (status == 0 or status >= 500)
+
+
+def is_retryable(result):
+    """Falha temporária: rede, timeout, rate limit, 5xx ou circuito aberto."""
+    # Opt-out é definitivo: o número pediu para não receber mensagens
+    if result.get('ok') or result.get('opted_out'):
+        return False
+    status = result.get('status_code') or 0
+    return status == 0 or status >= 500 or status in RETRYABLE_STATUS
+
+
+def backoff(attempt, base=30.0, cap=3600.0, rng=random):
+    """Segundos até a próxima tentativa: exponencial com "full jitter"."""
+    return rng.uniform(base / 2, min(cap, base * (2 ** max(attempt - 1, 0))))
+
+
+def circuit_open_result():
+    return {'ok': False, 'error': CIRCUIT_OPEN_ERROR, 'status_code': 0, 'circuit_open': True}
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, PROBE = 'closed', 'open', 'probe'
+
+    def __init__(self, threshold=5, cooldown=30.0, max_cooldown=600.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        # {key: [falhas seguidas, aberto_até (monotonic) ou None, cooldown atual, probe em andamento]}
+        self._state = {}
+
+    def _entry(self, key):
+        return self._state.setdefault(key, [0, None, self.cooldown, False])
+
+    def state(self, key):
+        """
+        CLOSED: chamar normalmente; OPEN: não chamar; PROBE: o cooldown
+        acabou e este chamador (só um por vez) deve testar o provider.
+        """
+        with self._lock:
+            entry = self._state.get(key)
+            if not entry or entry[1] is None:
+                return self.CLOSED
+            if time.monotonic() < entry[1] or entry[3]:
+                return self.OPEN
+            entry[3] = True
+            return self.PROBE
+
+    def is_open(self, key):
+        with self._lock:
+            entry = self._state.get(key)
+            return bool(entry and entry[1] is not None)
+
+    def record(self, key, result):
+        """Registra o resultado de uma chamada real ao provider."""
+        with self._lock:
+            entry = self._entry(key)
+            if not is_provider_down(result):
+                entry[0] = 0
+                return
+            entry[0] += 1
+            if entry[1] is None and entry[0] >= self.threshold:
+                entry[1] = time.monotonic() + entry[2]
+
+    def probe_result(self, key, ok):
+        """Resultado do teste após o cooldown: fecha ou reabre (cooldown dobrado)."""
+        with self._lock:
+            entry = self._entry(key)
+            entry[3] = False
+            if ok:
+                self._state[key] = [0, None, self.cooldown, False]
+            else:
+                entry[2] = min(entry[2] * 2, self.max_cooldown)
+                entry[1] = time.monotonic() + entry[2]
+
+    def guard(self, key, execute):
+        """Envolve execute(req): não chama o provider com o circuito aberto."""
+        def call(req, *args, **kwargs):
+            if self.is_open(key):
+                return circuit_open_result()
+            result = execute(req, *args, **kwargs)
+            self.record(key, result)
+            return result
+        return call
+
+    def guard_async(self, key, execute):
+        async def call(req, *args, **kwargs):
+            if self.is_open(key):
+                return circuit_open_result()
+            result = await execute(req, *args, **kwargs)
+            self.record(key, result)
+            return result
+        return call
+
+
+# Breaker compartilhado pelo worker, chaveado por (dbname, account_id)
+BREAKER = CircuitBreaker()
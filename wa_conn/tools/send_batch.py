@@ -0,0 +1,237 @@
+"""
+Execução concorrente de envios em lote (ver wa.account.send_batch).
+
+Somente requisições já preparadas (sem acesso ao ORM) são executadas nas
+threads (run_batch) ou no event loop do transporte assíncrono
+(run_batch_async); mensagens para o mesmo destinatário rodam em sequência, na ordem
+de entrada, e um RateLimiter compartilhado espaça o início dos envios.
+
+Cada envio ocupa uma vaga do LaneBudget da conta: respostas (interactive)
+e mensagens transacionais passam na frente das campanhas (bulk), que usam
+no máximo bulk_limit vagas.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# {(dbname, account_id, lane): RateLimiter} compartilhado entre lotes do mesmo worker
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+# {(dbname, account_id): LaneBudget}
+_BUDGETS = {}
+
+# Faixas de prioridade, da mais para a menos prioritária
+LANES = ('interactive', 'transactional', 'bulk')
+
+
+class RateLimiter:
+    """Espaça o início dos envios por um intervalo fixo ou aleatório (min, max)."""
+
+    def __init__(self, interval=0.0, interval_range=None):
+        self.interval = interval or 0.0
+        self.interval_range = interval_range
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def _interval(self):
+        if self.interval_range:
+            return random.uniform(*self.interval_range)
+        return self.interval
+
+    def reserve(self):
+        """Reserva o próximo horário de envio; retorna quantos segundos aguardar."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self._interval()
+        return slot - now
+
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def get_limiter(key, rate):
+    """Limiter por conta para ``rate`` mensagens/segundo (None se ilimitado)."""
+    if not rate or rate <= 0:
+        return None
+    interval = 1.0 / rate
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(key)
+        if limiter is None or limiter.interval != interval:
+            limiter = _LIMITERS[key] = RateLimiter(interval)
+        return limiter
+
+
+class LaneBudget:
+    """
+    Vagas de envio simultâneo de uma conta, divididas por prioridade.
+
+    interactive e transactional podem usar todas as ``capacity`` vagas;
+    bulk usa no máximo ``bulk_limit`` e só entra quando nenhuma faixa mais
+    prioritária está esperando, ficando com a capacidade que sobra.
+    """
+
+    def __init__(self, capacity=1, bulk_limit=1):
+        self._cond = threading.Condition()
+        self._running = dict.fromkeys(LANES, 0)
+        self._waiting = dict.fromkeys(LANES, 0)
+        self.configure(capacity, bulk_limit)
+
+    def configure(self, capacity, bulk_limit):
+        with self._cond:
+            self.capacity = max(capacity or 1, 1)
+            self.bulk_limit = max(min(bulk_limit or self.capacity, self.capacity), 1)
+            self._cond.notify_all()
+
+    def _can_run(self, lane):
+        if sum(self._running.values()) >= self.capacity:
+            return False
+        if any(self._waiting[higher] for higher in LANES[:LANES.index(lane)]):
+            return False
+        return lane != 'bulk' or self._running['bulk'] < self.bulk_limit
+
+    def acquire(self, lane):
+        """Bloqueia até haver vaga para ``lane``; retorna os segundos de espera."""
+        start = time.monotonic()
+        with self._cond:
+            self._waiting[lane] += 1
+            try:
+                while not self._can_run(lane):
+                    self._cond.wait(1.0)
+            finally:
+                self._waiting[lane] -= 1
+            self._running[lane] += 1
+        return time.monotonic() - start
+
+    async def acquire_async(self, lane, poll=0.01):
+        start = time.monotonic()
+        with self._cond:
+            self._waiting[lane] += 1
+        try:
+            while True:
+                with self._cond:
+                    if self._can_run(lane):
+                        self._running[lane] += 1
+                        break
+                await asyncio.sleep(poll)
+        finally:
+            with self._cond:
+                self._waiting[lane] -= 1
+        return time.monotonic() - start
+
+    def release(self, lane):
+        with self._cond:
+            self._running[lane] -= 1
+            self._cond.notify_all()
+
+    def snapshot(self):
+        """{lane: {'running': n, 'waiting': n}} neste worker."""
+        with self._cond:
+            return {lane: {'running': self._running[lane], 'waiting': self._waiting[lane]} for lane in LANES}
+
+    def guard(self, lane, execute, on_wait=None):
+        """Envolve execute(req) para ocupar uma vaga de ``lane`` durante o envio."""
+        def call(req, *args, **kwargs):
+            waited = self.acquire(lane)
+            if on_wait:
+                on_wait(waited)
+            try:
+                return execute(req, *args, **kwargs)
+            finally:
+                self.release(lane)
+        return call
+
+    def guard_async(self, lane, execute, on_wait=None):
+        async def call(req, *args, **kwargs):
+            waited = await self.acquire_async(lane)
+            if on_wait:
+                on_wait(waited)
+            try:
+                return await execute(req, *args, **kwargs)
+            finally:
+                self.release(lane)
+        return call
+
+
+def get_budget(key, capacity, bulk_limit):
+    """LaneBudget por conta, reconfigurado quando a conta muda os limites."""
+    with _LIMITERS_LOCK:
+        budget = _BUDGETS.get(key)
+        if budget is None:
+            budget = _BUDGETS[key] = LaneBudget(capacity, bulk_limit)
+    if budget.capacity != max(capacity or 1, 1) or budget.bulk_limit != bulk_limit:
+        budget.configure(capacity, bulk_limit)
+    return budget
+
+
+def _group_jobs(jobs):
+    groups = OrderedDict()
+    for index, key, request in jobs:
+        groups.setdefault(key, []).append((index, request))
+    return groups
+
+
+def run_batch(jobs, execute, concurrency=4, limiter=None):
+    """
+    Executa os jobs com concorrência limitada.
+
+    Args:
+        jobs: lista de (index, order_key, request). Jobs com a mesma order_key
+            (ex: o número do destinatário) são executados em sequência.
+        execute: função que recebe o request e retorna o dict de resultado.
+        concurrency: número máximo de threads.
+        limiter: RateLimiter opcional.
+
+    Returns:
+        dict: {index: resultado}
+    """
+    groups = _group_jobs(jobs)
+    results = {}
+
+    def run_group(group):
+        for index, request in group:
+            if limiter:
+                limiter.wait()
+            try:
+                results[index] = execute(request)
+            except Exception as e:
+                results[index] = {'ok': False, 'error': str(e), 'status_code': 0}
+
+    workers = min(max(concurrency or 1, 1), len(groups))
+    if workers <= 1:
+        for group in groups.values():
+            run_group(group)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wa_send_batch') as pool:
+            list(pool.map(run_group, groups.values()))
+    return results
+
+
+async def run_batch_async(jobs, execute, concurrency=4, limiter=None):
+    """
+    Versão asyncio de run_batch: ``execute`` é uma coroutine e os grupos
+    rodam como tasks no mesmo loop, no máximo ``concurrency`` ao mesmo tempo.
+    """
+    groups = _group_jobs(jobs)
+    results = {}
+    semaphore = asyncio.Semaphore(max(concurrency or 1, 1))
+
+    async def run_group(group):
+        async with semaphore:
+            for index, request in group:
+                if limiter:
+                    delay = limiter.reserve()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                try:
+                    results[index] = await execute(request)
+                except Exception as e:
+                    results[index] = {'ok': False, 'error': str(e), 'status_code': 0}
+
+    await asyncio.gather(*(run_group(group) for group in groups.values()))
+    return results
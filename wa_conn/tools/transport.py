@@ -0,0 +1,165 @@
+"""
+Transporte HTTP dos adapters de provider.
+
+- SyncTransport: requests.Session com pool de conexões por host. É a facade
+  síncrona usada pelo código do ORM (ProviderAdapter.request).
+- AsyncTransport: cliente asyncio (aiohttp ou httpx, se instalados) rodando
+  num event loop em uma thread própria. Dispatchers e envios em lote
+  multiplexam milhares de requisições em poucas threads, com limite de
+  conexões por host e timeout por requisição.
+"""
+import asyncio
+import json
+import logging
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+_logger = logging.getLogger(__name__)
+
+# Conexões simultâneas por host (Evolution/Quepasa costumam ser um host por servidor)
+LIMIT_PER_HOST = 16
+
+
+class Response:
+    """Resposta mínima compatível com requests.Response (status_code, text, json())."""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class SyncTransport:
+    """requests.Session compartilhada, com pool limitado por host."""
+
+    def __init__(self, limit_per_host=LIMIT_PER_HOST):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=limit_per_host, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, *, timeout=20, **kwargs):
+        return self.session.request(method, url, timeout=timeout, **kwargs)
+
+
+class AsyncTransport:
+    """
+    Cliente HTTP assíncrono num event loop dedicado.
+
+    Use ``run(coro)`` a partir de código síncrono para executar uma coroutine
+    no loop e aguardar o resultado; dentro do loop use ``await arequest(...)``.
+    """
+
+    def __init__(self, limit_per_host=LIMIT_PER_HOST, backend=None):
+        self.limit_per_host = limit_per_host
+        self.backend = backend or ('aiohttp' if aiohttp else 'httpx' if httpx else None)
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return self.backend is not None
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name='wa_async_transport', daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def run(self, coro, timeout=None):
+        """Executa a coroutine no loop do transporte e retorna o resultado."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def _get_client(self):
+        if self._client is None:
+            if self.backend == 'aiohttp':
+                connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.limit_per_host)
+                self._client = aiohttp.ClientSession(connector=connector)
+            else:
+                limits = httpx.Limits(max_connections=None, max_keepalive_connections=self.limit_per_host)
+                self._client = httpx.AsyncClient(limits=limits)
+        return self._client
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).netloc
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.limit_per_host)
+        return semaphore
+
+    async def arequest(self, method, url, *, timeout=20, **kwargs):
+        """Requisição assíncrona; aceita os mesmos kwargs usados com requests (json, headers, data, params)."""
+        client = self._get_client()
+        async with self._host_semaphore(url):
+            if self.backend == 'aiohttp':
+                async with client.request(method, url, timeout=aiohttp.ClientTimeout(total=timeout),
+                                          **kwargs) as resp:
+                    return Response(resp.status, await resp.text())
+            resp = await client.request(method, url, timeout=timeout, **kwargs)
+            return Response(resp.status_code, resp.text)
+
+    def close(self):
+        if self._loop is None:
+            return
+
+        async def _close():
+            if self._client is not None:
+                if self.backend == 'aiohttp':
+                    await self._client.close()
+                else:
+                    await self._client.aclose()
+                self._client = None
+
+        self.run(_close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop = self._thread = None
+        self._semaphores = {}
+
+
+_SYNC = None
+_ASYNC = None
+_INIT_LOCK = threading.Lock()
+
+
+def get_sync_transport():
+    global _SYNC
+    if _SYNC is None:
+        with _INIT_LOCK:
+            if _SYNC is None:
+                _SYNC = SyncTransport()
+    return _SYNC
+
+
+def get_async_transport():
+    """Transporte assíncrono compartilhado pelo worker, ou None sem aiohttp/httpx."""
+    global _ASYNC
+    if _ASYNC is None:
+        with _INIT_LOCK:
+            if _ASYNC is None:
+                _ASYNC = AsyncTransport()
+                if not _ASYNC.available:
+                    _logger.info("aiohttp/httpx not installed: batch sends use the thread pool")
+    return _ASYNC if _ASYNC.available else None
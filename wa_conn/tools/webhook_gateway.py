@@ -0,0 +1,460 @@
+"""
+Gateway asyncio/ASGI de webhooks, fora dos workers do Odoo.
+
+Recebe POST /wa/webhook e /wa/webhook/<uuid>, autentica contra o
+webhook_uuid/webhook_key das contas (em cache, recarregado por
+LISTEN wa_account_changed), grava os payloads brutos em lote em
+wa_webhook_event e acorda o cron de processamento com o mesmo
+NOTIFY cron_trigger usado por ir.cron._trigger(). O provider recebe 200
+assim que o lote é commitado.
+
+Uso:
+    python wa_conn/tools/webhook_gateway.py --dsn "dbname=mydb user=odoo" --port 8070
+
+    # com uvicorn (WA_GATEWAY_DSN no ambiente)
+    WA_GATEWAY_DSN="dbname=mydb user=odoo" uvicorn --factory \\
+        odoo.addons.wa_conn.tools.webhook_gateway:app_from_env --port 8070
+
+Aponte o proxy (ou a URL de webhook das contas) de /wa/webhook para o
+gateway. Sem uvicorn, um servidor HTTP/1.1 asyncio mínimo é usado.
+GET /health retorna os contadores em JSON.
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+_logger = logging.getLogger(__name__)
+
+ACCOUNT_CHANNEL = 'wa_account_changed'
+WORK_CHANNEL = 'wa_work'
+CRON_XMLID = ('wa_conn', 'ir_cron_wa_webhook_event_process')
+WEBHOOK_PATH = re.compile(r'^/wa/webhook(?:/(?P<uuid>[^/]+))?/?$')
+KEY_HEADERS = ('webhook_key', 'x-webhook-key', 'webhook-key')
+UUID_HEADERS = ('x-webhook-uuid', 'webhook_uuid')
+
+
+class AccountCache:
+    """webhook_uuid / webhook_key / nome da instância -> (account_id, webhook_key)."""
+
+    def __init__(self):
+        self.by_uuid = {}
+        self.by_key = {}
+        self.by_name = {}
+        self.loaded_at = 0.0
+
+    def load(self, cr):
+        cr.execute("SELECT id, name, webhook_uuid, webhook_key FROM wa_account")
+        by_uuid, by_key, by_name = {}, {}, {}
+        for account_id, name, webhook_uuid, webhook_key in cr.fetchall():
+            entry = (account_id, webhook_key or '')
+            if webhook_uuid:
+                by_uuid[webhook_uuid] = entry
+            if webhook_key:
+                by_key[webhook_key] = entry
+            if name:
+                by_name.setdefault(name, entry)
+        self.by_uuid, self.by_key, self.by_name = by_uuid, by_key, by_name
+        self.loaded_at = time.monotonic()
+        return len(by_uuid)
+
+    def resolve(self, webhook_uuid, headers, body):
+        """Mesma ordem de WaWebhookController._resolve_account."""
+        if webhook_uuid and webhook_uuid in self.by_uuid:
+            return self.by_uuid[webhook_uuid]
+        for name in UUID_HEADERS:
+            value = headers.get(name)
+            if value and value in self.by_uuid:
+                return self.by_uuid[value]
+        key = headers.get('webhook_key')
+        if key and key in self.by_key:
+            return self.by_key[key]
+        if isinstance(body, dict):
+            data = body.get('data') if isinstance(body.get('data'), dict) else {}
+            inst = body.get('instance') or data.get('instance') or body.get('name')
+            if isinstance(inst, str) and inst in self.by_name:
+                return self.by_name[inst]
+        return None
+
+
+class EventWriter:
+    """
+    Group commit: os eventos que chegam enquanto um lote está sendo gravado
+    formam o próximo lote; cada requisição aguarda o commit do seu lote.
+    """
+
+    def __init__(self, dsn, notify_dsn, max_batch=500, max_delay=0.005, connections=2):
+        self.dsn = dsn
+        self.notify_dsn = notify_dsn
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.executor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix='wa-gateway-db')
+        self._connections = asyncio.Queue()
+        for _ in range(connections):
+            self._connections.put_nowait(None)
+        self._pending = []
+        self._flush_handle = None
+        self._dbname = None
+        self._cron_id = None
+        self._notify_conn = None
+        self._notify_lock = threading.Lock()
+
+    def submit(self, account_id, payload_text):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((account_id, payload_text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_delay, self._flush_now)
+        return future
+
+    def _flush_now(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._write(batch))
+
+    async def _write(self, batch):
+        conn = await self._connections.get()
+        loop = asyncio.get_running_loop()
+        try:
+            conn = await loop.run_in_executor(self.executor, self._insert, conn, batch)
+        except Exception as e:
+            _logger.error(f"[gateway] Failed to store {len(batch)} events: {e}")
+            conn = None
+            for _account_id, _payload, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _account_id, _payload, future in batch:
+                if not future.done():
+                    future.set_result(True)
+        finally:
+            self._connections.put_nowait(conn)
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        if self._cron_id is None:
+            with conn.cursor() as cr:
+                cr.execute("SELECT current_database()")
+                self._dbname = cr.fetchone()[0]
+                cr.execute("SELECT res_id FROM ir_model_data WHERE module = %s AND name = %s", CRON_XMLID)
+                row = cr.fetchone()
+                self._cron_id = row[0] if row else 0
+            conn.commit()
+        return conn
+
+    def _insert(self, conn, batch):
+        """Roda numa thread do executor; retorna a conexão para reuso."""
+        if conn is None or conn.closed:
+            conn = self._connect()
+        try:
+            with conn.cursor() as cr:
+                psycopg2.extras.execute_values(cr, """
+                    INSERT INTO wa_webhook_event (account_id, payload, received_at, state, attempts)
+                    VALUES %s
+                """, [(account_id, payload) for account_id, payload, _future in batch],
+                    template="(%s, %s::jsonb, now() at time zone 'UTC', 'pending', 0)",
+                    page_size=len(batch))
+                if self._cron_id:
+                    # Equivalente a ir.cron._trigger(): um gatilho pendente basta
+                    cr.execute("""
+                        INSERT INTO ir_cron_trigger (cron_id, call_at)
+                        SELECT %s, now() at time zone 'UTC'
+                         WHERE NOT EXISTS (SELECT 1 FROM ir_cron_trigger
+                                            WHERE cron_id = %s AND call_at <= now() at time zone 'UTC')
+                    """, [self._cron_id, self._cron_id])
+                # E o dispatcher (cli wa_dispatch), se estiver rodando
+                cr.execute(f"SELECT pg_notify('{WORK_CHANNEL}', 'webhook_event')")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self._notify_cron()
+        return conn
+
+    def _notify_cron(self):
+        # As threads de cron do Odoo escutam cron_trigger no banco 'postgres'
+        with self._notify_lock:
+            try:
+                if self._notify_conn is None or self._notify_conn.closed:
+                    self._notify_conn = psycopg2.connect(self.notify_dsn)
+                    self._notify_conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with self._notify_conn.cursor() as cr:
+                    cr.execute("SELECT pg_notify('cron_trigger', %s)", [self._dbname])
+            except Exception as e:
+                _logger.warning(f"[gateway] cron_trigger notify failed: {e}")
+                if self._notify_conn is not None:
+                    self._notify_conn.close()
+                self._notify_conn = None
+
+    async def close(self):
+        self._flush_now()
+        while not self._connections.empty():
+            conn = self._connections.get_nowait()
+            if conn is not None and not conn.closed:
+                conn.close()
+        if self._notify_conn is not None:
+            self._notify_conn.close()
+        self.executor.shutdown(wait=False)
+
+
+class Gateway:
+    """Aplicação ASGI."""
+
+    def __init__(self, dsn, notify_dsn=None, max_body=16 * 1024 * 1024, refresh_interval=300.0, **writer_options):
+        self.dsn = dsn
+        self.max_body = max_body
+        self.refresh_interval = refresh_interval
+        self.accounts = AccountCache()
+        self.writer = EventWriter(dsn, notify_dsn or _with_dbname(dsn, 'postgres'), **writer_options)
+        self.stats = Counter()
+        self._listen_conn = None
+        self._refresh_task = None
+        self._started = False
+
+    # ---------- ciclo de vida ----------
+    async def startup(self):
+        if self._started:
+            return
+        self._started = True
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._reload)
+        self._listen_conn = psycopg2.connect(self.dsn)
+        self._listen_conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with self._listen_conn.cursor() as cr:
+            cr.execute(f"LISTEN {ACCOUNT_CHANNEL}")
+        loop.add_reader(self._listen_conn.fileno(), self._on_notify)
+        self._refresh_task = asyncio.ensure_future(self._periodic_refresh())
+        _logger.info(f"[gateway] {len(self.accounts.by_uuid)} accounts loaded")
+
+    async def shutdown(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+        if self._listen_conn is not None:
+            asyncio.get_running_loop().remove_reader(self._listen_conn.fileno())
+            self._listen_conn.close()
+        await self.writer.close()
+
+    def _reload(self):
+        with closing(psycopg2.connect(self.dsn)) as conn, conn.cursor() as cr:
+            count = self.accounts.load(cr)
+        self.stats['reloads'] += 1
+        return count
+
+    def _on_notify(self):
+        self._listen_conn.poll()
+        if self._listen_conn.notifies:
+            self._listen_conn.notifies.clear()
+            asyncio.get_running_loop().run_in_executor(None, self._reload)
+
+    async def _periodic_refresh(self):
+        # Rede de segurança caso um NOTIFY se perca (reconexão, etc.)
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._reload)
+            except Exception as e:
+                _logger.warning(f"[gateway] Account reload failed: {e}")
+
+    # ---------- ASGI ----------
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        if not self._started:
+            await self.startup()
+        path = scope.get('path') or '/'
+        if scope['method'] == 'GET' and path == '/health':
+            return await _respond(send, 200, dict(self.stats, accounts=len(self.accounts.by_uuid)))
+        match = WEBHOOK_PATH.match(path)
+        if not match:
+            return await _respond(send, 404, {'error': 'not_found'})
+        if scope['method'] != 'POST':
+            return await _respond(send, 405, {'error': 'method_not_allowed'})
+        status, result = await self.handle(match.group('uuid'), _headers(scope), receive)
+        self.stats[status] += 1
+        return await _respond(send, status, result)
+
+    async def handle(self, webhook_uuid, headers, receive):
+        body = await _read_body(receive, self.max_body)
+        if body is None:
+            return 413, {'error': 'payload_too_large'}
+        try:
+            text = body.decode('utf-8')
+            raw = json.loads(text or '{}')
+        except ValueError:
+            return 400, {'error': 'invalid_json'}
+        if not isinstance(raw, dict):
+            return 400, {'error': 'invalid_json'}
+
+        entry = self.accounts.resolve(webhook_uuid, headers, raw)
+        if not entry:
+            return 404, {'error': 'account_not_found'}
+        account_id, expected_key = entry
+        incoming_key = next((headers[h] for h in KEY_HEADERS if headers.get(h)), '')
+        if not incoming_key or not expected_key or not hmac.compare_digest(
+                incoming_key.encode(), expected_key.encode()):
+            return 403, {'error': 'forbidden', 'reason': 'invalid_webhook_key'}
+
+        try:
+            await self.writer.submit(account_id, text or '{}')
+        except Exception:
+            return 503, {'error': 'unavailable'}
+        return 200, {'status': 'queued'}
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def _with_dbname(dsn, dbname):
+    params = psycopg2.extensions.parse_dsn(dsn)
+    params['dbname'] = dbname
+    return psycopg2.extensions.make_dsn(**params)
+
+
+def _headers(scope):
+    return {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers') or []}
+
+
+async def _read_body(receive, limit):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _respond(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def app_from_env():
+    """Fábrica para uvicorn --factory: WA_GATEWAY_DSN (e WA_GATEWAY_NOTIFY_DSN opcional)."""
+    return Gateway(os.environ['WA_GATEWAY_DSN'], os.environ.get('WA_GATEWAY_NOTIFY_DSN'))
+
+
+# ==================== SERVIDOR MÍNIMO ====================
+REASONS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+async def _serve_connection(app, reader, writer):
+    """HTTP/1.1 com keep-alive e Content-Length (o que os providers enviam)."""
+    try:
+        while True:
+            head = await reader.readuntil(b'\r\n\r\n')
+            lines = head.decode('latin-1').split('\r\n')
+            method, target, version = lines[0].split(' ', 2)
+            headers = []
+            for line in lines[1:]:
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+            header_map = dict(headers)
+            length = int(header_map.get(b'content-length', b'0') or 0)
+            body = await reader.readexactly(length) if length else b''
+            path, _, query = target.partition('?')
+            scope = {'type': 'http', 'method': method.upper(), 'path': path,
+                     'query_string': query.encode(), 'headers': headers, 'http_version': version[5:]}
+            sent = {}
+
+            async def receive():
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    sent.update(message)
+                    return
+                status = sent.get('status', 200)
+                out = [f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}".encode()]
+                out += [k + b': ' + v for k, v in sent.get('headers', [])]
+                writer.write(b'\r\n'.join(out) + b'\r\n\r\n' + message.get('body', b''))
+
+            await app(scope, receive, send)
+            await writer.drain()
+            if header_map.get(b'connection', b'').lower() == b'close' or version == 'HTTP/1.0':
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(app, host, port):
+    await app.startup()
+    server = await asyncio.start_server(lambda r, w: _serve_connection(app, r, w), host, port, backlog=4096)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await app.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.environ.get('WA_GATEWAY_DSN'), required='WA_GATEWAY_DSN' not in os.environ,
+                        help='libpq DSN of the Odoo database')
+    parser.add_argument('--notify-dsn', default=os.environ.get('WA_GATEWAY_NOTIFY_DSN'),
+                        help="DSN used for NOTIFY cron_trigger (default: same server, database 'postgres')")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8070)
+    parser.add_argument('--max-batch', type=int, default=500, help='events per INSERT')
+    parser.add_argument('--max-delay', type=float, default=5.0, help='ms to wait for a batch to fill')
+    parser.add_argument('--connections', type=int, default=2, help='database connections used for writes')
+    parser.add_argument('--max-body', type=int, default=16, help='max request size (MB)')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+
+    app = Gateway(args.dsn, args.notify_dsn, max_body=args.max_body * 1024 * 1024,
+                  max_batch=args.max_batch, max_delay=args.max_delay / 1000.0, connections=args.connections)
+    try:
+        import uvicorn
+    except ImportError:
+        uvicorn = None
+    print(f"WhatsApp webhook gateway on http://{args.host}:{args.port} "
+          f"({'uvicorn' if uvicorn else 'asyncio'})")
+    try:
+        if uvicorn:
+            uvicorn.run(app, host=args.host, port=args.port, lifespan='on', log_level='warning', access_log=False)
+        else:
+            asyncio.run(serve(app, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
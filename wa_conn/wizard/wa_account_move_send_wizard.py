@@ -96,27 +96,25 @@ class AccountMoveSendWizard(models.TransientModel):
                     # Passa contexto only_whatsapp apenas aqui
                     attachments = self.with_context(only_whatsapp=True)._generate_and_send_invoices(self.move_id)
 
-            # Send to all partners and all attachments
-            for partner in self.mail_partner_ids:
-                if not partner.mobile:
-                    continue  # skip partners without mobile
-                recipient_number = partner.mobile
+            # Send to all partners and all attachments in one batch
+            messages, recipients = [], []
+            for partner in self.mail_partner_ids.filtered('mobile'):  # skip partners without mobile
                 if attachments:
                     for attachment in attachments:
-                        account.send_media(
-                            mobile=recipient_number,
-                            caption=message_content,
-                            b64=attachment.datas,
-                            mime=attachment.mimetype or 'application/octet-stream',
-                            filename=attachment.name
-                        )
-                        self._log_whatsapp_message(partner, message_content, success=True)
+                        messages.append((partner.mobile, message_content, {
+                            'b64': attachment.datas,
+                            'mime': attachment.mimetype or 'application/octet-stream',
+                            'filename': attachment.name,
+                        }))
+                        recipients.append(partner)
                 else:
-                    account.send_text(
-                        mobile=recipient_number,
-                        message=message_content
-                    )
-                    self._log_whatsapp_message(partner, message_content, success=True)
+                    messages.append((partner.mobile, message_content, {}))
+                    recipients.append(partner)
+            if messages:
+                results = account.send_batch(messages)
+                for partner, result in zip(recipients, results):
+                    self._log_whatsapp_message(partner, message_content,
+                                               success=result.get('ok'), error=result.get('error'))
 
     def _log_whatsapp_message(self, partner, message_content, success=True, error=None):
         """
@@ -55,27 +55,25 @@ class MailComposer(models.TransientModel):
             account = self.whatsapp_account_id
             attachments = self.attachment_ids or []
 
-            # Send to all partners and all attachments
-            for partner in self.partner_ids:
-                if not partner.mobile:
-                    continue  # skip partners without mobile
-                recipient_number = partner.mobile
+            # Send to all partners and all attachments in one batch
+            messages, recipients = [], []
+            for partner in self.partner_ids.filtered('mobile'):  # skip partners without mobile
                 if attachments:
                     for attachment in attachments:
-                        account.send_media(
-                            mobile=recipient_number,
-                            caption=message_content,
-                            b64=attachment.datas,
-                            mime=attachment.mimetype or 'application/octet-stream',
-                            filename=attachment.name
-                        )
-                        self._log_whatsapp_message(partner, message_content, res_model, res_id, success=True)
+                        messages.append((partner.mobile, message_content, {
+                            'b64': attachment.datas,
+                            'mime': attachment.mimetype or 'application/octet-stream',
+                            'filename': attachment.name,
+                        }))
+                        recipients.append(partner)
                 else:
-                    account.send_text(
-                        mobile=recipient_number,
-                        message=message_content
-                    )
-                    self._log_whatsapp_message(partner, message_content, res_model, res_id, success=True)
+                    messages.append((partner.mobile, message_content, {}))
+                    recipients.append(partner)
+            if messages:
+                results = account.send_batch(messages)
+                for partner, result in zip(recipients, results):
+                    self._log_whatsapp_message(partner, message_content, res_model, res_id,
+                                               success=result.get('ok'), error=result.get('error'))
 
     def _log_whatsapp_message(self, partner, message_content, res_model, res_id, success=True, error=None):
         """
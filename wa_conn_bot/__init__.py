@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from . import models
+from . import wizard
 
 def post_init_hook(env):
     """Post-installation hook to integrate with providers"""
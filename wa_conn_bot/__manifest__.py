@@ -28,6 +28,7 @@
         'views/wa_bot_session_views.xml',
         'views/wa_account_views.xml',
         'views/wa_conn_bot_menus.xml',
+        'wizard/wa_bot_simulator_views.xml',
         # 'data/wa_bot_user.xml',
     ],
     'demo': [
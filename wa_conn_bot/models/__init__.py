@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 from . import wa_bot
 from . import wa_bot_command
+from . import wa_bot_command_cache
 from . import wa_bot_flow
+from . import wa_bot_intent
 from . import wa_bot_session
 from . import wa_account
 from . import discuss_channel
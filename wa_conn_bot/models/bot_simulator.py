@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Offline conversation simulator for wa.bot.
+
+A BotSimulation is put in the context under ``wa_bot_simulation``. While it
+is there, bot replies are captured in memory instead of being posted to the
+channel, flow step delays only advance the simulated clock and every executed
+flow step is traced. See wa.bot.simulate().
+"""
+import json
+import math
+
+CONTEXT_KEY = 'wa_bot_simulation'
+
+
+def parse_script(text):
+    """Parse a conversation script
+
+    Accepts a JSON list (strings or {"message", "delay"} dicts) or plain text
+    with one message per line. In plain text, ``@wait <seconds>`` delays the
+    next message and lines starting with ``#`` are comments.
+
+    Returns:
+        list: [{'message': str, 'delay': float}]
+    """
+    text = (text or '').strip()
+    if text.startswith('['):
+        steps = []
+        for item in json.loads(text):
+            if isinstance(item, str):
+                item = {'message': item}
+            steps.append({'message': str(item.get('message') or ''), 'delay': float(item.get('delay') or 0)})
+        return steps
+
+    steps = []
+    delay = 0.0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('@wait'):
+            delay += float(line[5:].strip().rstrip('s') or 0)
+            continue
+        steps.append({'message': line, 'delay': delay})
+        delay = 0.0
+    return steps
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (0 if empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(math.ceil(pct / 100.0 * len(ordered))) - 1, 0)
+    return ordered[rank]
+
+
+class SimulatedTurn:
+    """One inbound message of a simulated conversation"""
+
+    __slots__ = ('index', 'phone', 'message', 'replies', 'flow_path', 'latency_ms', 'queries',
+                 'status', 'error', 'delay')
+
+    def __init__(self, index, phone, message, delay=0.0):
+        self.index = index
+        self.phone = phone
+        self.message = message
+        self.delay = delay
+        self.replies = []
+        self.flow_path = []
+        self.latency_ms = 0.0
+        self.queries = 0
+        self.status = 'ignored'
+        self.error = None
+
+    def to_dict(self):
+        return {
+            'index': self.index,
+            'phone': self.phone,
+            'message': self.message,
+            'delay': self.delay,
+            'replies': self.replies,
+            'flow_path': self.flow_path,
+            'latency_ms': round(self.latency_ms, 3),
+            'queries': self.queries,
+            'status': self.status,
+            'error': self.error,
+        }
+
+
+class BotSimulation:
+    """Collects replies, flow steps and timings of a simulation run"""
+
+    def __init__(self):
+        self.turns = []
+        self.current = None
+        self.simulated_delay = 0.0
+
+    def __eq__(self, other):
+        # Context comparison must not look inside the recorded data
+        return self is other
+
+    __hash__ = object.__hash__
+
+    def start_turn(self, index, phone, message, delay=0.0):
+        self.current = SimulatedTurn(index, phone, message, delay)
+        self.turns.append(self.current)
+        return self.current
+
+    def record_message(self, text):
+        if self.current is not None:
+            self.current.replies.append(text)
+
+    def record_step(self, step):
+        if self.current is not None:
+            self.current.flow_path.append(step.name)
+
+    def record_delay(self, seconds):
+        self.simulated_delay += seconds
+
+    def report(self, details=1):
+        """Aggregate the recorded turns
+
+        Args:
+            details: Number of conversations returned turn by turn
+
+        Returns:
+            dict: Report with latency, query and flow path statistics
+        """
+        latencies = [t.latency_ms for t in self.turns]
+        queries = [t.queries for t in self.turns]
+        total_ms = sum(latencies)
+
+        per_step = {}
+        paths = {}
+        conversations = {}
+        for turn in self.turns:
+            step = per_step.setdefault(turn.index, {
+                'index': turn.index, 'message': turn.message, 'latencies': [], 'queries': [], 'errors': 0,
+            })
+            step['latencies'].append(turn.latency_ms)
+            step['queries'].append(turn.queries)
+            step['errors'] += turn.status == 'error'
+            if turn.flow_path:
+                path = ' > '.join(turn.flow_path)
+                paths[path] = paths.get(path, 0) + 1
+            if turn.phone in conversations or len(conversations) < details:
+                conversations.setdefault(turn.phone, []).append(turn.to_dict())
+
+        steps = []
+        for index in sorted(per_step):
+            step = per_step[index]
+            steps.append({
+                'index': index,
+                'message': step['message'],
+                'p50_ms': round(percentile(step['latencies'], 50), 3),
+                'p95_ms': round(percentile(step['latencies'], 95), 3),
+                'max_ms': round(max(step['latencies']), 3),
+                'avg_queries': round(sum(step['queries']) / len(step['queries']), 2),
+                'errors': step['errors'],
+            })
+
+        return {
+            'messages': len(self.turns),
+            'errors': sum(1 for t in self.turns if t.status == 'error'),
+            'replies': sum(len(t.replies) for t in self.turns),
+            'total_ms': round(total_ms, 3),
+            'throughput': round(len(self.turns) / (total_ms / 1000.0), 2) if total_ms else 0.0,
+            'latency_ms': {
+                'avg': round(total_ms / len(latencies), 3) if latencies else 0.0,
+                'p50': round(percentile(latencies, 50), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'max': round(max(latencies), 3) if latencies else 0.0,
+            },
+            'queries': {
+                'total': sum(queries),
+                'avg': round(sum(queries) / len(queries), 2) if queries else 0.0,
+                'max': max(queries) if queries else 0,
+            },
+            'simulated_delay': self.simulated_delay,
+            'steps': steps,
+            'flow_paths': dict(sorted(paths.items(), key=lambda kv: -kv[1])),
+            'conversations': conversations,
+        }
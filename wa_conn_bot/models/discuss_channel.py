@@ -2,6 +2,10 @@
 from odoo import api, models
 import logging
 
+from odoo.addons.wa_conn.tools import metrics
+
+from . import bot_simulator
+
 _logger = logging.getLogger(__name__)
 
 
@@ -12,10 +16,12 @@ class DiscussChannelBot(models.Model):
     def wa_post_incoming(self, dto, partner):
         """Override to process through bot before posting message"""
         # First, check if this channel has bot enabled via wa_account
-        if self.wa_account_id and self.wa_account_id.bot_enabled and self.wa_account_id.bot_id:
+        account = self.wa_account_id
+        if account and account.bot_enabled and account.bot_id:
             try:
                 # Process message through bot
-                bot_handled = self._process_message_through_bot(dto, partner)
+                with metrics.timed('bot.process', account.provider, account.id):
+                    bot_handled = self._process_message_through_bot(dto, partner)
                 
                 # If bot handled the message, we might skip posting or modify the flow
                 # For now, we always post the incoming message but let bot respond
@@ -26,22 +32,24 @@ class DiscussChannelBot(models.Model):
         # Call parent to post the incoming message
         return super().wa_post_incoming(dto, partner)
     
-    def _process_message_through_bot(self, dto, partner):
+    def _process_message_through_bot(self, dto, partner, bot=None):
         """Process incoming message through bot system
         
         Args:
             dto: Normalized message DTO
             partner: res.partner who sent the message
+            bot: wa.bot to use instead of the account bot (simulations)
             
         Returns:
             bool: True if bot handled the message
         """
         self.ensure_one()
         
-        account = self.wa_account_id
-        bot = account.bot_id
+        if bot is None:
+            account = self.wa_account_id
+            bot = account.bot_id if account.bot_enabled else False
         
-        if not bot or not account.bot_enabled:
+        if not bot:
             return False
         
         # Get message text
@@ -120,6 +128,11 @@ class DiscussChannelBot(models.Model):
         """
         self.ensure_one()
         
+        simulation = self.env.context.get(bot_simulator.CONTEXT_KEY)
+        if simulation:
+            simulation.record_message(message_text)
+            return
+        
         try:
             # Post message to channel - will be sent via wa_conn
             self.sudo().message_post(
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Single-pass intent matching for wa.bot default responses.
+
+Keywords of every intent of a bot are compiled into one Aho-Corasick
+automaton, so a message is matched against all keyword intents in one scan
+of the text. Regex intents are compiled once and tried separately in
+priority order: a single alternation would only report non-overlapping
+leftmost matches, letting a broad pattern hide a better intent.
+"""
+import re
+import threading
+import unicodedata
+from collections import deque
+
+
+def normalize_text(text):
+    """Casefold and strip accents so 'Não' matches 'nao'"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton over normalized keywords"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+    def add(self, keyword, value):
+        state = 0
+        for char in keyword:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((value, len(keyword)))
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        return self
+
+    def iter_matches(self, text):
+        """Yield (value, start, end) for every keyword occurrence"""
+        state = 0
+        for pos, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for value, length in self._out[state]:
+                yield value, pos - length + 1, pos + 1
+
+
+class IntentMatcher:
+    """Compiled matcher for the intents of one bot
+
+    Args:
+        intents: iterable of dicts with 'id', 'priority', 'keywords' (list of
+            str) and 'pattern' (str or None). Lower priority wins.
+    """
+
+    def __init__(self, intents):
+        self._priority = {}
+        self._automaton = AhoCorasick()
+        self._regexes = []
+        for intent in intents:
+            intent_id = intent['id']
+            self._priority[intent_id] = intent.get('priority') or 0
+            for keyword in intent.get('keywords') or []:
+                keyword = normalize_text(keyword).strip()
+                if keyword:
+                    self._automaton.add(keyword, intent_id)
+            if intent.get('pattern'):
+                self._regexes.append((self._priority[intent_id], intent_id,
+                                      re.compile(intent['pattern'], re.IGNORECASE)))
+        self._automaton.build()
+        self._regexes.sort(key=lambda r: (r[0], r[1]))
+
+    def _keyword_matches(self, text):
+        matched = set()
+        normalized = normalize_text(text)
+        for intent_id, start, end in self._automaton.iter_matches(normalized):
+            # Keywords match whole words only
+            if start > 0 and normalized[start - 1].isalnum():
+                continue
+            if end < len(normalized) and normalized[end].isalnum():
+                continue
+            matched.add(intent_id)
+        return matched
+
+    def _rank(self, intent_id):
+        return (self._priority[intent_id], intent_id)
+
+    def match_all(self, text):
+        """Return the ids of all intents matching text, best first"""
+        matched = self._keyword_matches(text)
+        for _priority, intent_id, regex in self._regexes:
+            if intent_id not in matched and regex.search(text or ''):
+                matched.add(intent_id)
+        return sorted(matched, key=self._rank)
+
+    def match(self, text):
+        """Return the id of the best matching intent, or None"""
+        keywords = self._keyword_matches(text)
+        best = min(keywords, key=self._rank) if keywords else None
+        for priority, intent_id, regex in self._regexes:
+            # Sorted by rank: nothing further down can beat the best keyword
+            if best is not None and (priority, intent_id) >= self._rank(best):
+                break
+            if regex.search(text or ''):
+                return intent_id
+        return best
+
+
+class MatcherCache:
+    """Compiled matchers per (dbname, bot id), rebuilt when the bot's intent version changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matchers = {}
+
+    def get(self, key, version, build):
+        with self._lock:
+            cached = self._matchers.get(key)
+            if cached and cached[0] == version:
+                return cached[1]
+        matcher = build()
+        with self._lock:
+            self._matchers[key] = (version, matcher)
+        return matcher
+
+    def clear(self):
+        with self._lock:
+            self._matchers.clear()
+
+
+# Shared by the worker
+MATCHERS = MatcherCache()
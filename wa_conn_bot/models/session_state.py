@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Write-behind store for wa.bot.session variables.
+
+The store loads the ``variables`` JSON of a session once, serves reads and
+writes from memory while a message is processed and flushes only the keys
+that changed in a single JSONB merge UPDATE.
+"""
+import json
+import logging
+
+from odoo import fields, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Cursor cache key holding the stores of the current transaction
+CACHE_KEY = 'wa_bot_session_variable_stores'
+
+# Number of change entries kept in wa.bot.session.variables_history
+HISTORY_LIMIT = 50
+
+
+class SessionVariableStore:
+    """In-memory view over wa.bot.session.variables with dirty tracking."""
+
+    def __init__(self, session, max_size=0, track_history=False):
+        self.session = session
+        self.max_size = max_size or 0
+        self.track_history = track_history
+        self._data = None
+        self._dirty = set()
+        self._deleted = set()
+
+    # ==================== READ ====================
+    @property
+    def data(self):
+        if self._data is None:
+            variables = self.session.variables or {}
+            self._data = dict(variables) if isinstance(variables, dict) else {}
+        return self._data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def as_dict(self):
+        return dict(self.data)
+
+    @property
+    def is_dirty(self):
+        return bool(self._dirty or self._deleted)
+
+    # ==================== WRITE ====================
+    def set(self, key, value):
+        data = self.data
+        if key in data and data[key] == value:
+            return
+        missing = object()
+        previous = data.get(key, missing)
+        data[key] = value
+        try:
+            self._check_size()
+        except UserError:
+            if previous is missing:
+                del data[key]
+            else:
+                data[key] = previous
+            raise
+        self._dirty.add(key)
+        self._deleted.discard(key)
+
+    def update(self, values):
+        for key, value in (values or {}).items():
+            self.set(key, value)
+
+    def unset(self, key):
+        if key in self.data:
+            del self.data[key]
+            self._dirty.discard(key)
+            self._deleted.add(key)
+
+    def _check_size(self):
+        if not self.max_size:
+            return
+        size = len(json.dumps(self._data, default=str))
+        if size > self.max_size:
+            raise UserError(_(
+                'Session variables exceed the size limit of %(limit)s bytes (%(size)s bytes).',
+                limit=self.max_size, size=size,
+            ))
+
+    # ==================== FLUSH ====================
+    def flush(self):
+        """Write pending changes with one UPDATE merging the dirty keys."""
+        if not self.is_dirty:
+            return False
+        session = self.session
+        patch = {key: self._data[key] for key in self._dirty}
+        removed = sorted(self._deleted)
+        changed = sorted(self._dirty | self._deleted)
+
+        query = """
+            UPDATE wa_bot_session
+               SET variables = (COALESCE(variables, '{}'::jsonb) || %s::jsonb) - %s::text[],
+                   write_date = (now() at time zone 'UTC'),
+                   write_uid = %s
+        """
+        params = [json.dumps(patch, default=str), removed, session.env.uid]
+        if self.track_history:
+            entry = {'date': fields.Datetime.to_string(fields.Datetime.now()), 'keys': changed}
+            history = list(session.variables_history or [])[-(HISTORY_LIMIT - 1):]
+            history.append(entry)
+            query += ", variables_history = %s::jsonb"
+            params.append(json.dumps(history))
+        query += " WHERE id = %s"
+        params.append(session.id)
+
+        session.flush_recordset(['variables', 'variables_history'])
+        session.env.cr.execute(query, params)
+        session.invalidate_recordset(['variables', 'variables_history', 'write_date', 'write_uid'])
+        self._dirty.clear()
+        self._deleted.clear()
+        self._data = None
+        return True
+
+
+def get_store(session):
+    """Return the store of ``session`` for the current transaction."""
+    stores = session.env.cr.cache.setdefault(CACHE_KEY, {})
+    store = stores.get(session.id)
+    if store is None:
+        bot = session.bot_id
+        store = SessionVariableStore(
+            session,
+            max_size=bot.session_variables_max_size,
+            track_history=bot.session_track_variable_history,
+        )
+        if not stores:
+            # Safety net: never lose pending variables if processing forgets to flush
+            session.env.cr.precommit.add(lambda: flush_all(session.env.cr))
+        stores[session.id] = store
+    return store
+
+
+def flush_all(cr):
+    """Flush and drop every store opened in the transaction of ``cr``."""
+    stores = cr.cache.pop(CACHE_KEY, {})
+    for store in stores.values():
+        try:
+            store.flush()
+        except Exception as e:
+            _logger.error(f'Error flushing variables of session {store.session.id}: {e}', exc_info=True)
@@ -1,11 +1,19 @@
 # -*- coding: utf-8 -*-
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.addons.wa_conn.models import dto
 import logging
+import time
+
+from . import bot_simulator, session_state
 
 _logger = logging.getLogger(__name__)
 
 
+class _SimulationRollback(Exception):
+    """Raised to discard the records created by a simulation"""
+
+
 class WaBot(models.Model):
     _name = 'wa.bot'
     _description = 'WhatsApp Bot'
@@ -49,6 +57,18 @@ class WaBot(models.Model):
         help='Message sent when session expires'
     )
     
+    session_variables_max_size = fields.Integer(
+        string='Variables Size Limit (bytes)',
+        default=0,
+        help='Maximum size of the session variables JSON. 0 means unlimited.'
+    )
+    
+    session_track_variable_history = fields.Boolean(
+        string='Track Variable History',
+        default=False,
+        help='Keep a history of the variable keys changed on each message'
+    )
+    
     # Greeting Settings
     greeting_enabled = fields.Boolean(string='Enable Greeting', default=True, tracking=True)
     greeting_message = fields.Text(
@@ -65,6 +85,17 @@ class WaBot(models.Model):
     command_ids = fields.One2many('wa.bot.command', 'bot_id', string='Custom Commands')
     command_count = fields.Integer(string='# Commands', compute='_compute_command_count')
     
+    # Intents (default responses)
+    intent_ids = fields.One2many('wa.bot.intent', 'bot_id', string='Intents')
+    intent_version = fields.Integer(
+        string='Intent Version', default=0, readonly=True, copy=False,
+        help='Bumped on every intent change; workers rebuild their cached intent matcher when it moves'
+    )
+    fallback_message = fields.Text(
+        string='Fallback Message',
+        help='Sent when a message matches no command, awaited answer or intent. Leave empty to stay silent.'
+    )
+    
     # Sessions
     session_ids = fields.One2many('wa.bot.session', 'bot_id', string='Sessions')
     active_session_count = fields.Integer(
@@ -101,63 +132,73 @@ class WaBot(models.Model):
     #             vals['user_id'] = user.id
     #     return super(WaBot, self).create(vals_list)
     
+    def _count_by_bot(self, model, domain=None, aggregates=('__count',)):
+        """Grouped count of related records per bot
+        
+        Returns:
+            dict: {bot_id: tuple of aggregate values}
+        """
+        bot_ids = [bid for bid in self._origin.ids if bid]
+        if not bot_ids:
+            return {}
+        groups = self.env[model].sudo()._read_group(
+            [('bot_id', 'in', bot_ids)] + (domain or []),
+            ['bot_id'], list(aggregates),
+        )
+        return {bot.id: values for bot, *values in groups}
+
+    def _bump_intent_version(self):
+        """Invalidate the cached intent matchers of these bots (committed with the intent change)"""
+        if not self:
+            return
+        self.env.cr.execute(
+            "UPDATE wa_bot SET intent_version = intent_version + 1 WHERE id = ANY(%s)", (self.ids,))
+        self.invalidate_recordset(['intent_version'])
+
     @api.depends('flow_ids')
     def _compute_flow_count(self):
+        counts = self._count_by_bot('wa.bot.flow')
         for rec in self:
-            rec.flow_count = len(rec.flow_ids)
+            rec.flow_count = counts.get(rec._origin.id, [0])[0]
 
     @api.depends('command_ids')
     def _compute_command_count(self):
+        counts = self._count_by_bot('wa.bot.command')
         for rec in self:
-            rec.command_count = len(rec.command_ids)
+            rec.command_count = counts.get(rec._origin.id, [0])[0]
 
     @api.depends('session_ids', 'session_ids.state')
     def _compute_session_count(self):
+        counts = self._count_by_bot('wa.bot.session', [('state', '=', 'active')])
         for rec in self:
-            rec.active_session_count = len(rec.session_ids.filtered(lambda s: s.state == 'active'))
+            rec.active_session_count = counts.get(rec._origin.id, [0])[0]
 
     def _search_active_session_count(self, operator, value):
-        """Custom search method for active_session_count"""
-        # Get all bots with their active session count
-        self._cr.execute("""
-            SELECT bot_id, COUNT(*) as count
-            FROM wa_bot_session
-            WHERE state = 'active'
-            GROUP BY bot_id
-        """)
-        results = {row[0]: row[1] for row in self._cr.fetchall()}
-        
-        # Filter based on operator and value
-        if operator == '>':
-            bot_ids = [bot_id for bot_id, count in results.items() if count > value]
-        elif operator == '>=':
-            bot_ids = [bot_id for bot_id, count in results.items() if count >= value]
-        elif operator == '<':
-            bot_ids = [bot_id for bot_id, count in results.items() if count < value]
-        elif operator == '<=':
-            bot_ids = [bot_id for bot_id, count in results.items() if count <= value]
-        elif operator == '=':
-            bot_ids = [bot_id for bot_id, count in results.items() if count == value]
-        elif operator == '!=':
-            bot_ids = [bot_id for bot_id, count in results.items() if count != value]
-        else:
-            bot_ids = []
-        
-        # Also include bots with 0 sessions if the condition matches
-        if operator in ['<', '<=', '!='] and value > 0:
-            all_bot_ids = self.search([]).ids
-            bot_ids.extend([bid for bid in all_bot_ids if bid not in results])
-        elif operator in ['='] and value == 0:
-            all_bot_ids = self.search([]).ids
-            bot_ids.extend([bid for bid in all_bot_ids if bid not in results])
+        """Custom search method for active_session_count
         
-        return [('id', 'in', bot_ids)]
+        Bots without active sessions count as 0 thanks to the LEFT JOIN, so
+        every operator is resolved by a single grouped query with HAVING.
+        """
+        sql_operators = {'>': '>', '>=': '>=', '<': '<', '<=': '<=', '=': '=', '!=': '<>'}
+        if operator not in sql_operators:
+            return [('id', '=', False)]
+        self.env['wa.bot.session'].flush_model(['bot_id', 'state'])
+        self._cr.execute(f"""
+            SELECT b.id
+              FROM wa_bot b
+         LEFT JOIN wa_bot_session s ON s.bot_id = b.id AND s.state = 'active'
+          GROUP BY b.id
+            HAVING COUNT(s.id) {sql_operators[operator]} %s
+        """, (int(value or 0),))
+        return [('id', 'in', [row[0] for row in self._cr.fetchall()])]
 
     @api.depends('session_ids')
     def _compute_statistics(self):
+        stats = self._count_by_bot('wa.bot.session', aggregates=('__count', 'message_count:sum'))
         for rec in self:
-            rec.total_sessions = len(rec.session_ids)
-            rec.total_messages = sum(rec.session_ids.mapped('message_count'))
+            total_sessions, total_messages = stats.get(rec._origin.id, (0, 0))
+            rec.total_sessions = total_sessions
+            rec.total_messages = total_messages or 0
 
     @api.constrains('session_timeout')
     def _check_session_timeout(self):
@@ -165,6 +206,12 @@ class WaBot(models.Model):
             if rec.session_timeout <= 0:
                 raise ValidationError(_('Session timeout must be greater than 0 minutes.'))
 
+    @api.constrains('session_variables_max_size')
+    def _check_session_variables_max_size(self):
+        for rec in self:
+            if rec.session_variables_max_size < 0:
+                raise ValidationError(_('Variables size limit cannot be negative.'))
+
     @api.constrains('init_mode', 'init_command')
     def _check_init_command(self):
         for rec in self:
@@ -253,12 +300,7 @@ class WaBot(models.Model):
         if self.greeting_enabled and self.greeting_message:
             try:
                 # Post greeting message to channel
-                channel.with_context(wa_skip_receive=True).message_post(
-                    body=self.greeting_message,
-                    message_type='whatsapp',
-                    subtype_xmlid="mail.mt_comment",
-                    author_id=2,  # OdooBot
-                )
+                session.send_message(self.greeting_message)
             except Exception as e:
                 _logger.warning(f"Failed to send greeting message: {e}")
         
@@ -270,6 +312,8 @@ class WaBot(models.Model):
                     self._execute_flow_chain(session, first_step)
                 except Exception as e:
                     _logger.error(f"Failed to execute flow: {e}", exc_info=True)
+                finally:
+                    session.flush_variables()
         
         return session
     
@@ -310,6 +354,135 @@ class WaBot(models.Model):
         
         return True
 
+    def simulate(self, script, sessions=1, phone='5500900000000', details=1, rollback=True):
+        """Replay a scripted conversation against this bot offline
+
+        Each simulated contact gets a partner and a WhatsApp channel without
+        account, so nothing reaches a provider; bot replies are captured in
+        memory. Messages are interleaved across sessions (every session sends
+        step 1, then step 2, ...) and a step delay moves the session clock
+        back, so timeouts behave as in production.
+
+        Args:
+            script: Script text (see bot_simulator.parse_script) or list of
+                messages / {'message', 'delay'} dicts
+            sessions: Number of simulated contacts running the script
+            phone: First phone number, incremented per session
+            details: Number of conversations returned turn by turn
+            rollback: Discard every record created by the simulation
+
+        Returns:
+            dict: Report with per-step latency, query counts and flow paths
+        """
+        self.ensure_one()
+        if isinstance(script, str):
+            steps = bot_simulator.parse_script(script)
+        else:
+            steps = [{'message': s, 'delay': 0.0} if isinstance(s, str) else
+                     {'message': s.get('message') or '', 'delay': float(s.get('delay') or 0)}
+                     for s in script or []]
+        if not steps:
+            raise UserError(_('The simulation script has no messages.'))
+        if sessions < 1:
+            raise UserError(_('At least one session is required.'))
+
+        simulation = bot_simulator.BotSimulation()
+        started = time.perf_counter()
+        try:
+            with self.env.cr.savepoint():
+                self.with_context(**{bot_simulator.CONTEXT_KEY: simulation}).sudo()._run_simulation(
+                    simulation, steps, sessions, phone)
+                if rollback:
+                    raise _SimulationRollback()
+        except _SimulationRollback:
+            pass
+        finally:
+            self.env.cr.cache.pop(session_state.CACHE_KEY, None)
+            self.env.invalidate_all()
+
+        report = simulation.report(details=details)
+        report.update({
+            'bot': self.name,
+            'sessions': sessions,
+            'script_steps': len(steps),
+            'wall_ms': round((time.perf_counter() - started) * 1000, 3),
+            'rolled_back': rollback,
+        })
+        _logger.info(f"Simulated {report['messages']} messages on bot {self.name}: "
+                     f"p50 {report['latency_ms']['p50']}ms, p95 {report['latency_ms']['p95']}ms, "
+                     f"{report['queries']['avg']} queries/message")
+        return report
+
+    def _run_simulation(self, simulation, steps, sessions, phone):
+        """Create the simulated contacts and replay the steps (see simulate)"""
+        base = int(''.join(c for c in phone if c.isdigit()) or 0)
+        mobiles = [str(base + i) for i in range(sessions)]
+        partners = self.env['res.partner'].create([{
+            'name': _('Simulated %s') % mobile,
+            'mobile': mobile,
+        } for mobile in mobiles])
+        channels = self.env['discuss.channel'].create([{
+            'name': partner.name,
+            'channel_type': 'channel',
+            'is_wa': True,
+            'wa_partner_id': partner.id,
+        } for partner in partners])
+        self.env.flush_all()
+
+        cr = self.env.cr
+        for index, step in enumerate(steps):
+            for mobile, partner, channel in zip(mobiles, partners, channels):
+                turn = simulation.start_turn(index, mobile, step['message'], step['delay'])
+                if step['delay']:
+                    self._simulate_elapsed(channel, step['delay'])
+                payload = dto.NormalizedPayload(
+                    provider='simulator',
+                    event='messages.upsert',
+                    message_id=f'SIM-{mobile}-{index}',
+                    remote_jid=f'{mobile}@s.whatsapp.net',
+                    mobile=mobile,
+                    push_name=partner.name,
+                    message=step['message'],
+                    message_type='conversation',
+                )
+                queries = cr.sql_log_count
+                start = time.perf_counter()
+                try:
+                    handled = channel._process_message_through_bot(payload, partner, bot=self)
+                    # Deferred ORM writes belong to this message
+                    self.env.flush_all()
+                    turn.status = 'handled' if handled else 'ignored'
+                except Exception as e:
+                    turn.status = 'error'
+                    turn.error = str(e)
+                turn.latency_ms = (time.perf_counter() - start) * 1000
+                turn.queries = cr.sql_log_count - queries
+
+    def _simulate_elapsed(self, channel, seconds):
+        """Move the active session of a simulated channel back in time"""
+        self.env.flush_all()
+        self.env.cr.execute("""
+            UPDATE wa_bot_session
+               SET last_activity = last_activity - make_interval(secs => %s),
+                   start_time = start_time - make_interval(secs => %s)
+             WHERE channel_id = %s AND bot_id = %s AND state = 'active'
+        """, (seconds, seconds, channel.id, self.id))
+        self.env['wa.bot.session'].invalidate_model(['last_activity', 'start_time'])
+
+    def action_open_simulator(self):
+        """Open the conversation simulator"""
+        self.ensure_one()
+        return {
+            'name': _('Simulate - %s') % self.name,
+            'type': 'ir.actions.act_window',
+            'res_model': 'wa.bot.simulator',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {
+                'default_bot_id': self.id,
+            },
+        }
+
     def get_or_create_session(self, phone, wa_account_id):
         """Get or create bot session for a phone number
         
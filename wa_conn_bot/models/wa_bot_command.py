@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
+import hashlib
 import json
 import logging
 
+from . import wa_bot_command_cache
+
 _logger = logging.getLogger(__name__)
 
 
@@ -102,12 +105,55 @@ else:
     execution_count = fields.Integer(string='Executions', default=0, readonly=True,
                                      help='Number of times this command was executed')
     last_execution = fields.Datetime(string='Last Execution', readonly=True)
+    
+    # Result Cache
+    cache_enabled = fields.Boolean(string='Cache Results', default=False, tracking=True,
+                                   help='Reuse the result of previous executions while it is fresh')
+    cache_ttl = fields.Integer(string='Cache TTL (seconds)', default=300,
+                               help='How long a cached result is reused')
+    cache_scope = fields.Selection([
+        ('global', 'Global - Same result for everybody'),
+        ('partner', 'Per Partner - Keyed by contact and arguments'),
+        ('args', 'Per Arguments - Keyed by command arguments'),
+    ], string='Cache Scope', default='args', required=True,
+       help='What identifies a cached result')
+    cache_store = fields.Selection([
+        ('memory', 'In-Memory (per worker)'),
+        ('database', 'Database (shared by workers)'),
+    ], string='Cache Store', default='memory', required=True)
+    cache_hit_count = fields.Integer(string='Cache Hits', default=0, readonly=True)
+    cache_miss_count = fields.Integer(string='Cache Misses', default=0, readonly=True)
+    cache_hit_rate = fields.Float(string='Cache Hit Rate (%)', compute='_compute_cache_hit_rate',
+                                  digits=(16, 1))
 
     _sql_constraints = [
         ('command_bot_unique', 'UNIQUE(bot_id, command)',
          'Command shortcut must be unique per bot!')
     ]
 
+    @api.depends('cache_hit_count', 'cache_miss_count')
+    def _compute_cache_hit_rate(self):
+        for rec in self:
+            total = rec.cache_hit_count + rec.cache_miss_count
+            rec.cache_hit_rate = 100.0 * rec.cache_hit_count / total if total else 0.0
+
+    @api.constrains('cache_ttl', 'cache_enabled')
+    def _check_cache_ttl(self):
+        for rec in self:
+            if rec.cache_enabled and rec.cache_ttl <= 0:
+                raise ValidationError(_('Cache TTL must be greater than 0 seconds.'))
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'python_code', 'cache_scope', 'cache_store', 'cache_enabled', 'cache_ttl'} & set(vals):
+            self.env['wa.bot.command.cache'].sudo()._clear(self.ids)
+        return res
+
+    def action_clear_cache(self):
+        """Drop every cached result of these commands"""
+        self.env['wa.bot.command.cache'].sudo()._clear(self.ids)
+        self.sudo().write({'cache_hit_count': 0, 'cache_miss_count': 0})
+
     @api.constrains('command')
     def _check_command_format(self):
         """Validate command format"""
@@ -201,9 +247,55 @@ else:
             
             raise UserError(_('Test failed: %s\n\nSee Test Output for details.') % str(e))
 
+    def _get_cache_key(self, session, args):
+        """Build the cache key for an invocation according to cache_scope"""
+        self.ensure_one()
+        args_key = ' '.join(str(a) for a in (args or [])).strip().lower()
+        if self.cache_scope == 'global':
+            return 'global'
+        if self.cache_scope == 'partner':
+            return f'partner:{session.partner_id.id or session.phone}:{args_key}'
+        return f'args:{args_key}'
+
+    def _memory_cache_key(self, cache_key):
+        code_hash = hashlib.sha1((self.python_code or '').encode()).hexdigest()
+        return (self.env.cr.dbname, self.id, code_hash, cache_key)
+
+    def _cache_get(self, cache_key):
+        """Return a cached result (fresh copy) or None"""
+        self.ensure_one()
+        if self.cache_store == 'database':
+            serialized = self.env['wa.bot.command.cache'].sudo()._get_result(self.id, cache_key)
+        else:
+            serialized = wa_bot_command_cache.memory_get(self._memory_cache_key(cache_key))
+        return json.loads(serialized) if serialized else None
+
+    def _cache_set(self, cache_key, result):
+        """Store a result; results that are not JSON serializable are not cached"""
+        self.ensure_one()
+        try:
+            serialized = json.dumps(result)
+        except (TypeError, ValueError):
+            _logger.debug(f'Result of command {self.name} is not cacheable')
+            return False
+        if self.cache_store == 'database':
+            self.env['wa.bot.command.cache'].sudo()._set_result(self.id, cache_key, serialized, self.cache_ttl)
+        else:
+            wa_bot_command_cache.memory_set(self._memory_cache_key(cache_key), serialized, self.cache_ttl)
+        return True
+
+    def _increment_cache_hits(self):
+        """Count a cache hit without an ORM write"""
+        self.env.cr.execute(
+            "UPDATE wa_bot_command SET cache_hit_count = cache_hit_count + 1 WHERE id = %s", (self.id,))
+        self.invalidate_recordset(['cache_hit_count'])
+
     def execute(self, session, message, args=None, dto=None):
         """Execute command in context of a session
         
+        When caching is enabled, a fresh cached result is returned without
+        running the code.
+        
         Args:
             session: wa.bot.session record
             message: Full message text
@@ -222,6 +314,14 @@ else:
                 'message': 'This command is currently disabled'
             }
         
+        cache_key = None
+        if self.cache_enabled and self.cache_ttl > 0:
+            cache_key = self._get_cache_key(session, args)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self._increment_cache_hits()
+                return cached
+        
         # Full Python execution environment - NO RESTRICTIONS
         exec_globals = {
             '__builtins__': __builtins__,  # Full Python builtins including import
@@ -243,10 +343,13 @@ else:
             exec(self.python_code, exec_globals)
             
             # Update statistics
-            self.sudo().write({
+            stats = {
                 'execution_count': self.execution_count + 1,
                 'last_execution': fields.Datetime.now(),
-            })
+            }
+            if cache_key:
+                stats['cache_miss_count'] = self.cache_miss_count + 1
+            self.sudo().write(stats)
             
             # Get result
             if 'result' in exec_globals:
@@ -254,18 +357,21 @@ else:
                 
                 # Normalize result format
                 if isinstance(result, str):
-                    return {'ok': True, 'text': result}
+                    result = {'ok': True, 'text': result}
                 elif isinstance(result, dict):
                     if 'ok' not in result:
                         result['ok'] = True
-                    return result
                 else:
-                    return {'ok': True, 'result': result}
+                    result = {'ok': True, 'result': result}
             else:
-                return {
+                result = {
                     'ok': True,
                     'message': 'Command executed successfully'
                 }
+            
+            if cache_key and result.get('ok'):
+                self._cache_set(cache_key, result)
+            return result
                 
         except Exception as e:
             _logger.error(f'Error executing command {self.name}: {str(e)}', exc_info=True)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models
+from collections import OrderedDict
+import threading
+import time
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Per-worker store: {(dbname, command_id, code_hash, cache_key): (expires_at, serialized_result)}
+_MEMORY_CACHE = OrderedDict()
+_MEMORY_CACHE_LOCK = threading.Lock()
+_MEMORY_CACHE_SIZE = 2048
+
+
+def memory_get(key):
+    """Return the serialized result stored under key, or None if missing/expired"""
+    with _MEMORY_CACHE_LOCK:
+        entry = _MEMORY_CACHE.get(key)
+        if not entry:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del _MEMORY_CACHE[key]
+            return None
+        _MEMORY_CACHE.move_to_end(key)
+        return value
+
+
+def memory_set(key, value, ttl):
+    with _MEMORY_CACHE_LOCK:
+        _MEMORY_CACHE[key] = (time.time() + ttl, value)
+        _MEMORY_CACHE.move_to_end(key)
+        while len(_MEMORY_CACHE) > _MEMORY_CACHE_SIZE:
+            _MEMORY_CACHE.popitem(last=False)
+
+
+def memory_clear(dbname, command_ids):
+    command_ids = set(command_ids)
+    with _MEMORY_CACHE_LOCK:
+        for key in [k for k in _MEMORY_CACHE if k[0] == dbname and k[1] in command_ids]:
+            del _MEMORY_CACHE[key]
+
+
+class WaBotCommandCache(models.Model):
+    _name = 'wa.bot.command.cache'
+    _description = 'WhatsApp Bot Command Cached Result'
+    _log_access = False
+
+    command_id = fields.Many2one('wa.bot.command', string='Command', required=True,
+                                 ondelete='cascade', index=True)
+    cache_key = fields.Char(string='Cache Key', required=True)
+    result = fields.Json(string='Result')
+    expires_at = fields.Datetime(string='Expires At', required=True, index=True)
+
+    _sql_constraints = [
+        ('command_key_unique', 'UNIQUE(command_id, cache_key)',
+         'Cache key must be unique per command!')
+    ]
+
+    @api.model
+    def _get_result(self, command_id, cache_key):
+        """Return the serialized result if a fresh entry exists"""
+        self.env.cr.execute("""
+            SELECT result::text
+              FROM wa_bot_command_cache
+             WHERE command_id = %s
+               AND cache_key = %s
+               AND expires_at > (now() at time zone 'UTC')
+        """, (command_id, cache_key))
+        row = self.env.cr.fetchone()
+        return row[0] if row else None
+
+    @api.model
+    def _set_result(self, command_id, cache_key, serialized, ttl):
+        """Insert or refresh an entry with a single upsert"""
+        self.env.cr.execute("""
+            INSERT INTO wa_bot_command_cache (command_id, cache_key, result, expires_at)
+                 VALUES (%s, %s, %s::jsonb, (now() at time zone 'UTC') + make_interval(secs => %s))
+            ON CONFLICT (command_id, cache_key)
+              DO UPDATE SET result = EXCLUDED.result, expires_at = EXCLUDED.expires_at
+        """, (command_id, cache_key, serialized, ttl))
+
+    @api.model
+    def _clear(self, command_ids):
+        self.env.cr.execute("DELETE FROM wa_bot_command_cache WHERE command_id = ANY(%s)", (list(command_ids),))
+        memory_clear(self.env.cr.dbname, command_ids)
+
+    @api.autovacuum
+    def _gc_expired(self):
+        self.env.cr.execute("DELETE FROM wa_bot_command_cache WHERE expires_at <= (now() at time zone 'UTC')")
+        _logger.info(f'Removed {self.env.cr.rowcount} expired bot command cache entries')
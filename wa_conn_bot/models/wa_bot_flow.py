@@ -4,6 +4,8 @@ from odoo.exceptions import ValidationError
 import json
 import logging
 
+from . import bot_simulator
+
 _logger = logging.getLogger(__name__)
 
 
@@ -296,10 +298,17 @@ class WaBotFlow(models.Model):
         if not self.active:
             return {'ok': False, 'error': 'step_inactive'}
         
-        # Apply delay if configured
+        simulation = self.env.context.get(bot_simulator.CONTEXT_KEY)
+        if simulation:
+            simulation.record_step(self)
+        
+        # Apply delay if configured (simulations only advance their clock)
         if self.delay > 0:
-            import time
-            time.sleep(self.delay)
+            if simulation:
+                simulation.record_delay(self.delay)
+            else:
+                import time
+                time.sleep(self.delay)
         
         result = {'ok': True}
         
@@ -373,10 +382,8 @@ class WaBotFlow(models.Model):
         
         # Replace session variables
         formatted = message
-        variables = session.variables or {}
-        if isinstance(variables, dict):
-            for key, value in variables.items():
-                formatted = formatted.replace(f'{{{key}}}', str(value))
+        for key, value in session.get_variables().items():
+            formatted = formatted.replace(f'{{{key}}}', str(value))
         
         # Replace built-in variables
         formatted = formatted.replace('{phone}', session.phone or '')
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models, _
+from odoo.exceptions import ValidationError
+import re
+import logging
+
+from .intent_matcher import MATCHERS, IntentMatcher
+
+_logger = logging.getLogger(__name__)
+
+
+class WaBotIntent(models.Model):
+    _name = 'wa.bot.intent'
+    _description = 'WhatsApp Bot Intent'
+    _order = 'bot_id, sequence, id'
+
+    sequence = fields.Integer(string='Priority', default=10,
+                              help='Lower values win when several intents match the same message')
+    name = fields.Char(string='Intent Name', required=True)
+    bot_id = fields.Many2one('wa.bot', string='Bot', required=True, ondelete='cascade', index=True)
+    active = fields.Boolean(string='Active', default=True)
+
+    # Matching
+    match_type = fields.Selection([
+        ('keyword', 'Keywords'),
+        ('regex', 'Regular Expression'),
+    ], string='Match Type', default='keyword', required=True)
+    keywords = fields.Char(
+        string='Keywords',
+        help='Comma separated words or phrases. Matching ignores case and accents and only considers whole words.'
+    )
+    pattern = fields.Char(string='Pattern', help='Python regular expression (case insensitive)')
+
+    # Response
+    response = fields.Text(
+        string='Response',
+        help='Message sent when the intent matches. Supports {variable}, {phone} and {contact_name}.'
+    )
+    flow_step_id = fields.Many2one(
+        'wa.bot.flow', string='Start Flow Step',
+        domain="[('bot_id', '=', bot_id)]",
+        help='Flow step executed after the response'
+    )
+
+    # Statistics
+    hit_count = fields.Integer(string='Hits', default=0, readonly=True)
+
+    @api.constrains('match_type', 'keywords', 'pattern')
+    def _check_match(self):
+        for rec in self:
+            if rec.match_type == 'keyword' and not rec._get_keywords():
+                raise ValidationError(_('Intent "%s" needs at least one keyword.') % rec.name)
+            if rec.match_type == 'regex':
+                if not rec.pattern:
+                    raise ValidationError(_('Intent "%s" needs a pattern.') % rec.name)
+                # Same flags as IntentMatcher: what passes here compiles there
+                try:
+                    re.compile(rec.pattern, re.IGNORECASE)
+                except re.error as e:
+                    raise ValidationError(_('Invalid pattern for intent "%s": %s') % (rec.name, e))
+
+    @api.constrains('flow_step_id', 'bot_id')
+    def _check_flow_step(self):
+        for rec in self:
+            if rec.flow_step_id and rec.flow_step_id.bot_id != rec.bot_id:
+                raise ValidationError(_('The flow step must belong to the same bot.'))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records.bot_id._bump_intent_version()
+        return records
+
+    def write(self, vals):
+        bots = self.bot_id
+        res = super().write(vals)
+        (bots | self.bot_id)._bump_intent_version()
+        return res
+
+    def unlink(self):
+        bots = self.bot_id
+        res = super().unlink()
+        bots._bump_intent_version()
+        return res
+
+    def _get_keywords(self):
+        self.ensure_one()
+        return [k.strip() for k in (self.keywords or '').split(',') if k.strip()]
+
+    @api.model
+    def _get_matcher(self, bot_id):
+        """Compiled matcher for all active intents of a bot (cached per worker until the intents change)"""
+        version = self.env['wa.bot'].sudo().browse(bot_id).intent_version
+
+        def build():
+            intents = self.sudo().search([('bot_id', '=', bot_id)])
+            _logger.debug(f'Compiling {len(intents)} intents for bot {bot_id}')
+            return IntentMatcher([{
+                'id': intent.id,
+                'priority': intent.sequence,
+                'keywords': intent._get_keywords() if intent.match_type == 'keyword' else [],
+                'pattern': intent.pattern if intent.match_type == 'regex' else None,
+            } for intent in intents])
+
+        return MATCHERS.get((self.env.cr.dbname, bot_id), version, build)
+
+    @api.model
+    def match(self, bot_id, text):
+        """Return the best matching intent of the bot for text
+
+        Returns:
+            wa.bot.intent: Matched intent or empty recordset
+        """
+        if not text or not text.strip():
+            return self.browse()
+        intent_id = self._get_matcher(bot_id).match(text)
+        return self.sudo().browse(intent_id) if intent_id else self.browse()
+
+    def execute(self, session):
+        """Send the intent response and start its flow step
+
+        Args:
+            session: wa.bot.session record
+
+        Returns:
+            dict: Result with 'ok'
+        """
+        self.ensure_one()
+        self.env.cr.execute(
+            "UPDATE wa_bot_intent SET hit_count = hit_count + 1 WHERE id = %s", (self.id,)
+        )
+        self.invalidate_recordset(['hit_count'])
+
+        if self.response:
+            session.send_message(self.env['wa.bot.flow']._format_message(self.response, session))
+        if self.flow_step_id:
+            self.bot_id._execute_flow_chain(session, self.flow_step_id)
+        return {'ok': True, 'intent': self.name}
@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import UserError
 from datetime import datetime, timedelta
 import json
 import logging
+from collections import defaultdict
+
+from . import bot_simulator, session_state
 
 _logger = logging.getLogger(__name__)
 
@@ -42,6 +45,8 @@ class WaBotSession(models.Model):
     # Session Data
     variables = fields.Json(string='Variables', default={},
                            help='Session variables stored as key-value pairs')
+    variables_history = fields.Json(string='Variables History', readonly=True, copy=False,
+                                    help='Most recent variable changes (date and changed keys)')
     current_flow_step_id = fields.Many2one('wa.bot.flow', string='Current Flow Step')
     waiting_for_step_id = fields.Many2one('wa.bot.flow', string='Waiting For Step',
                                           help='Flow step waiting for user input')
@@ -52,6 +57,11 @@ class WaBotSession(models.Model):
     # Display
     color = fields.Integer(string='Color Index')
 
+    def init(self):
+        # Expiry scans active sessions by inactivity
+        tools.create_index(self._cr, 'wa_bot_session_state_last_activity_index',
+                           self._table, ['state', 'last_activity'])
+
     @api.depends('phone', 'bot_id.name')
     def _compute_name(self):
         for rec in self:
@@ -112,6 +122,18 @@ class WaBotSession(models.Model):
                 'end_time': False,
             })
 
+    def _get_variable_store(self):
+        """Return the write-behind variable store of this session
+        
+        Variables are loaded once per transaction and changes are kept in
+        memory until flush_variables() (or commit) writes them back.
+        
+        Returns:
+            SessionVariableStore: Store bound to this session
+        """
+        self.ensure_one()
+        return session_state.get_store(self)
+
     def get_variable(self, key, default=None):
         """Get session variable
         
@@ -122,25 +144,42 @@ class WaBotSession(models.Model):
         Returns:
             Variable value or default
         """
-        self.ensure_one()
-        variables = self.variables or {}
-        if not isinstance(variables, dict):
-            variables = {}
-        return variables.get(key, default)
+        return self._get_variable_store().get(key, default)
+
+    def get_variables(self):
+        """Get a copy of all session variables, including unflushed changes
+        
+        Returns:
+            dict: Variables
+        """
+        return self._get_variable_store().as_dict()
 
     def set_variable(self, key, value):
         """Set session variable
         
+        The change is buffered and written by flush_variables().
+        
         Args:
             key: Variable name
             value: Variable value
         """
-        self.ensure_one()
-        variables = self.variables or {}
-        if not isinstance(variables, dict):
-            variables = {}
-        variables[key] = value
-        self.variables = variables
+        self._get_variable_store().set(key, value)
+
+    def unset_variable(self, key):
+        """Remove session variable
+        
+        Args:
+            key: Variable name
+        """
+        self._get_variable_store().unset(key)
+
+    def flush_variables(self):
+        """Write buffered variable changes with a single JSONB merge UPDATE"""
+        stores = self.env.cr.cache.get(session_state.CACHE_KEY) or {}
+        for rec in self:
+            store = stores.pop(rec.id, None)
+            if store:
+                store.flush()
 
     def set_waiting_for(self, flow_step_id):
         """Set flow step waiting for user input
@@ -167,6 +206,11 @@ class WaBotSession(models.Model):
         """
         self.ensure_one()
         
+        simulation = self.env.context.get(bot_simulator.CONTEXT_KEY)
+        if simulation:
+            simulation.record_message(message)
+            return True
+        
         try:
             if not self.channel_id:
                 _logger.error(f'No channel for session {self.id}')
@@ -198,6 +242,13 @@ class WaBotSession(models.Model):
         """
         self.ensure_one()
         
+        try:
+            return self._process_message(message, dto=dto)
+        finally:
+            self.flush_variables()
+
+    def _process_message(self, message, dto=None):
+        """Process message without flushing variables (see process_message)"""
         # Update activity
         self.write({
             'last_activity': fields.Datetime.now(),
@@ -229,27 +280,92 @@ class WaBotSession(models.Model):
                 result = flow_step.process_input(self, message)
                 return {'status': 'ok', 'flow': True, 'result': result}
             
-            # No specific handler - use default response if configured
-            # TODO: Implement default responses
+            # No specific handler - match intents, then fall back
+            intent = self.env['wa.bot.intent'].match(self.bot_id.id, message)
+            if intent:
+                result = intent.execute(self)
+                return {'status': 'ok', 'intent': intent.name, 'result': result}
+            
+            if self.bot_id.fallback_message:
+                text = self.env['wa.bot.flow']._format_message(self.bot_id.fallback_message, self)
+                return {'status': 'ok', 'fallback': True, 'result': {'ok': True, 'text': text}}
+            
             return {'status': 'ok', 'handled': False}
             
         except Exception as e:
             _logger.error(f'Error processing message: {str(e)}', exc_info=True)
             return {'status': 'error', 'error': str(e)}
 
+    def send_messages_batch(self, messages):
+        """Send several bot messages at once
+        
+        Channels are read in one query and each message goes through
+        message_post, exactly like send_message: the text is escaped, the
+        channel bus notification reaches agents with the channel open, and
+        wa_conn dispatches it to WhatsApp.
+        
+        Args:
+            messages: List of (channel_id, text) tuples
+            
+        Returns:
+            mail.message: Created messages
+        """
+        by_channel = defaultdict(list)
+        for channel_id, text in messages:
+            if channel_id and text:
+                by_channel[channel_id].append(text)
+        posted = self.env['mail.message']
+        if not by_channel:
+            return posted
+        channels = self.env['discuss.channel'].sudo().with_context(wa_skip_receive=True).browse(list(by_channel))
+        for channel in channels.exists():
+            for text in by_channel[channel.id]:
+                try:
+                    with self.env.cr.savepoint():
+                        posted |= channel.message_post(
+                            body=text,
+                            message_type='whatsapp',
+                            subtype_xmlid="mail.mt_comment",
+                            author_id=2,  # OdooBot
+                        )
+                except Exception as e:
+                    _logger.error(f'Error sending bot message to channel {channel.id}: {str(e)}', exc_info=True)
+        return posted
+
     @api.model
     def _cron_expire_sessions(self):
-        """Cron job to expire inactive sessions"""
-        timeout_minutes_ago = fields.Datetime.now() - timedelta(minutes=60)  # Default 60min if not configured
+        """Cron job to expire inactive sessions
         
-        sessions = self.search([
-            ('state', '=', 'active'),
-            ('last_activity', '<', timeout_minutes_ago),
-        ])
+        Expires every active session past its bot timeout with a single UPDATE
+        and posts the timeout messages through send_messages_batch (one
+        message_post per session).
+        """
+        self.env.cr.execute("SELECT MIN(session_timeout) FROM wa_bot WHERE session_timeout > 0")
+        min_timeout = self.env.cr.fetchone()[0] or 30
+        
+        self.flush_model(['state', 'last_activity', 'bot_id'])
+        self.env.cr.execute("""
+            UPDATE wa_bot_session s
+               SET state = 'expired',
+                   end_time = (now() at time zone 'UTC'),
+                   write_date = (now() at time zone 'UTC'),
+                   write_uid = %s
+              FROM wa_bot b
+             WHERE s.bot_id = b.id
+               AND s.state = 'active'
+               AND s.last_activity < (now() at time zone 'UTC') - make_interval(mins => %s)
+               AND s.last_activity < (now() at time zone 'UTC')
+                                     - make_interval(mins => COALESCE(NULLIF(b.session_timeout, 0), 30))
+         RETURNING s.id, s.channel_id, b.session_timeout_message
+        """, (self.env.uid, min_timeout))
+        rows = self.env.cr.fetchall()
+        if not rows:
+            return True
         
-        for session in sessions:
-            if session.is_expired():
-                session.action_expire()
+        self.invalidate_model(['state', 'end_time', 'write_date', 'write_uid'])
+        _logger.info(f'Expired {len(rows)} bot sessions')
         
+        self.send_messages_batch([
+            (channel_id, message) for _session_id, channel_id, message in rows if message
+        ])
         return True
-
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+from . import wa_bot_simulator
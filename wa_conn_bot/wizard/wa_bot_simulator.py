@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models, _
+import json
+
+DEFAULT_SCRIPT = """# One message per line. "@wait <seconds>" delays the next message.
+Hello
+/help
+@wait 60
+John
+"""
+
+
+class WaBotSimulator(models.TransientModel):
+    _name = 'wa.bot.simulator'
+    _description = 'WhatsApp Bot Conversation Simulator'
+
+    bot_id = fields.Many2one('wa.bot', string='Bot', required=True)
+    script = fields.Text(string='Script', required=True, default=DEFAULT_SCRIPT)
+    sessions = fields.Integer(string='Concurrent Sessions', default=1, required=True,
+                              help='Number of simulated contacts running the script')
+    phone = fields.Char(string='First Phone', default='5500900000000', required=True,
+                        help='Phone of the first simulated contact, incremented per session')
+    keep_records = fields.Boolean(string='Keep Records',
+                                  help='Keep the simulated partners, channels and sessions instead of rolling back')
+
+    state = fields.Selection([('draft', 'Draft'), ('done', 'Done')], default='draft')
+    summary = fields.Text(string='Summary', readonly=True)
+    transcript = fields.Text(string='Transcript', readonly=True)
+    report = fields.Text(string='Report (JSON)', readonly=True)
+
+    def action_run(self):
+        self.ensure_one()
+        report = self.bot_id.simulate(
+            self.script,
+            sessions=self.sessions,
+            phone=self.phone,
+            rollback=not self.keep_records,
+        )
+        self.write({
+            'state': 'done',
+            'summary': self._format_summary(report),
+            'transcript': self._format_transcript(report),
+            'report': json.dumps(report, indent=2, ensure_ascii=False),
+        })
+        return {
+            'name': _('Simulate - %s') % self.bot_id.name,
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    @api.model
+    def _format_summary(self, report):
+        lines = [
+            _('%(messages)s messages in %(sessions)s sessions, %(errors)s errors, %(replies)s replies',
+              messages=report['messages'], sessions=report['sessions'],
+              errors=report['errors'], replies=report['replies']),
+            _('Latency: avg %(avg)s ms | p50 %(p50)s ms | p95 %(p95)s ms | max %(max)s ms', **report['latency_ms']),
+            _('Queries: avg %(avg)s | max %(max)s | total %(total)s', **report['queries']),
+            _('Throughput: %s messages/s', report['throughput']),
+            '',
+        ]
+        for step in report['steps']:
+            lines.append(
+                f"#{step['index'] + 1} {step['message'][:30]!r}: p50 {step['p50_ms']} ms, "
+                f"p95 {step['p95_ms']} ms, {step['avg_queries']} queries, {step['errors']} errors"
+            )
+        if report['flow_paths']:
+            lines += ['', _('Flow paths:')]
+            lines += [f'{count} x {path}' for path, count in report['flow_paths'].items()]
+        return '\n'.join(lines)
+
+    @api.model
+    def _format_transcript(self, report):
+        lines = []
+        for phone, turns in report['conversations'].items():
+            lines.append(f'== {phone} ==')
+            for turn in turns:
+                if turn['delay']:
+                    lines.append(f"   (+{turn['delay']}s)")
+                lines.append(f">> {turn['message']}    [{turn['latency_ms']} ms, {turn['queries']} queries]")
+                lines += [f'<< {reply}' for reply in turn['replies']]
+                if turn['flow_path']:
+                    lines.append(f"   flow: {' > '.join(turn['flow_path'])}")
+                if turn['error']:
+                    lines.append(f"   error: {turn['error']}")
+        return '\n'.join(lines)
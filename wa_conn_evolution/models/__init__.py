@@ -1,2 +1,3 @@
 from . import wa_api_event
-from . import wa_account_evolution
\ No newline at end of file
+from . import wa_account_evolution    
+from . import evolution_adapter
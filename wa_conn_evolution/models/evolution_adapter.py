@@ -0,0 +1,461 @@
+import base64
+import logging
+from datetime import datetime, timezone
+from odoo import _
+from odoo.exceptions import UserError
+from odoo.addons.wa_conn.models import dto
+from odoo.addons.wa_conn.models.provider import ProviderAdapter, SendRequest, register_provider
+
+_logger = logging.getLogger(__name__)
+
+# status do messages.update (nome ou número do ack do Baileys) -> wa.receipt
+RECEIPT_STATUS = {
+    'ERROR': 'failed', 0: 'failed',
+    'SERVER_ACK': 'sent', 2: 'sent',
+    'DELIVERY_ACK': 'delivered', 3: 'delivered',
+    'READ': 'read', 4: 'read',
+    'PLAYED': 'played', 5: 'played',
+}
+
+
+@register_provider('evolution', 'Evolution API')
+class EvolutionAdapter(ProviderAdapter):
+    """
+    Adapter da Evolution API.
+    A configuração (api_url, api_key, instance_name...) vem dos campos
+    adicionados em wa.account por WAAccountEvolution.
+    """
+
+    # ==================== HELPERS EVOLUTION ====================
+    def headers(self, account, **kwargs):
+        return {
+            "Content-Type": "application/json",
+            "apikey": account.api_key,
+        }
+
+    def fmt_number(self, account, mobile):
+        m = str(mobile or '').strip().lstrip('+')
+        return f'+{m}' if m else None
+
+    def _url(self, account, path):
+        return f"{account.api_url}/{path}/{account.get_instance_name()}"
+
+    @staticmethod
+    def _context_info(payload):
+        """contextInfo pode estar em extendedTextMessage/contextInfo ou direto em data['contextInfo']"""
+        data = (getattr(payload, 'raw', None) or {}).get('data', {})
+        message_dict = data.get('message') or {}
+        context_info = None
+        ext = message_dict.get('extendedTextMessage')
+        if isinstance(ext, dict):
+            context_info = ext.get('contextInfo')
+        return context_info or data.get('contextInfo')
+
+    # ==================== INBOUND ====================
+    def normalize_inbound(self, account, raw, request=None):
+        """
+        Normaliza o payload Evolution extraindo os campos diretamente e preenchendo o DTO corretamente.
+        """
+        raw = raw or {}
+        data = raw.get('data') or raw
+        batch = data.get('messages') or data.get('events') or data.get('entries')
+        result = []
+        items = batch if isinstance(batch, list) else [data]
+        instance = account.get_instance_name()
+        for item in items:
+            key = (item or {}).get('key', {})
+            remote_jid = str(item.get('remoteJid') or key.get('remoteJid') or item.get('from') or '')
+            mobile = remote_jid.split('@', 1)[0] if remote_jid else None
+            from_me = bool(item.get('from_me') or key.get('fromMe') or False)
+            push_name = item.get('push_name') or item.get('pushName') or item.get('senderName') or item.get('contact')
+            message_id = item.get('message_id') or item.get('id') or key.get('id')
+            event = raw.get('event') or item.get('type') or 'messages.upsert'
+            message_dict = item.get('message') or item.get('msg') or item.get('content') or {}
+            message = item.get('text') or item.get('caption') or message_dict.get('conversation') or ''
+            if isinstance(message, dict):
+                message = message.get('conversation') or message.get('caption') or message.get('text') or ''
+            message = message.strip() if isinstance(message, str) else ''
+            result.append(dto.NormalizedPayload(
+                provider='evolution',
+                instance=instance,
+                event=event,
+                message_id=message_id,
+                remote_jid=remote_jid,
+                mobile=mobile,
+                from_me=from_me,
+                push_name=push_name,
+                message=message,
+                raw=raw,
+            ))
+        return result
+
+    def normalize_receipts(self, account, raw):
+        """
+        Recibos do evento messages.update (v1: key/update.status; v2: keyId/status),
+        com um item ou uma lista em data. Só mensagens enviadas (fromMe).
+        """
+        raw = raw or {}
+        if str(raw.get('event') or '').lower().replace('_', '.') != 'messages.update':
+            return []
+        data = raw.get('data') or {}
+        batch = data if isinstance(data, list) else data.get('messages') or data.get('events') or [data]
+        receipts = []
+        for item in batch:
+            item = item or {}
+            key = item.get('key') or {}
+            if (item.get('fromMe') if 'fromMe' in item else key.get('fromMe', True)) is False:
+                continue
+            update = item.get('update') or {}
+            status = update.get('status', item.get('status'))
+            if isinstance(status, str) and status.isdigit():
+                status = int(status)
+            status = RECEIPT_STATUS.get(status.upper() if isinstance(status, str) else status)
+            message_id = item.get('keyId') or key.get('id') or item.get('id')
+            if not status or not message_id:
+                continue
+            receipts.append(dto.DeliveryReceipt(message_id, status, self._receipt_time(item)))
+        return receipts
+
+    @staticmethod
+    def _receipt_time(item):
+        ts = item.get('messageTimestamp') or item.get('timestamp')
+        try:
+            ts = float(ts)
+        except (TypeError, ValueError):
+            return None
+        if ts > 1e12:  # milissegundos
+            ts /= 1000
+        return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+
+    def accepts_event(self, account, event):
+        return event == 'messages.upsert'
+
+    def get_reply_to(self, account, payload):
+        context_info = self._context_info(payload)
+        return context_info.get('stanzaId') if context_info else None
+
+    def inbound_handle_reaction(self, account, payload, partner):
+        """
+        Processa reações do EvolutionAPI (reactionMessage) criando/removendo wa.message.reaction.
+        """
+        data = (getattr(payload, 'raw', None) or {}).get('data', {})
+        message_dict = data.get('message', {})
+        if data.get('messageType') != 'reactionMessage' or 'reactionMessage' not in message_dict:
+            return False
+        reaction = message_dict['reactionMessage']
+        reacted_msg_id = reaction['key']['id']
+        emoji = reaction.get('text')
+        env = account.env
+        mail_message = env['mail.message'].sudo().search([('wa_message_id', '=', reacted_msg_id)], limit=1)
+        if mail_message:
+            reaction_model = env['mail.message.reaction'].sudo()
+            if emoji:
+                reaction_model.add_reaction(mail_message.id, emoji, partner=partner)
+            else:
+                reaction_model.remove_reaction(mail_message.id, emoji, partner=partner)
+        return True
+
+    def inbound_handle_reply(self, account, payload, partner):
+        """
+        Processa replies recebidos do Evolution API, criando mail.message com parent_id.
+        """
+        parent_wa_id = self.get_reply_to(account, payload)
+        parent_message = None
+        if parent_wa_id:
+            parent_message = account.env['mail.message'].sudo().search([
+                ('wa_message_id', '=', parent_wa_id)
+            ], limit=1)
+        channel = partner.wa_get_or_create_channel(account=account)
+        vals = {
+            'author_id': partner.id,
+            'body': getattr(payload, 'message', ''),
+            'message_type': 'whatsapp',
+            'subtype_xmlid': 'mail.mt_comment',
+        }
+        if parent_message:
+            vals['parent_id'] = parent_message.id
+        msg = channel.with_context(wa_skip_send=True).sudo().message_post(**vals)
+        # Atualiza campos customizados após criação
+        msg.sudo().write({
+            'wa_message_id': getattr(payload, 'message_id', None),
+            'is_wa': True,
+        })
+        return {'status': 'ok', 'msg_id': msg.id, 'parent_id': parent_message.id if parent_message else None}
+
+    # ==================== OUTBOUND ====================
+    def build_text_request(self, account, mobile, message):
+        number = self.fmt_number(account, mobile)
+        if not number:
+            _logger.warning(f"[Evolution.send_text] Invalid mobile: {mobile}")
+            return {'ok': False, 'error': 'invalid_mobile'}
+        return SendRequest('POST', self._url(account, 'message/sendText'), {
+            'json': {'number': number, 'text': message or ''},
+            'headers': self.headers(account),
+            'timeout': 20,
+        }, ('id', 'message_id'))
+
+    def build_media_request(self, account, mobile, *, caption='', b64=None, mime=None, filename=None):
+        number = self.fmt_number(account, mobile)
+        if not number:
+            return {'ok': False, 'error': 'invalid_mobile'}
+        media_b64 = b64
+        if isinstance(media_b64, (bytes, bytearray)):
+            media_b64 = media_b64.decode()
+        elif not isinstance(media_b64, str):
+            media_b64 = ''
+        if not media_b64:
+            return {'ok': False, 'error': 'empty_media'}
+        eff_mime = mime or (self.get_mime_type(account, filename) if filename else None) or 'application/octet-stream'
+        payload = {
+            'number': number,
+            'caption': caption or '',
+            'mediatype': self.get_media_type(account, filename) if filename else 'document',
+            'mimetype': eff_mime,
+            'media': media_b64,
+            'fileName': filename or 'file.bin',
+        }
+        return SendRequest('POST', self._url(account, 'message/sendMedia'), {
+            'json': payload,
+            'headers': self.headers(account),
+            'timeout': 40,
+        }, ('id', 'message_id'))
+
+    def build_reply_request(self, account, mobile, message, reply_to=None, quoted_message=None):
+        number = self.fmt_number(account, mobile)
+        if not number:
+            return {'ok': False, 'error': 'invalid_mobile'}
+        payload = {
+            'number': number,
+            'text': message or '',
+        }
+        if reply_to:
+            quoted = {'key': {'id': reply_to}}
+            if quoted_message:
+                quoted['message'] = {'conversation': quoted_message}
+            payload['quoted'] = quoted
+        return SendRequest('POST', self._url(account, 'message/sendText'), {
+            'json': payload,
+            'headers': self.headers(account),
+            'timeout': 20,
+        }, ('id', 'message_id'))
+
+    def check_numbers(self, account, numbers):
+        """POST chat/whatsappNumbers: [{'exists', 'jid', 'number'}] para cada número consultado."""
+        resp = self.request('POST', self._url(account, 'chat/whatsappNumbers'),
+                            headers=self.headers(account), json={'numbers': list(numbers)}, timeout=30)
+        if resp.status_code not in (200, 201):
+            raise UserError(_('Failed to check numbers (Status: %s)') % resp.status_code)
+        data = resp.json()
+        if isinstance(data, dict):
+            data = data.get('numbers') or data.get('data') or []
+        result = {}
+        for item in data or []:
+            number = item.get('number') or str(item.get('jid') or '').split('@', 1)[0]
+            if number:
+                result[number] = bool(item.get('exists'))
+        return result
+
+    def send_reaction(self, account, key, reaction):
+        payload = {
+            "key": {
+                "remoteJid": key.get("remoteJid"),
+                "fromMe": key.get("fromMe", True),
+                "id": key.get("id"),
+            },
+            "reaction": reaction or '',
+        }
+        result = self.send_request(
+            'POST', self._url(account, 'message/sendReaction'),
+            json=payload, headers=self.headers(account), timeout=20,
+        )
+        result.pop('id', None)
+        return result
+
+    # ==================== INSTÂNCIA ====================
+    @staticmethod
+    def _strip_data_uri(b64):
+        if isinstance(b64, str) and b64.startswith('data:') and ',' in b64:
+            return b64.split(',', 1)[1]
+        return b64
+
+    def create_instance(self, account):
+        """Cria instância no Evolution API"""
+        data = {
+            "instanceName": account.get_instance_name(),
+            "integration": "WHATSAPP-BAILEYS",
+            "rejectCall": account.reject_call,
+            "msgCall": account.call_rejected_message or '',
+            "groupsIgnore": account.ignore_group,
+            "alwaysOnline": account.always_online,
+            "readMessages": account.view_message,
+            "readStatus": account.view_status,
+            "syncFullHistory": account.sync_history,
+            "qrcode": True,
+        }
+        events = [e.name for e in account.api_events_ids] or ['APPLICATION_STARTUP', 'QRCODE_UPDATED']
+        if account.enable_webhook:
+            data["webhook"] = {
+                "url": account.webhook_url,
+                "byEvents": bool(events),
+                "base64": bool(account.base64_webhook),
+                "headers": {"webhook_key": account.webhook_key},
+                "events": events,
+            }
+        try:
+            resp = self.request('POST', f"{account.api_url}/instance/create",
+                                json=data, headers=self.headers(account), timeout=30)
+            try:
+                j = resp.json()
+            except Exception:
+                j = None
+            if isinstance(j, dict):
+                qr_b64 = j.get('qrcode') or j.get('base64')
+                if qr_b64:
+                    account.sudo().write({'qr_code': self._strip_data_uri(qr_b64)})
+            return {'ok': resp.status_code in (200, 201), 'status_code': resp.status_code, 'text': resp.text, 'json': j}
+        except Exception as e:
+            return {'ok': False, 'error': str(e), 'status_code': 0}
+
+    def delete_instance(self, account):
+        """Deleta instância no Evolution API"""
+        try:
+            resp = self.request('DELETE', self._url(account, 'instance/delete'),
+                                headers=self.headers(account), timeout=20)
+            return {'ok': 200 <= resp.status_code < 300, 'status_code': resp.status_code, 'text': resp.text}
+        except Exception as e:
+            return {'ok': False, 'error': str(e), 'status_code': 0}
+
+    def check_status(self, account):
+        """Verifica status da conexão no Evolution API"""
+        try:
+            resp = self.request('GET', self._url(account, 'instance/connectionState'),
+                                headers=self.headers(account), timeout=15)
+            if resp.status_code != 200:
+                raise UserError(_('Failed to check status (Status: %s)') % resp.status_code)
+            try:
+                data = resp.json()
+            except Exception:
+                raise UserError(_('Invalid response from Evolution server'))
+
+            state = (data.get('instance') or {}).get('state') or 'unknown'
+
+            # Mapeia estados do Evolution
+            if state == 'open':
+                account.sudo().write({'state': 'connected'})
+                msg = _('Instance is connected! ✅')
+                msg_type = 'success'
+            elif state == 'close':
+                account.sudo().write({'state': 'disconnected'})
+                msg = _('Instance is disconnected ❌')
+                msg_type = 'warning'
+            elif state == 'connecting':
+                account.sudo().write({'state': 'connecting'})
+                msg = _('Instance is connecting... ⏳')
+                msg_type = 'info'
+            else:
+                msg = _('Instance status: %s') % state
+                msg_type = 'info'
+
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': _('Status Check'),
+                    'message': msg,
+                    'type': msg_type,
+                    'sticky': False,
+                }
+            }
+        except Exception as e:
+            _logger.error(f"Error checking Evolution instance status: {str(e)}")
+            raise UserError(_('Error checking status: %s') % str(e))
+
+    def connect(self, account):
+        """Conecta instância no Evolution API e obtém QR Code"""
+        try:
+            resp = self.request('GET', self._url(account, 'instance/connect'),
+                                headers=self.headers(account), timeout=20)
+            try:
+                payload = resp.json()
+            except Exception:
+                payload = None
+            b64 = payload.get('base64') if isinstance(payload, dict) else None
+            vals = {'state': 'connecting'}
+            if b64:
+                b64 = self._strip_data_uri(b64)
+                vals['qr_code'] = b64
+            account.sudo().write(vals)
+            _logger.debug(f"[Evolution.connect] payload: {payload}")
+            return {'ok': 200 <= resp.status_code < 300, 'qrcode_b64': b64, 'payload': payload,
+                    'text': resp.text, 'status_code': resp.status_code}
+        except Exception as e:
+            account.sudo().write({'state': 'disconnected'})
+            return {'ok': False, 'error': str(e), 'status_code': 0}
+
+    def restart(self, account):
+        """Reinicia instância no Evolution API"""
+        _logger.info(f"[Evolution.restart] Account: {account.name} (ID: {account.id})")
+        try:
+            # POST /instance/restart/{instance} com apikey no header
+            resp = self.request('POST', self._url(account, 'instance/restart'),
+                                headers=self.headers(account), timeout=20)
+            try:
+                payload = resp.json()
+            except Exception:
+                payload = None
+            if not 200 <= resp.status_code < 300:
+                raise UserError(_('Failed to restart instance (Status: %s): %s') % (resp.status_code, payload))
+
+            account.sudo().write({'state': 'connecting'})
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': _('Success'),
+                    'message': _('Instance restarted successfully! Please wait for reconnection...'),
+                    'type': 'success',
+                    'sticky': False,
+                }
+            }
+        except UserError:
+            raise
+        except Exception as e:
+            _logger.error(f"Error restarting Evolution instance: {str(e)}")
+            raise UserError(_('Error restarting instance: %s') % str(e))
+
+    def disconnect(self, account):
+        """Desconecta e faz logout da instância no Evolution API"""
+        try:
+            resp = self.request('DELETE', self._url(account, 'instance/logout'),
+                                headers=self.headers(account), timeout=20)
+            return {'ok': 200 <= resp.status_code < 300, 'status_code': resp.status_code, 'text': resp.text}
+        except Exception as e:
+            return {'ok': False, 'error': str(e), 'status_code': 0}
+        finally:
+            # Sempre limpa o estado e o QR code
+            account.sudo().write({'state': 'disconnected', 'qr_code': False})
+
+    def refresh_qrcode(self, account):
+        self.connect(account)
+
+    def get_profile_image(self, account, remote_jid=None):
+        """Obtém imagem de perfil do contato"""
+        if not remote_jid:
+            return False
+        try:
+            num = str(remote_jid)
+            if '@' in num:
+                num = num.split('@', 1)[0]
+            if num and not num.startswith('+'):
+                num = f'+{num}'
+            r = self.request('POST', self._url(account, 'chat/fetchProfilePictureUrl'),
+                             json={'number': num}, headers=self.headers(account), timeout=15)
+            pic_url = r.json().get('profilePictureUrl')
+            if not pic_url:
+                return False
+            img = self.request('GET', pic_url, timeout=20)
+            if img.status_code == 200:
+                return base64.b64encode(img.content)
+        except Exception:
+            return False
+        return False
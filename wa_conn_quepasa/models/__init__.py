@@ -1,2 +1,3 @@
 # -*- coding: utf-8 -*-
 from . import wa_conn_quepasa_provider
+from . import quepasa_adapter
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+import logging
+from odoo import _
+from odoo.exceptions import UserError
+from odoo.addons.wa_conn.models import dto
+from odoo.addons.wa_conn.models.provider import ProviderAdapter, SendRequest, register_provider
+
+_logger = logging.getLogger(__name__)
+
+
+@register_provider('quepasa', 'Quepasa')
+class QuepasaAdapter(ProviderAdapter):
+    """
+    Adapter do Quepasa.
+    A configuração (quepasa_url, quepasa_bot_token...) vem dos campos
+    adicionados em wa.account por WAAccountQuepasa.
+    """
+
+    # ==================== HELPERS QUEPASA ====================
+    def headers(self, account, chat_id=None, track_id=None, **kwargs):
+        """
+        Headers para autenticação no Quepasa
+
+        Args:
+            chat_id: Número do destinatário (ex: 5511999999999) - opcional
+            track_id: ID de rastreamento customizado - opcional
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "X-QUEPASA-TOKEN": account.quepasa_bot_token or ""
+        }
+        if chat_id:
+            headers["X-QUEPASA-CHATID"] = str(chat_id)
+        if track_id:
+            headers["X-QUEPASA-TRACKID"] = str(track_id)
+        return headers
+
+    # fmt_number padrão: Quepasa usa formato 5511999999999 (sem +)
+
+    def _require_token(self, account):
+        if not account.quepasa_bot_token:
+            raise UserError(_("Bot Token not configured"))
+
+    @staticmethod
+    def _notification(title, message, msg_type, **extra):
+        params = {'title': title, 'message': message, 'type': msg_type, 'sticky': False}
+        params.update(extra)
+        return {'type': 'ir.actions.client', 'tag': 'display_notification', 'params': params}
+
+    # ==================== INBOUND ====================
+    def normalize_inbound(self, account, raw, request=None):
+        """
+        Normaliza o payload do Quepasa para o formato DTO padrão.
+
+        Estrutura típica do Quepasa:
+        {
+            "id": "message_id",
+            "timestamp": 1234567890,
+            "from": "5511999999999",
+            "participant": "5511999999999",
+            "recipient": "5511888888888",
+            "text": "mensagem",
+            "type": "text",
+            "fromMe": false
+        }
+        """
+        raw = raw or {}
+        result = []
+
+        # Quepasa pode enviar mensagem única ou array
+        messages = raw if isinstance(raw, list) else [raw]
+
+        for item in messages:
+            mobile = str(item.get('from') or item.get('participant') or '')
+            mobile = mobile.split('@')[0] if '@' in mobile else mobile
+
+            message_type = item.get('type', 'text')
+            message = ''
+            if message_type == 'text':
+                message = item.get('text', '')
+            elif message_type in ['image', 'video', 'audio', 'document']:
+                message = item.get('caption', '')
+
+            result.append(dto.NormalizedPayload(
+                provider='quepasa',
+                instance='default',
+                event='message',
+                message_id=item.get('id', ''),
+                remote_jid=f"{mobile}@s.whatsapp.net",
+                mobile=mobile,
+                from_me=bool(item.get('fromMe', False)),
+                push_name=item.get('pushName') or item.get('notifyName') or '',
+                message=message,
+                raw=raw,
+            ))
+
+        return result
+
+    # ==================== OUTBOUND ====================
+    def build_text_request(self, account, mobile, message):
+        number = self.fmt_number(account, mobile)
+        if not number:
+            _logger.warning(f"[Quepasa.send_text] Invalid mobile number: {mobile}")
+            return {'ok': False, 'error': 'invalid_mobile'}
+        if not account.quepasa_bot_token:
+            _logger.error(f"[Quepasa.send_text] Bot Token is missing for account {account.id} ({account.name})")
+            return {'ok': False, 'error': 'bot_token_missing'}
+
+        # POST /send com header X-QUEPASA-CHATID
+        return SendRequest('POST', f"{account.quepasa_url}/send", {
+            'json': {'text': message or ''},
+            'headers': self.headers(account, chat_id=number),
+            'timeout': 20,
+        }, ('id', 'messageId'))
+
+    def build_media_request(self, account, mobile, *, caption='', b64=None, mime=None, filename=None):
+        """Mídia via Quepasa v4 - com arquivo binário"""
+        number = self.fmt_number(account, mobile)
+        if not number:
+            _logger.warning(f"[Quepasa.send_media] Invalid mobile: {mobile}")
+            return {'ok': False, 'error': 'invalid_mobile'}
+        if not account.quepasa_bot_token:
+            _logger.error("[Quepasa.send_media] Bot Token missing")
+            return {'ok': False, 'error': 'bot_token_missing'}
+
+        media_b64 = b64
+        if isinstance(media_b64, (bytes, bytearray)):
+            media_b64 = media_b64.decode()
+        if not media_b64:
+            return {'ok': False, 'error': 'empty_media'}
+
+        eff_mime = mime or (self.get_mime_type(account, filename) if filename else None) or 'application/octet-stream'
+        # Quepasa v3/v4 usa 'content' com base64 puro (sem data URI prefix)
+        payload = {
+            'text': caption or '',
+            'content': media_b64,
+            'mimetype': eff_mime,
+            'filename': filename or 'file.bin',
+        }
+        return SendRequest('POST', f"{account.quepasa_url}/send", {
+            'json': payload,
+            'headers': self.headers(account, chat_id=number),
+            'timeout': 40,
+        }, ('id', 'messageId'))
+
+    # ==================== INSTÂNCIA ====================
+    def check_status(self, account):
+        """Verifica status da conexão do bot"""
+        self._require_token(account)
+        try:
+            # Endpoint correto: GET /info
+            resp = self.request('GET', f"{account.quepasa_url}/info",
+                                headers=self.headers(account), timeout=15)
+            if resp.status_code != 200:
+                _logger.warning(f"[Quepasa.check_status] Status {resp.status_code}: {resp.text}")
+                raise UserError(_('Failed to check status (Status: %s)') % resp.status_code)
+            try:
+                data = resp.json()
+            except Exception as e:
+                _logger.error(f"[Quepasa.check_status] Failed to parse JSON: {e} - {resp.text}")
+                raise UserError(_('Invalid response from Quepasa server'))
+
+            # Quepasa v4 retorna: {'success': True, 'server': {'verified': True, 'wid': '...', ...}}
+            server_info = data.get('server', {})
+            verified = server_info.get('verified', False)
+            wid = server_info.get('wid', '')
+            user = server_info.get('user', '')
+
+            if verified and wid:
+                account.sudo().write({'state': 'connected'})
+                phone = wid.split('@')[0] if '@' in wid else wid
+                msg = _('Bot is connected! ✅\n\nPhone: %s\nUser: %s') % (phone, user or 'N/A')
+                msg_type = 'success'
+            else:
+                account.sudo().write({'state': 'disconnected'})
+                msg = _('Bot is disconnected ❌\n\nPlease scan the QR Code to connect.')
+                msg_type = 'warning'
+
+            # Notificação + reload
+            return self._notification(_('Status Check'), msg, msg_type,
+                                      next={'type': 'ir.actions.client', 'tag': 'reload'})
+        except UserError:
+            raise
+        except Exception as e:
+            _logger.error(f"[Quepasa.check_status] Exception: {str(e)}", exc_info=True)
+            raise UserError(_('Error checking status: %s') % str(e))
+
+    def connect(self, account):
+        """Inicia processo de conexão e obtém QR Code via endpoint /scan"""
+        if not account.quepasa_bot_token:
+            raise UserError(_("Please configure Bot Token first"))
+        try:
+            resp = self.request('POST', f"{account.quepasa_url}/scan",
+                                headers=self.headers(account), timeout=20)
+            try:
+                payload = resp.json()
+            except Exception:
+                payload = None
+
+            b64 = None
+            if isinstance(payload, dict):
+                b64 = payload.get('qrcode') or payload.get('base64') or payload.get('qr')
+
+            vals = {'state': 'connecting'}
+            if b64:
+                if isinstance(b64, str) and b64.startswith('data:') and ',' in b64:
+                    b64 = b64.split(',', 1)[1]
+                vals['qr_code'] = b64
+            account.sudo().write(vals)
+
+            if 200 <= resp.status_code < 300 and b64:
+                return self._notification(_('QR Code Updated'),
+                                          _('QR Code generated! Please scan it with WhatsApp.'), 'success')
+            raise UserError(_('Failed to get QR Code (Status: %s)') % resp.status_code)
+        except UserError:
+            raise
+        except Exception as e:
+            account.sudo().write({'state': 'disconnected'})
+            _logger.error(f"Error connecting Quepasa bot: {str(e)}")
+            raise UserError(_('Error connecting: %s') % str(e))
+
+    def disconnect(self, account):
+        """Desconecta o bot do WhatsApp"""
+        self._require_token(account)
+        try:
+            # Endpoint: POST /logout
+            resp = self.request('POST', f"{account.quepasa_url}/logout",
+                                headers=self.headers(account), timeout=20)
+        except Exception as e:
+            account.sudo().write({'state': 'disconnected', 'qr_code': False})
+            _logger.error(f"Error disconnecting Quepasa bot: {str(e)}")
+            raise UserError(_('Connection error (bot disconnected locally): %s') % str(e))
+
+        account.sudo().write({'state': 'disconnected', 'qr_code': False})
+        if 200 <= resp.status_code < 300:
+            return self._notification(_('Success'), _('Bot disconnected successfully!'), 'success')
+        return self._notification(
+            _('Warning'),
+            _('Bot disconnected locally, but Quepasa returned status: %s') % resp.status_code,
+            'warning')
+
+    def restart(self, account):
+        """Reinicia a conexão do bot"""
+        self.disconnect(account)
+        return self.connect(account)
+
+    def configure_webhook(self, account):
+        """Configura webhook no Quepasa"""
+        if not account.webhook_url:
+            return
+        payload = {
+            'url': account.webhook_url,
+            'forwardinternal': True,
+        }
+        resp = self.request('POST', f"{account.quepasa_url}/webhook",
+                            json=payload, headers=self.headers(account), timeout=20)
+        if resp.status_code not in (200, 201):
+            raise Exception(f"Status {resp.status_code}: {resp.text}")